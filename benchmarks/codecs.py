@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+"""
+File size, save time and reload time of FileStorage for each codec
+
+Usage: python3 -m benchmarks.codecs [count]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from benchmarks.common import write_store
+from models import storage
+from models.engine.codecs import CODECS
+from models.engine.file_storage import FileStorage
+
+
+def main(count):
+    """Save and reload a store of count objects with every codec"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json")
+        FileStorage._FileStorage__file_path = path
+        write_store(path, count)
+        storage.reload()
+        print(f"{count} objects")
+        for name in CODECS:
+            FileStorage._FileStorage__codec = name
+            start = time.perf_counter()
+            storage.save()
+            save_time = time.perf_counter() - start
+            size = os.path.getsize(path)
+            start = time.perf_counter()
+            storage.reload()
+            reload_time = time.perf_counter() - start
+            print(
+                f"{name:>8}: {size / 1024 / 1024:7.1f} MiB, "
+                f"save {save_time:6.2f}s, reload {reload_time:6.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
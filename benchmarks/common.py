@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""This module contains helpers shared by the benchmark scripts"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+# repository root, so child processes can import the models package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# extra attributes of each app class (as set by the console)
+CLASS_ATTRIBUTES = {
+    "BaseModel": {},
+    "User": {
+        "email": "guest@hbnb.io", "password": "root",
+        "first_name": "Betty", "last_name": "Holberton",
+    },
+    "State": {"name": "California"},
+    "City": {"state_id": "", "name": "San Francisco"},
+    "Amenity": {"name": "Wifi"},
+    "Place": {
+        "city_id": "", "user_id": "", "name": "Lovely place",
+        "description": "A nice place to stay", "number_rooms": 3,
+        "number_bathrooms": 1, "max_guest": 6, "price_by_night": 100,
+        "latitude": 37.77, "longitude": -122.43, "amenity_ids": [],
+    },
+    "Review": {"place_id": "", "user_id": "", "text": "Great stay!"},
+}
+
+
+def make_records(count):
+    """
+    Generate synthetic stored objects, spread over all app classes
+
+    Args:
+        count (int): number of objects
+    Yields:
+        tuple - (key, object dictionary) as saved by FileStorage
+    """
+    classes = list(CLASS_ATTRIBUTES)
+    start = datetime(2024, 1, 1, 12, 0, 0, 1)
+    for i in range(count):
+        class_name = classes[i % len(classes)]
+        id = str(uuid.UUID(int=i))
+        timestamp = (start + timedelta(seconds=i)).isoformat()
+        record = {"id": id, "created_at": timestamp, "updated_at": timestamp}
+        record.update(CLASS_ATTRIBUTES[class_name])
+        record["__class__"] = class_name
+        yield f"{class_name}.{id}", record
+
+
+def write_store(path, count):
+    """Write a JSON storage file holding count synthetic objects"""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("{")
+        for i, (key, record) in enumerate(make_records(count)):
+            if i:
+                file.write(", ")
+            file.write(f"{json.dumps(key)}: {json.dumps(record)}")
+        file.write("}")
+
+
+def peak_rss():
+    """Get the peak resident set size of this process (in MiB)"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # bytes on macOS, KiB elsewhere
+        return usage / 1024 / 1024
+    return usage / 1024
+
+
+def run_child(module, args, cwd, env=None):
+    """
+    Run a benchmark module in a fresh interpreter (so that peak memory
+    isn't shared between measures) and decode its JSON output
+
+    Args:
+        module (str): module name (ex. benchmarks.reload_memory)
+        args (list): command line arguments
+        cwd (str): working directory (where file.json is looked for)
+        env (dict): extra environment variables
+    Returns:
+        dict - what the child printed as JSON
+    """
+    child_env = dict(os.environ, PYTHONPATH=ROOT, **(env or {}))
+    output = subprocess.run(
+        [sys.executable, "-m", module, *args],
+        cwd=cwd, env=child_env, check=True,
+        stdout=subprocess.PIPE, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
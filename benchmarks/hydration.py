@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Reload time of FileStorage: the original reload (json.load, then each
+instance built by the original BaseModel.__init__, strptime and all)
+versus the current reload (streamed, bulk BaseModel.from_records())
+
+Usage: python3 -m benchmarks.hydration [count]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from benchmarks.common import write_store
+from models import storage
+from models.engine.file_storage import FileStorage
+
+
+def original_init(obj, **kwargs):
+    """BaseModel.__init__ as it was (with keyword arguments), before
+    reload built instances in bulk"""
+    for key, value in kwargs.items():
+        if key == "created_at" or key == "updated_at":
+            obj.__dict__[key] = datetime.strptime(
+                value, "%Y-%m-%dT%H:%M:%S.%f"
+            )
+        elif key != "__class__":
+            obj.__dict__[key] = kwargs[key]
+
+
+def original_reload(path, classes):
+    """FileStorage.reload as it was (garbage collector enabled)"""
+    with open(path, "r", encoding="utf-8") as file:
+        dict = json.load(file)
+    objects = {}
+    for key, value in dict.items():
+        obj = object.__new__(classes[value["__class__"]])
+        original_init(obj, **value)
+        objects[key] = obj
+    return objects
+
+
+def main(count):
+    """Reload a store of count objects with both implementations"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json")
+        FileStorage._FileStorage__file_path = path
+        write_store(path, count)
+        classes = storage.get_app_classes()
+
+        start = time.perf_counter()
+        objects = original_reload(path, classes)
+        before = time.perf_counter() - start
+        del objects
+
+        start = time.perf_counter()
+        storage.reload()
+        after = time.perf_counter() - start
+
+    print(f"{count} objects")
+    print(f"  original reload: {before:6.2f}s")
+    print(f"  from_records:    {after:6.2f}s")
+    print(f"  speedup:         {before / after:6.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
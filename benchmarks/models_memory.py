@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""
+Memory used per instance of each app class, regular instances (with a
+__dict__) versus compact ones (HBNB_COMPACT_MODELS=1, slots)
+
+Usage: python3 -m benchmarks.models_memory [count]
+"""
+
+import json
+import sys
+import tempfile
+import tracemalloc
+from benchmarks.common import CLASS_ATTRIBUTES, make_records, run_child
+
+
+def child(count):
+    """Build count instances of each class, print bytes per instance"""
+    from models import storage
+
+    classes = storage.get_app_classes()
+    records = list(make_records(count * len(classes)))
+    result = {}
+    for class_name, cls in classes.items():
+        subset = [r for k, r in records if r["__class__"] == class_name]
+        tracemalloc.start()
+        objects = [cls(**record) for record in subset]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        result[class_name] = size / len(objects)
+        del objects
+    print(json.dumps(result))
+
+
+def main(count):
+    """Measure both representations in fresh interpreters"""
+    with tempfile.TemporaryDirectory() as tmp:
+        regular = run_child(
+            "benchmarks.models_memory", ["--child", str(count)], tmp
+        )
+        compact = run_child(
+            "benchmarks.models_memory", ["--child", str(count)], tmp,
+            {"HBNB_COMPACT_MODELS": "1"},
+        )
+    print(f"{'class':>10} {'regular':>9} {'compact':>9}  (bytes/instance)")
+    for class_name in CLASS_ATTRIBUTES:
+        print(
+            f"{class_name:>10} {regular[class_name]:9.0f} "
+            f"{compact[class_name]:9.0f}  "
+            f"{1 - compact[class_name] / regular[class_name]:.0%} less"
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(int(sys.argv[2]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
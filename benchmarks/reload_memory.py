@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Peak memory (RSS) of FileStorage.reload(), whole-file json.load
+(previous loader) versus the streaming loader
+
+Usage: python3 -m benchmarks.reload_memory [count]
+"""
+
+import json
+import sys
+import tempfile
+import time
+from benchmarks.common import peak_rss, run_child, write_store
+
+
+def child(loader):
+    """Reload store.json (of the working directory) with a loader"""
+    import models  # file.json of the working directory is empty
+    from models.engine.file_storage import FileStorage
+
+    FileStorage._FileStorage__file_path = "store.json"
+    baseline = peak_rss()  # measured before any object is loaded
+    start = time.perf_counter()
+    if loader == "json.load":
+        with open("store.json", "r", encoding="utf-8") as file:
+            records = json.load(file)
+        classes = models.storage.get_app_classes()
+        objects = {
+            key: classes[value["__class__"]](**value)
+            for key, value in records.items()
+        }
+    else:
+        models.storage.reload()
+        objects = models.storage.all()
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        "loader": loader, "objects": len(objects), "seconds": seconds,
+        "peak_rss_mib": peak_rss(), "baseline_rss_mib": baseline,
+    }))
+
+
+def main(count):
+    """Write a store of count objects and reload it with both loaders"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_store(f"{tmp}/file.json", 0)
+        write_store(f"{tmp}/store.json", count)
+        for loader in ("json.load", "stream"):
+            result = run_child(
+                "benchmarks.reload_memory", ["--child", loader], tmp
+            )
+            print(
+                f"{result['loader']:>10}: {result['objects']} objects, "
+                f"{result['seconds']:.2f}s, peak RSS "
+                f"{result['peak_rss_mib']:.0f} MiB "
+                f"(baseline {result['baseline_rss_mib']:.0f} MiB)"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
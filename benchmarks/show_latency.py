@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""
+Time of a one-shot console command (echo "show ..." | console.py) on
+a store in single layout (JSON file) versus indexed layout
+
+Usage: python3 -m benchmarks.show_latency [count]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import ROOT, make_records, write_store
+from models import storage
+from models.engine.file_storage import FileStorage
+
+
+def show(cwd, layout, key):
+    """Run the console once, showing one object, get the elapsed time"""
+    class_name, _, id = key.partition(".")
+    env = dict(os.environ, PYTHONPATH=ROOT, HBNB_STORAGE_LAYOUT=layout)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "console.py")],
+        input=f"show {class_name} {id}\n", cwd=cwd, env=env, check=True,
+        stdout=subprocess.PIPE, text=True,
+    ).stdout
+    elapsed = time.perf_counter() - start
+    if id not in output:
+        raise RuntimeError(f"{key} not found: {output}")
+    return elapsed
+
+
+def main(count):
+    """Show the last object of a store of count objects in both layouts"""
+    key = None
+    for key, record in make_records(count):
+        pass
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json")
+        write_store(path, count)
+        # same objects in the indexed file
+        FileStorage._FileStorage__file_path = path
+        storage.reload()
+        FileStorage._FileStorage__layout = "indexed"
+        storage.compact()
+
+        print(f"{count} objects")
+        for layout in ("single", "indexed"):
+            elapsed = show(tmp, layout, key)
+            print(f"  {layout:>8}: {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
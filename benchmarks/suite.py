@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+"""
+Benchmark suite of the storage and console hot paths, on synthetic
+stores of each size (objects spread over all app classes):
+- console commands: create, show, update, destroy, all, count
+- FileStorage: reload, save (one change), save_all (whole store)
+- BaseModel: __init__ (from a stored dictionary), to_dict
+- HBNBCommand: parsing of method syntax commands (convert_command)
+and the peak memory (RSS) of each size, measured in its own process.
+The storage settings come from the environment (HBNB_STORAGE_*).
+
+Results are printed as JSON (or written to --output) and compared with
+a baseline: any timing slower than the baseline by more than the
+tolerance (or peak memory higher) is a regression, reported on stderr
+with a non-zero exit status.
+
+Usage: python3 -m benchmarks.suite [--counts 10000,100000]
+    [--repeat 10] [--output FILE] [--baseline FILE] [--save-baseline]
+    [--tolerance 0.25]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from benchmarks.common import (
+    ROOT, make_records, peak_rss, run_child, write_store
+)
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# differences under this many seconds are noise, never regressions
+MIN_DIFFERENCE = 0.001
+
+
+def best(function, repeat):
+    """Get the shortest time of repeat calls of function (in seconds)"""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(i)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def child(count, repeat):
+    """Time the hot paths on file.json (of the working directory) holding
+    count objects, print the results as JSON"""
+    from console import HBNBCommand
+    from models import storage
+
+    timings = {}
+    console = HBNBCommand()
+
+    def run(line):
+        """Run a console command, output discarded"""
+        with redirect_stdout(io.StringIO()):
+            console.onecmd(line)
+
+    timings["reload"] = best(lambda i: storage.reload(), min(repeat, 3))
+    ids = [key.partition(".")[2] for key in storage.all("User")][:repeat]
+    new_ids = []
+
+    def create(i):
+        """Create a user, keeping its id"""
+        with redirect_stdout(io.StringIO()) as output:
+            console.onecmd("create User")
+        new_ids.append(output.getvalue().strip())
+
+    timings["create"] = best(create, repeat)
+    timings["show"] = best(lambda i: run(f"show User {ids[i]}"), repeat)
+    timings["update"] = best(
+        lambda i: run(f'update User {ids[i]} first_name "Bob"'), repeat
+    )
+    timings["count"] = best(lambda i: run("count User"), repeat)
+    timings["all"] = best(lambda i: run("all User"), min(repeat, 3))
+    timings["destroy"] = best(
+        lambda i: run(f"destroy User {new_ids[i]}"), repeat
+    )
+
+    user = storage.get("User", ids[0])
+    timings["save"] = best(lambda i: user.save(), repeat)
+    timings["save_all"] = best(lambda i: storage.compact(), min(repeat, 3))
+
+    # per object / per command, over a batch
+    batch = 10000
+    classes = storage.get_app_classes()
+    records = [record for key, record in make_records(batch)]
+    objects = []
+    timings["init"] = best(
+        lambda i: objects.extend(
+            classes[record["__class__"]](**record) for record in records
+        ),
+        3,
+    ) / batch
+    timings["to_dict"] = best(
+        lambda i: [obj.to_dict() for obj in objects[:batch]], 3
+    ) / batch
+    lines = [f'User.update("{id}", "first_name", "Bob")' for id in ids]
+    lines = (lines * (batch // len(lines) + 1))[:batch]
+    timings["parse"] = best(
+        lambda i: [console.convert_command(line) for line in lines], 3
+    ) / batch
+
+    print(json.dumps({
+        "count": count, "timings": timings, "peak_rss_mib": peak_rss(),
+    }))
+
+
+def measure(counts, repeat):
+    """
+    Run the benchmarks of each store size, each in a fresh process
+
+    Args:
+        counts (list): store sizes (numbers of objects)
+        repeat (int): runs of each timed operation (the best is kept)
+    Returns:
+        dict - machine-readable results (see main)
+    """
+    results = {}
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_store(os.path.join(tmp, "file.json"), count)
+            result = run_child(
+                "benchmarks.suite",
+                ["--child", str(count), str(repeat)], tmp
+            )
+        results[str(count)] = {
+            "timings": result["timings"],
+            "peak_rss_mib": result["peak_rss_mib"],
+        }
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            name: value
+            for name, value in sorted(os.environ.items())
+            if name.startswith("HBNB_")
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline (store sizes and measures both have)
+
+    Args:
+        results (dict): see measure
+        baseline (dict): results of a previous run
+        tolerance (float): slowdown allowed (0.25: 25% slower)
+    Returns:
+        list - regressions, as readable lines
+    """
+    regressions = []
+    for count, result in results["results"].items():
+        base = baseline["results"].get(count)
+        if base is None:
+            continue
+        measures = dict(result["timings"], peak_rss_mib=result["peak_rss_mib"])
+        previous = dict(base["timings"], peak_rss_mib=base["peak_rss_mib"])
+        for name, value in measures.items():
+            old = previous.get(name)
+            if old is None or value <= old * (1 + tolerance):
+                continue
+            if name != "peak_rss_mib" and value - old < MIN_DIFFERENCE:
+                continue
+            regressions.append(
+                f"{count} objects, {name}: {value:.6g} "
+                f"(baseline {old:.6g}, {value / old - 1:+.0%})"
+            )
+    return regressions
+
+
+def main(argv):
+    """Run the suite, compare it with the baseline, get the exit status"""
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.suite")
+    parser.add_argument(
+        "--counts", default="10000,100000",
+        help="store sizes, comma separated (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10,
+        help="runs of each operation, the best is kept (default: "
+        "%(default)s)",
+    )
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument(
+        "--baseline", default=BASELINE,
+        help="results to compare with (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="save the results as the baseline (no comparison)",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="slowdown allowed before failing (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    counts = [int(count) for count in args.counts.split(",")]
+    results = measure(counts, args.repeat)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(
+            f"no baseline ({args.baseline}), run with --save-baseline",
+            file=sys.stderr,
+        )
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if regressions:
+        print(
+            f"{len(regressions)} regression(s) over the baseline",
+            file=sys.stderr,
+        )
+        return 1
+    print("no regression over the baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        sys.exit(main(sys.argv[1:]))
@@ -1,26 +1,217 @@
 #!/usr/bin/python3
 """This module contains the command interpreter class"""
 
+import argparse
 import cmd
 import json
+import os
 import re
+import sys
+import time
+from contextlib import contextmanager
+from console_stats import CommandStats
 from models import storage
+from models.engine.file_storage import StorageConflictError
+
+# patterns compiled once (not looked up for each command)
+# method syntax: <class_name>.<method>(<args>)
+METHOD_PATTERN = re.compile(r"(\w+)\.(\w+)(\((.*?)\))?$")
+# arguments of update with a dictionary: "<id>", {...}
+UPDATE_DICT_PATTERN = re.compile(r'^"([^"]+)", (\{.*\})$')
+# text inside double quotes
+QUOTED_PATTERN = re.compile(r'"([^"]*)"')
+# name of a command (first word)
+COMMAND_PATTERN = re.compile(r"\s*(\w*)")
+# a condition of the where command: <attribute> <operator> <value>,
+# the value being a number, a word or a double quoted string
+CONDITION_PATTERN = re.compile(
+    r'(\w+)\s*(==|!=|<=|>=|=|<|>)\s*("[^"]*"|[^\s",]+)'
+)
+# what separates the conditions
+SEPARATOR_PATTERN = re.compile(r"\s*(?:,|\band\b)?\s*")
 
 
 class HBNBCommand(cmd.Cmd):
     """Interpreter's command processor class"""
 
     prompt = "(hbnb) "
+    # per command figures (see CommandStats), measured when
+    # HBNB_CONSOLE_STATS=1 or a file to write them to on exit is set
+    stats_file = os.getenv("HBNB_CONSOLE_STATS_FILE")
+    stats = (
+        CommandStats()
+        if os.getenv("HBNB_CONSOLE_STATS") == "1" or stats_file
+        else None
+    )
+
+    def __init__(self, *args, **kwargs):
+        """Class constructor"""
+        super().__init__(*args, **kwargs)
+        if self.stats is not None:
+            self.stats.install(self, storage)
 
     def do_quit(self, args):
         """Exit the program"""
+        storage.flush()  # write deferred changes
+        self.dump_stats()
         return True
 
     def do_EOF(self, args):
         """Handle end of file character"""
         print()  # new line
+        storage.flush()  # write deferred changes
+        self.dump_stats()
         return True  # quit
 
+    def do_stats(self, args):
+        """Prints the figures of each command: time spent in total,
+        parsing, looking up storage and persisting, bytes written and
+        objects scanned (requires HBNB_CONSOLE_STATS=1)
+        Usage: stats OR stats json OR stats reset"""
+        if self.stats is None:
+            print("** stats disabled, set HBNB_CONSOLE_STATS=1 **")
+        elif args.strip() == "json":
+            print(json.dumps(self.stats.report()))
+        elif args.strip() == "reset":
+            self.stats.reset()
+        else:
+            print(self.stats.format())
+
+    def dump_stats(self):
+        """Writes the figures of each command to stats_file (if set)"""
+        if self.stats is not None and self.stats_file:
+            self.stats.dump(self.stats_file)
+
+    def do_begin(self, args):
+        """Starts a transaction, changes are written on commit
+        Usage: begin"""
+        if storage.in_transaction():
+            print("** transaction already in progress **")
+        else:
+            storage.begin()
+
+    def do_commit(self, args):
+        """Writes the changes of the transaction (all at once)
+        Usage: commit"""
+        if not storage.in_transaction():
+            print("** no transaction in progress **")
+        else:
+            storage.commit()
+
+    def do_rollback(self, args):
+        """Cancels the changes of the transaction
+        Usage: rollback"""
+        if not storage.in_transaction():
+            print("** no transaction in progress **")
+        else:
+            storage.rollback()
+
+    def do_snapshot(self, args):
+        """Saves a copy of all objects, or only of the ones changed since
+        a base snapshot (incremental), and prints its name
+        Usage: snapshot [<name>] [<base>]"""
+        args = args.split()
+        name = args[0] if args else None
+        base = args[1] if len(args) >= 2 else None
+        if not hasattr(storage, "snapshot"):
+            print("** snapshots not supported by this storage **")
+        elif storage.in_transaction():
+            print("** transaction in progress **")
+        elif name is not None and name in storage.snapshots():
+            print("** snapshot already exists **")
+        elif base is not None and base not in storage.snapshots():
+            print("** no snapshot found **")
+        else:
+            try:
+                print(storage.snapshot(name, base))
+            except ValueError as error:
+                print(f"** {error} **")
+
+    def do_restore(self, args):
+        """Replaces all objects with the ones of a snapshot
+        Usage: restore <name>"""
+        args = args.split()
+        if not hasattr(storage, "restore"):
+            print("** snapshots not supported by this storage **")
+        elif not args:
+            print("** snapshot name missing **")
+        elif args[0] not in storage.snapshots():
+            print("** no snapshot found **")
+        elif storage.in_transaction():
+            print("** transaction in progress **")
+        else:
+            try:
+                storage.restore(args[0])
+            except ValueError as error:  # one of its bases is missing
+                print(f"** {error} **")
+
+    def onecmd(self, line):
+        """Runs a command, reporting saves rejected by the storage"""
+        try:
+            if self.stats is None:
+                return super().onecmd(line)
+            command = COMMAND_PATTERN.match(line).group(1)
+            return self.stats.run(command, super().onecmd, line)
+        except StorageConflictError as error:
+            print(f"** {error} **")
+
+    def run_batch(self, file, commit_every=0):
+        """
+        Runs the commands of a file, one per line, as typed in the console
+        (same output, without prompts), the saves they make being written
+        at once at the end (see storage.deferred) and every commit_every
+        commands; prints a summary to stderr and writes the stats (see
+        dump_stats) unless a quit command did
+
+        Args:
+            file: text file of commands
+            commit_every (int): number of commands between two writes
+                (0: only at the end)
+        Returns:
+            int - number of commands run
+        """
+        flush_stats = getattr(storage, "flush_stats", None)
+        flushes = flush_stats()["flushes"] if flush_stats else 0
+        count = 0
+        stop = False
+        start = time.perf_counter()
+        # the last write is made when leaving storage.deferred
+        with self._reported_conflicts(), storage.deferred():
+            for line in file:
+                line = self.precmd(line.rstrip("\r\n"))
+                stop = self.postcmd(self.onecmd(line), line)
+                count += 1
+                if commit_every and count % commit_every == 0:
+                    self._flush_batch()
+                if stop:  # quit
+                    break
+        elapsed = time.perf_counter() - start
+        summary = (
+            f"batch: {count} commands in {elapsed:.3f}s"
+            f" ({count / elapsed if elapsed else 0:.0f} commands/s)"
+        )
+        if flush_stats:
+            summary += f", {flush_stats()['flushes'] - flushes} writes"
+        print(summary, file=sys.stderr)
+        if not stop:  # else dumped by quit
+            self.dump_stats()
+        return count
+
+    def _flush_batch(self):
+        """Writes deferred saves, reporting the ones rejected by the
+        storage (see _reported_conflicts)"""
+        with self._reported_conflicts():
+            storage.flush()
+
+    @contextmanager
+    def _reported_conflicts(self):
+        """Reports the saves rejected by the storage in a block (as
+        onecmd does) instead of raising"""
+        try:
+            yield
+        except StorageConflictError as error:
+            print(f"** {error} **")
+
     def emptyline(self):
         """Handle empty line + ENTER"""
         pass  # do nothing
@@ -37,17 +228,18 @@ class HBNBCommand(cmd.Cmd):
             return args
 
         # handle dictionary case Ex. ("id", {"name": "Julien"})
-        if cmd.split(" ")[0] == "update":
-            if len(cmd.split(" ")) >= 4:
+        words = cmd.split(" ")
+        if words[0] == "update":
+            if len(words) >= 4:
                 # RegEx = "id", dictionary
-                str_args = " ".join(cmd.split(" ")[2:])
-                match = re.search(r'^"([^"]+)", (\{.*\})$', str_args)
+                str_args = " ".join(words[2:])
+                match = UPDATE_DICT_PATTERN.search(str_args)
                 if match:
                     id = match.group(1)
                     dict_string = match.group(2)
                     # check if dictionary valid
                     if self.is_dictionary(dict_string):
-                        class_name = cmd.split(" ")[1]
+                        class_name = words[1]
                         self.update_with_dict(class_name, id, dict_string)
                         return ""
                 else:
@@ -92,9 +284,9 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = f"{args_list[0]}.{args_list[1]}"
-        if key in storage.all():
-            print(storage.all()[key])
+        obj = storage.get(args_list[0], args_list[1])
+        if obj is not None:
+            print(obj)
         else:
             print("** no instance found **")
 
@@ -115,37 +307,116 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = f"{args_list[0]}.{args_list[1]}"
-        if key in storage.all():
-            # remove instance from objects dictionary
-            del storage.all()[key]
+        obj = storage.get(args_list[0], args_list[1])
+        if obj is not None:
+            # remove instance from storage
+            storage.delete(obj)
             storage.save()
         else:
             print("** no instance found **")
 
     def do_all(self, args):
         """Prints all string representation of all instances
-        based or not on the class name
-        Usage: all OR all <class_name>"""
-        if args == "" or args is None:  # command = all
-            # print all objects (any type)
-            obj_list = [str(object) for object in storage.all().values()]
-            print(obj_list)
+        based or not on the class name, a page of them with limit/offset
+        Usage: all [<class_name>] [limit=<number>] [offset=<number>]"""
+        class_name = None
+        options = {"offset": 0, "limit": None}
+        for arg in (args or "").split():
+            name, equal, value = arg.partition("=")
+            if not equal:
+                if class_name is None:
+                    class_name = arg
+            elif name in options and value.isdigit():
+                options[name] = int(value)
+            else:
+                print(f"** invalid option: {arg} **")
+                return
+
+        if class_name is not None:
+            classes = storage.get_app_classes()
+            if class_name not in classes:
+                print("** class doesn't exist **")
+                return
+
+        self.print_objects(storage.iter_all(class_name, **options))
+
+    def do_where(self, args):
+        """Prints the instances of a class meeting all conditions on their
+        attributes (operators: == != < <= > >=), values being numbers,
+        words or double quoted strings
+        Usage: where <class_name> <attribute> <operator> <value>
+        [and <attribute> <operator> <value> ...] [limit=<n>] [offset=<n>]
+        Ex: where Place price_by_night < 100 and city_id == "1234"
+        """
+        if args == "" or args is None:
+            print("** class name missing **")
             return
 
-        args_list = args.split(" ")
+        class_name, _, rest = args.strip().partition(" ")
         classes = storage.get_app_classes()
-        if args_list[0] not in classes:
+        if class_name not in classes:
             print("** class doesn't exist **")
             return
 
-        # print all instances of the class provided
-        obj_list = [
-            str(object)
-            for object in storage.all().values()
-            if type(object) == classes[args_list[0]]
-        ]
-        print(obj_list)
+        conditions = []
+        options = {"offset": 0, "limit": None}
+        rest = rest.strip()
+        position = 0
+        while position < len(rest):
+            match = CONDITION_PATTERN.match(rest, position)
+            if not match:
+                print(f"** invalid condition: {rest[position:]} **")
+                return
+            attr, op, value = match.groups()
+            if attr in options and op == "=":
+                if not value.isdigit():
+                    print(f"** invalid option: {match.group()} **")
+                    return
+                options[attr] = int(value)
+            else:
+                conditions.append((attr, op, self.parse_value(value)))
+            position = SEPARATOR_PATTERN.match(rest, match.end()).end()
+        if not conditions:
+            print("** condition missing **")
+            return
+
+        self.print_objects(storage.where(class_name, conditions, **options))
+
+    def print_objects(self, objects):
+        """
+        Prints objects as a list of their strings (as print() of the
+        list would), written one object at a time: memory doesn't grow
+        with the number of objects and output starts right away
+
+        Args:
+            objects (iterable): (key, object) pairs
+        """
+        write = sys.stdout.write
+        write("[")
+        for i, (key, obj) in enumerate(objects):
+            if i:
+                write(", ")
+            write(repr(str(obj)))
+        write("]\n")
+
+    def parse_value(self, value):
+        """
+        Get the value of a where condition
+
+        Args:
+            value (str): a double quoted string, a number or a word
+        Returns:
+            str | int | float - the string without quotes, the number,
+                or the word
+        """
+        if value.startswith('"'):
+            return value[1:-1]
+        for cast in (int, float):
+            try:
+                return cast(value)
+            except ValueError:
+                pass
+        return value
 
     def do_update(self, args):
         """Updates an instance based on the class name and id
@@ -165,15 +436,14 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = f"{args_list[0]}.{args_list[1]}"  # <class_name>.id
-        if key in storage.all():
+        obj = storage.get(args_list[0], args_list[1])
+        if obj is not None:
             if len(args_list) < 3:
                 print("** attribute name missing **")
             elif len(args_list) < 4:
                 print("** value missing **")
             else:  # all the required arguments exist
                 # update the object attribute value (with valid type)
-                obj = storage.all()[key]
                 attr = args_list[2]
                 # cast the value before assign it to the object
                 attr_type = (
@@ -197,12 +467,7 @@ class HBNBCommand(cmd.Cmd):
         if args_list[0] not in classes:
             print("** class doesn't exist **")
         else:
-            count = 0
-            # count how many instances simply by checking dictionary keys
-            for key in storage.all().keys():
-                if key.startswith(f"{args_list[0]}."):
-                    count += 1
-            print(count)
+            print(storage.count(args_list[0]))
 
     def get_attribute_value(self, args_list):
         """
@@ -222,7 +487,7 @@ class HBNBCommand(cmd.Cmd):
             # join arguments starting from argument at index 3
             value = " ".join(args_list[3:])
             # search using regex for text inside double quotes
-            match = re.search(r'"([^"]*)"', value)
+            match = QUOTED_PATTERN.search(value)
             # get the text inside double quotes if there is a match
             # otherwise, get the first word as value attribute
             value = match.group(1) if match else args_list[3]
@@ -239,7 +504,7 @@ class HBNBCommand(cmd.Cmd):
             str - command string (normal syntax)
         """
         # RegEx = class.method(args)
-        match = re.search(r"(\w+)\.(\w+)(\((.*?)\))?$", command)
+        match = METHOD_PATTERN.search(command)
         if not match:
             return None  # doesn't match the method syntax
 
@@ -247,7 +512,7 @@ class HBNBCommand(cmd.Cmd):
         class_name = match.group(1)
         args = match.group(4) if match.group(4) else ""
 
-        if method == "update":
+        if method in ("update", "where"):
             return f"{method} {class_name} {args}"
 
         # create the command using the extracted strings from method syntax
@@ -274,9 +539,8 @@ class HBNBCommand(cmd.Cmd):
         """Updates an instance using a dictionary with key,value pairs
         Ex. {"name": "Julien", "school": "Holberthon"}"""
 
-        key = f"{class_name}.{id}"  # <class_name>.id
-        if key in storage.all():
-            obj = storage.all()[key]  # target object
+        obj = storage.get(class_name, id)  # target object
+        if obj is not None:
             dict = json.loads(dict_string)
             for k, v in dict.items():
                 # update the object attribute value (with valid type)
@@ -290,5 +554,27 @@ class HBNBCommand(cmd.Cmd):
             print("** no instance found **")
 
 
+def main(argv):
+    """Runs the console: interactive, or on a batch of commands"""
+    parser = argparse.ArgumentParser(description="AirBnB clone console")
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        type=argparse.FileType("r", encoding="utf-8"),
+        help="run the commands of FILE (- for stdin), one per line",
+    )
+    parser.add_argument(
+        "--commit-every", metavar="N", type=int, default=0,
+        help="with --batch, write the changes every N commands "
+        "(default: only at the end)",
+    )
+    args = parser.parse_args(argv)
+    console = HBNBCommand()
+    if args.batch is None:
+        console.cmdloop()
+    else:
+        with args.batch as file:  # an unreadable one is a usage error
+            console.run_batch(file, args.commit_every)
+
+
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
+    main(sys.argv[1:])
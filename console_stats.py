@@ -0,0 +1,261 @@
+#!/usr/bin/python3
+"""This module contains the console instrumentation (CommandStats)"""
+
+import json
+import time
+from functools import wraps
+
+# time spent in each phase of a command, in microseconds
+PHASES = ("total", "parse", "lookup", "persist")
+
+# storage methods timed as lookups
+LOOKUPS = ("all", "get", "count", "lookup")
+
+# storage methods iterating over objects, timed as lookups too
+ITERATORS = ("iter_all", "where")
+
+
+class Histogram:
+    """Distribution of positive integers, in power of two buckets"""
+
+    def __init__(self):
+        """Class constructor"""
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = {}  # bit length: number of values
+
+    def add(self, value):
+        """Adds a value"""
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        bits = value.bit_length()
+        self.buckets[bits] = self.buckets.get(bits, 0) + 1
+
+    def percentile(self, percent):
+        """Get the upper bound of the bucket holding a percentile"""
+        rank = self.count * percent / 100
+        seen = 0
+        for bits in sorted(self.buckets):
+            seen += self.buckets[bits]
+            if seen >= rank:
+                return min((1 << bits) - 1, self.max)
+        return self.max
+
+    def to_dict(self):
+        """Get the figures of the distribution"""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": {
+                str((1 << bits) - 1): number
+                for bits, number in sorted(self.buckets.items())
+            },
+        }
+
+
+class CommandStats:
+    """
+    Per command figures of the console: time spent parsing, looking up
+    storage and persisting, bytes written and objects scanned, as one
+    histogram per command and measure (one value per command run).
+    Measures come from wrappers installed on the console and storage
+    methods (see install), nothing runs when it's not installed. Bytes
+    and objects are counted by the storages (flush_stats and
+    objects_scanned), those that don't count them report 0.
+    """
+
+    def __init__(self):
+        """Class constructor"""
+        self.__commands = {}  # command: measure: Histogram
+        self.__current = None  # measures of the running command
+        self.__storages = []  # storages already wrapped
+
+    def install(self, console, storage):
+        """
+        Wraps the parsing methods of a console, and the lookup and save
+        methods of a storage (once per storage)
+
+        Args:
+            console (HBNBCommand): console to measure
+            storage: storage engine the console uses
+        """
+        for name in ("parseline", "convert_command"):
+            method = getattr(console, name)
+            setattr(console, name, self.__timed(method, "parse"))
+        if any(installed is storage for installed in self.__storages):
+            return
+        self.__storages.append(storage)
+        for name in LOOKUPS:
+            method = getattr(storage, name)
+            setattr(storage, name, self.__timed(method, "lookup"))
+        for name in ITERATORS:
+            if hasattr(storage, name):
+                method = getattr(storage, name)
+                setattr(storage, name, self.__iterate(method))
+        storage.save = self.__save(storage)
+
+    def uninstall(self):
+        """Removes the wrappers of the storages (see install)"""
+        for storage in self.__storages:
+            for name in LOOKUPS + ITERATORS + ("save",):
+                vars(storage).pop(name, None)
+        self.__storages = []
+
+    def run(self, command, function, *args):
+        """
+        Runs a console command, measuring it (commands run by another
+        one are part of it, and name it)
+
+        Args:
+            command (str): name of the command
+            function: runs the command
+            args: arguments of function
+        Returns:
+            what function returns
+        """
+        if self.__current is not None:  # nested command
+            self.__current["name"] = command
+            return function(*args)
+        current = dict.fromkeys(PHASES, 0)
+        current.update(name=command, bytes_written=0, objects_scanned=0)
+        self.__current = current
+        scanned = self.__scanned()
+        start = time.perf_counter_ns()
+        try:
+            return function(*args)
+        finally:
+            current["total"] = time.perf_counter_ns() - start
+            current["objects_scanned"] = self.__scanned() - scanned
+            self.__current = None
+            measures = self.__commands.setdefault(current.pop("name"), {})
+            for measure, value in current.items():
+                if measure in PHASES:
+                    value //= 1000  # microseconds
+                measures.setdefault(measure, Histogram()).add(value)
+
+    def reset(self):
+        """Forgets the figures measured so far"""
+        self.__commands = {}
+
+    def report(self):
+        """
+        Get the figures measured so far
+
+        Returns:
+            dict - command: measure (total, parse, lookup, persist in
+                microseconds, bytes_written, objects_scanned): figures
+                of its histogram
+        """
+        return {
+            command: {
+                measure: histogram.to_dict()
+                for measure, histogram in measures.items()
+            }
+            for command, measures in sorted(self.__commands.items())
+        }
+
+    def format(self):
+        """Get the figures as a readable table (one line per command)"""
+        columns = ("command", "runs") + PHASES + ("bytes", "scanned")
+        rows = [columns]
+        for command, measures in self.report().items():
+            row = [command, measures["total"]["count"]]
+            for phase in PHASES:
+                figures = measures[phase]
+                row.append(f"{figures['p50']}/{figures['p99']}")
+            row.append(measures["bytes_written"]["total"])
+            row.append(measures["objects_scanned"]["total"])
+            rows.append(row)
+        widths = [
+            max(len(str(row[i])) for row in rows) for i in range(len(columns))
+        ]
+        lines = [
+            "  ".join(
+                f"{value:<{width}}" if i == 0 else f"{value:>{width}}"
+                for i, (value, width) in enumerate(zip(row, widths))
+            )
+            for row in rows
+        ]
+        lines.append(
+            "(times in microseconds, p50/p99; bytes written and objects "
+            "scanned in total)"
+        )
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Writes the figures (see report) to a JSON file"""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def __add(self, measure, value):
+        """Adds to a measure of the running command (if any)"""
+        current = self.__current
+        if current is not None:
+            current[measure] += value
+
+    def __timed(self, function, phase):
+        """Get a wrapper of function adding its time to a phase"""
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.__add(phase, time.perf_counter_ns() - start)
+
+        return timed
+
+    def __scanned(self):
+        """Get the number of objects the wrapped storages examined so far
+        (see objects_scanned)"""
+        return sum(
+            storage.objects_scanned()
+            for storage in self.__storages
+            if hasattr(storage, "objects_scanned")
+        )
+
+    def __iterate(self, function):
+        """Get a wrapper of a storage method iterating over objects,
+        timing each step"""
+
+        @wraps(function)
+        def iterate(*args, **kwargs):
+            iterator = iter(function(*args, **kwargs))
+            while True:
+                start = time.perf_counter_ns()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.__add("lookup", time.perf_counter_ns() - start)
+                yield item
+
+        return iterate
+
+    def __save(self, storage):
+        """Get a wrapper of the save method of a storage, counting the
+        bytes written meanwhile (storages having flush_stats)"""
+        timed = self.__timed(storage.save, "persist")
+        flush_stats = getattr(storage, "flush_stats", None)
+
+        @wraps(storage.save)
+        def save():
+            if flush_stats is None:
+                return timed()
+            written = flush_stats()["bytes"]
+            try:
+                return timed()
+            finally:
+                self.__add("bytes_written", flush_stats()["bytes"] - written)
+
+        return save
@@ -1,10 +1,17 @@
-#!/usr/bin/python3
-"""Initialize models package"""
-
-
-from models.engine.file_storage import FileStorage
-
-# create an instance of the desired storage type
-storage = FileStorage()
-# load saved objects from storage
-storage.reload()
+#!/usr/bin/python3
+"""Initialize models package"""
+
+import atexit
+import os
+
+# create an instance of the desired storage type
+if os.getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
+# load saved objects from storage
+storage.reload()
+# write deferred changes (if any) before the interpreter exits
+atexit.register(storage.flush)
@@ -1,55 +1,244 @@
-#!/usr/bin/python3
-"""This module contains the BaseModel class representation"""
-
-import uuid
-from datetime import datetime
-from models import storage
-
-
-class BaseModel:
-    """BaseModel class representation,
-    A base class for all other app classes (sub-classes)"""
-
-    def __init__(self, *args, **kwargs):
-        """
-        Class constructor
-
-        Args:
-            *args: list of variable arguments
-            **kwargs: dictionnay of arguments (key:values pairs)
-        """
-        if kwargs and kwargs is not None:  # not empty not None
-            for key, value in kwargs.items():
-                if key == "created_at" or key == "updated_at":
-                    # convert to datatime type
-                    self.__dict__[key] = datetime.strptime(
-                        value, "%Y-%m-%dT%H:%M:%S.%f"
-                    )
-                elif key != "__class__":  # other attributes except __class__
-                    self.__dict__[key] = kwargs[key]
-        else:  # kwargs not provided
-            self.id = str(uuid.uuid4())
-            self.created_at = datetime.now()
-            self.updated_at = datetime.now()
-            storage.new(self)
-
-    def __str__(self):
-        """The official string representation"""
-        rep = f"[{self.__class__.__name__}] ({self.id}) {self.__dict__}"
-        return rep
-
-    def save(self):
-        """Updates the public instance attribute updated_at
-        with the current datetime"""
-        self.updated_at = datetime.now()
-        storage.save()
-
-    def to_dict(self):
-        """Returns a dictionary containing all keys/values
-        of __dict__ of an instance"""
-        dict = self.__dict__.copy()
-        # add some items to the dictionary
-        dict["__class__"] = self.__class__.__name__
-        dict["created_at"] = self.created_at.isoformat()
-        dict["updated_at"] = self.updated_at.isoformat()
-        return dict
+#!/usr/bin/python3
+"""This module contains the BaseModel class representation"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+from models import storage
+from models.engine.codecs import json_default
+
+# compact mode: instances keep their attributes in slots instead of a
+# __dict__, which takes a lot less memory per instance (see ModelMeta)
+COMPACT_MODELS = os.getenv("HBNB_COMPACT_MODELS") == "1"
+
+
+class CompactAttributes:
+    """Attribute access of compact instances: class attributes are the
+    defaults of their slots, attributes that have no slot (ex. added by
+    the update command) are kept in an overflow dictionary"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        """Get a default or an overflow attribute (unset slot/no slot)"""
+        if name != "_overflow":
+            if name in type(self)._defaults:
+                return type(self)._defaults[name]
+            overflow = getattr(self, "_overflow", None)
+            if overflow and name in overflow:
+                return overflow[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
+    def __setattr__(self, name, value):
+        """Set an attribute in its slot, or in the overflow dictionary"""
+        if name in type(self)._fields:
+            object.__setattr__(self, name, value)
+            return
+        overflow = getattr(self, "_overflow", None)
+        if overflow is None:
+            overflow = {}
+            object.__setattr__(self, "_overflow", overflow)
+        overflow[name] = value
+
+    def __delattr__(self, name):
+        """Delete an attribute from its slot or the overflow dictionary"""
+        if name in type(self)._fields:
+            object.__delattr__(self, name)
+        elif name in (getattr(self, "_overflow", None) or {}):
+            del self._overflow[name]
+        else:
+            raise AttributeError(name)
+
+    @property
+    def __dict__(self):
+        """Get the attributes set on the instance (as a new dictionary,
+        changing it doesn't change the instance)"""
+        attributes = {}
+        for name in type(self)._fields:
+            try:
+                attributes[name] = object.__getattribute__(self, name)
+            except AttributeError:  # unset slot
+                pass
+        attributes.update(getattr(self, "_overflow", None) or {})
+        return attributes
+
+
+class ModelMeta(type):
+    """
+    Metaclass of the app classes. In compact mode, the class attributes
+    of each model become slots of its instances and their values the
+    defaults of these slots (see CompactAttributes)
+    """
+
+    # class attributes describing the class itself, never slots
+    class_only = ("indexed_attributes",)
+
+    def __new__(mcs, name, bases, namespace):
+        """Creates a model class (with slots in compact mode)"""
+        if not COMPACT_MODELS:
+            return super().__new__(mcs, name, bases, namespace)
+
+        fields = {}
+        defaults = {}
+        for base in bases:
+            fields.update(getattr(base, "_fields", {}))
+            defaults.update(getattr(base, "_defaults", {}))
+        if not any(isinstance(base, ModelMeta) for base in bases):
+            # root class (BaseModel)
+            bases += (CompactAttributes,)
+            slots = ["id", "created_at", "updated_at", "_overflow", "__json"]
+        else:
+            slots = []
+        for key, value in list(namespace.items()):
+            if (
+                key.startswith("_")
+                or key in mcs.class_only
+                or callable(value)
+                or isinstance(value, (property, classmethod, staticmethod))
+            ):
+                continue
+            defaults[key] = namespace.pop(key)
+            slots.append(key)
+        namespace["__slots__"] = tuple(slots)
+        cls = super().__new__(mcs, name, bases, namespace)
+        # attribute name: None (an ordered set) of all the slots
+        fields.update(dict.fromkeys(slots))
+        fields.pop("_overflow", None)
+        fields.pop("__json", None)
+        cls._fields = fields
+        cls._defaults = defaults
+        return cls
+
+
+class BaseModel(metaclass=ModelMeta):
+    """BaseModel class representation,
+    A base class for all other app classes (sub-classes)"""
+
+    # __json: JSON of to_dict(), cached until an attribute is set (a slot,
+    # so it's not part of the instance attributes)
+    __slots__ = ("__json", "__dict__", "__weakref__")
+
+    def __init__(self, *args, **kwargs):
+        """
+        Class constructor
+
+        Args:
+            *args: list of variable arguments
+            **kwargs: dictionnay of arguments (key:values pairs)
+        """
+        if kwargs and kwargs is not None:  # not empty not None
+            for key, value in kwargs.items():
+                if key == "created_at" or key == "updated_at":
+                    # convert to datatime type
+                    # (binary storage formats may keep datetimes as is)
+                    if not isinstance(value, datetime):
+                        value = datetime.strptime(
+                            value, "%Y-%m-%dT%H:%M:%S.%f"
+                        )
+                    setattr(self, key, value)
+                elif key != "__class__":  # other attributes except __class__
+                    setattr(self, key, kwargs[key])
+        else:  # kwargs not provided
+            self.id = str(uuid.uuid4())
+            self.created_at = datetime.now()
+            self.updated_at = datetime.now()
+            storage.new(self)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build instances from stored dictionaries (to_dict() output) in
+        one go, much faster than calling cls(**record) for each of them
+
+        Args:
+            records (iterable): object dictionaries, they are consumed
+                (each one becomes the __dict__ of its instance)
+        Returns:
+            list - instances, in the same order as records
+        """
+        new = object.__new__
+        if not COMPACT_MODELS:
+            # sets __dict__ without going through __setattr__
+            set_dict = BaseModel.__dict__["__dict__"].__set__
+        parse = datetime.fromisoformat  # C parser, unlike strptime
+        objects = []
+        append = objects.append
+        for record in records:
+            record.pop("__class__", None)
+            # binary storage formats may keep datetimes as is
+            created_at = record["created_at"]
+            if created_at.__class__ is str:
+                record["created_at"] = parse(created_at)
+            updated_at = record["updated_at"]
+            if updated_at.__class__ is str:
+                record["updated_at"] = parse(updated_at)
+            obj = new(cls)
+            if COMPACT_MODELS:  # no __dict__, fill the slots
+                for key, value in record.items():
+                    setattr(obj, key, value)
+            else:
+                set_dict(obj, record)
+            append(obj)
+        return objects
+
+    @classmethod
+    def attribute_default(cls, name):
+        """Get the class default value of an attribute (or None)"""
+        if COMPACT_MODELS:  # class attributes are slots
+            return cls._defaults.get(name)
+        return getattr(cls, name, None)
+
+    def __setattr__(self, name, value):
+        """Sets an attribute (the object has changed since it was last
+        serialized, see to_json)"""
+        super().__setattr__(name, value)
+        object.__setattr__(self, "_BaseModel__json", None)
+
+    def __delattr__(self, name):
+        """Deletes an attribute (see __setattr__)"""
+        super().__delattr__(name)
+        object.__setattr__(self, "_BaseModel__json", None)
+
+    def __str__(self):
+        """The official string representation"""
+        rep = f"[{self.__class__.__name__}] ({self.id}) {self.__dict__}"
+        return rep
+
+    def save(self):
+        """Updates the public instance attribute updated_at
+        with the current datetime"""
+        self.updated_at = datetime.now()
+        storage.mark_dirty(self)
+        storage.save()
+
+    def to_json(self):
+        """Returns the JSON of to_dict(), only encoded again when an
+        attribute was set since the last call (objects holding lists,
+        dictionaries or sets are encoded on each call, these can change
+        in place)"""
+        try:
+            text = self.__json
+        except AttributeError:  # never serialized
+            text = None
+        if text is None:
+            record = self.to_dict()
+            text = json.dumps(record, default=json_default)
+            if not any(
+                isinstance(value, (list, dict, set))
+                for value in record.values()
+            ):
+                object.__setattr__(self, "_BaseModel__json", text)
+        return text
+
+    def to_dict(self):
+        """Returns a dictionary containing all keys/values
+        of __dict__ of an instance"""
+        dict = self.__dict__.copy()
+        # add some items to the dictionary
+        dict["__class__"] = self.__class__.__name__
+        dict["created_at"] = self.created_at.isoformat()
+        dict["updated_at"] = self.updated_at.isoformat()
+        return dict
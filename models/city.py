@@ -1,11 +1,14 @@
-#!/usr/bin/python3
-"""This module contains the City class representation"""
-
-from models.base_model import BaseModel
-
-
-class City(BaseModel):
-    """City class representation"""
-
-    state_id = ""
-    name = ""
+#!/usr/bin/python3
+"""This module contains the City class representation"""
+
+from models.base_model import BaseModel
+
+
+class City(BaseModel):
+    """City class representation"""
+
+    # attributes FileStorage keeps a lookup index for
+    indexed_attributes = ("state_id",)
+
+    state_id = ""
+    name = ""
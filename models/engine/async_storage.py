@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+"""This module contains AsyncStorage class"""
+
+import asyncio
+
+
+class _SaveQueue:
+    """Save requests of an event loop, waiting for the next write"""
+
+    def __init__(self, loop):
+        """
+        Class constructor
+
+        Args:
+            loop: event loop the requests come from
+        """
+        self.loop = loop
+        self.next = None  # future of the next write (None: not requested)
+        self.task = None  # task writing, while there are requests
+        self.waiting = 0  # coroutines waiting for a write
+
+
+class AsyncStorage:
+    """
+    Mixin giving a storage engine asyncio methods, which run its blocking
+    methods (serialization and file I/O) in the loop's default executor
+    - saves requested while a write is running share the next write
+      (never more than one write running and one waiting)
+    - asave() returns once the changes made before it are written, so
+      callers can't get ahead of the disk (see also pending_saves)
+    """
+
+    __queue = None
+
+    async def asave(self):
+        """Saves the changes (see save) without blocking the event loop"""
+        queue = self.__save_queue()
+        if queue.next is None:
+            queue.next = queue.loop.create_future()
+            if queue.task is None:
+                queue.task = queue.loop.create_task(self.__write(queue))
+        future = queue.next
+        queue.waiting += 1
+        try:
+            # a cancelled caller doesn't cancel the write others wait for
+            await asyncio.shield(future)
+        finally:
+            queue.waiting -= 1
+
+    async def aflush(self):
+        """Writes deferred changes (see flush) without blocking"""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    async def areload(self):
+        """Reloads the stored objects (see reload) without blocking"""
+        await asyncio.get_running_loop().run_in_executor(None, self.reload)
+
+    async def aall(self, cls=None, batch_size=1000):
+        """
+        Iterate over the objects in storage, giving control back to the
+        event loop after each batch
+
+        Args:
+            cls (type | str): only the instances of this class
+            batch_size (int): number of objects between two pauses
+        Yields:
+            tuple - (key, object), objects removed meanwhile are skipped
+        """
+        objects = self.all(cls)
+        keys = list(objects)
+        for start in range(0, len(keys), batch_size):
+            for key in keys[start:start + batch_size]:
+                obj = objects.get(key)
+                if obj is not None:
+                    yield key, obj
+            await asyncio.sleep(0)
+
+    def pending_saves(self):
+        """Get the number of asave() calls waiting for a write, a growing
+        number means writes fall behind"""
+        queue = self.__queue
+        return queue.waiting if queue is not None else 0
+
+    def __save_queue(self):
+        """Get the save requests of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self.__queue is None or self.__queue.loop is not loop:
+            self.__queue = _SaveQueue(loop)
+        return self.__queue
+
+    async def __write(self, queue):
+        """Writes as long as saves are requested (runs as a task)"""
+        try:
+            while queue.next is not None:
+                future, queue.next = queue.next, None
+                try:
+                    await queue.loop.run_in_executor(None, self.save)
+                except Exception as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(None)
+        finally:
+            queue.task = None
@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""This module contains the serialization formats of storage files"""
+
+import io
+import json
+import marshal
+import pickle
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from models.engine.json_stream import iter_json_object
+
+# binary storage files start with this header, followed by the codec name
+# JSON files have no header (they start with "{")
+HEADER = b"#HBNB "
+
+
+def json_default(value):
+    """Serializes datetimes (kept by the pickle codec) as ISO strings"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class JSONCodec:
+    """JSON text, the default format (no header, read as a stream)"""
+
+    name = "json"
+    # decodes a whole file's content (after the header) at once, a stdlib
+    # function (see FileStorage._iter_shards)
+    loads = staticmethod(json.loads)
+
+    def dump(self, records, file):
+        """
+        Writes stored objects to a file
+
+        Args:
+            records (dict): key: object dictionary
+            file: binary file opened for writing
+        """
+        file.write(json.dumps(records, default=json_default).encode("utf-8"))
+
+    def dump_fragments(self, fragments, file):
+        """
+        Writes stored objects already encoded, same output as dump(),
+        an object at a time (the file's content is never held at once)
+
+        Args:
+            fragments (dict): key: JSON of the object dictionary
+            file: binary file opened for writing
+        """
+        file.write(b"{")
+        separator = ""
+        for key, fragment in fragments.items():
+            key = encode_basestring_ascii(key)
+            file.write(f"{separator}{key}: {fragment}".encode("utf-8"))
+            separator = ", "
+        file.write(b"}")
+
+    def load(self, file):
+        """
+        Reads stored objects from a file (after the header)
+
+        Args:
+            file: binary file opened for reading
+        Yields:
+            tuple - (key, object dictionary)
+        """
+        text = io.TextIOWrapper(file, encoding="utf-8")
+        try:
+            yield from iter_json_object(text)
+        finally:
+            text.detach()  # the caller closes the binary file
+
+
+class PickleCodec:
+    """Pickle (protocol 5) with created_at/updated_at kept as datetimes,
+    so they are never re-parsed. Only load files you trust."""
+
+    name = "pickle"
+    loads = staticmethod(pickle.loads)
+
+    def dump(self, records, file):
+        """Writes stored objects to a file (see JSONCodec.dump)"""
+        native = {}
+        for key, record in records.items():
+            record = record.copy()
+            for attr in ("created_at", "updated_at"):
+                if isinstance(record.get(attr), str):
+                    record[attr] = datetime.fromisoformat(record[attr])
+            native[key] = record
+        file.write(HEADER + b"pickle\n")
+        pickle.dump(native, file, protocol=5)
+
+    def load(self, file):
+        """Reads stored objects from a file (see JSONCodec.load)"""
+        yield from pickle.load(file).items()
+
+
+class MarshalCodec:
+    """marshal, the fastest format for plain values (strings, numbers,
+    lists, dicts), tied to the Python version that wrote it"""
+
+    name = "marshal"
+    loads = staticmethod(marshal.loads)
+
+    def dump(self, records, file):
+        """Writes stored objects to a file (see JSONCodec.dump)"""
+        try:
+            data = marshal.dumps(records)
+        except ValueError:  # datetimes read from a pickle file
+            data = marshal.dumps(json.loads(
+                json.dumps(records, default=json_default)
+            ))
+        file.write(HEADER + b"marshal\n")
+        file.write(data)
+
+    def load(self, file):
+        """Reads stored objects from a file (see JSONCodec.load)"""
+        yield from marshal.load(file).items()
+
+
+CODECS = {
+    codec.name: codec for codec in (JSONCodec(), PickleCodec(), MarshalCodec())
+}
+
+
+def detect_codec(file):
+    """
+    Get the codec of a storage file from its header, the file is then
+    positioned at the start of the encoded objects
+
+    Args:
+        file: binary file opened for reading (at the start)
+    Returns:
+        codec object
+    Raises:
+        ValueError: if the header names an unknown codec
+    """
+    if not file.peek(len(HEADER)).startswith(HEADER):
+        return CODECS["json"]
+    name = file.readline()[len(HEADER):].strip().decode("ascii")
+    if name not in CODECS:
+        raise ValueError(f"Unknown storage format: {name}")
+    return CODECS[name]
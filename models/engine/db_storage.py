@@ -0,0 +1,482 @@
+#!/usr/bin/python3
+"""This module contains DBStorage class"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from models.engine.async_storage import AsyncStorage
+from models.engine.query import check_conditions, matches, page
+
+
+class DBStorage(AsyncStorage):
+    """
+    This class is responsible for handling app storage in a SQLite
+    database, with the same interface as FileStorage
+    - each object is a row of the objects table (class, id, JSON data)
+    - new/changed/deleted objects are written to the current transaction
+      right away, save() commits it
+    - lookups by class, id or indexed attribute are indexed SQL queries
+    - begin() opens a transaction, only committed by commit()
+    - can be used from several threads, which share the connection one
+      at a time
+    - has asyncio versions of save/flush/reload (see AsyncStorage)
+    - optionally keeps only the most recently used instances
+    """
+
+    __db_path = os.getenv("HBNB_DB_PATH", "hbnb.db")
+    # maximum number of instances kept (0: no limit), see FileStorage
+    __cache_size = int(os.getenv("HBNB_STORAGE_CACHE_SIZE", "0"))
+
+    def __init__(self):
+        """Class constructor"""
+        self.__connection = None
+        # key: object, instances already built (least recently used first)
+        self.__objects = OrderedDict()
+        # instances evicted from __objects but still used elsewhere
+        self.__evicted = weakref.WeakValueDictionary()
+        self.__untracked = set()  # evicted keys of compact instances
+        self.__stats = dict(hits=0, misses=0, evictions=0)
+        self.__in_transaction = False
+        self.__deferred = 0  # nested deferred() blocks running
+        self.__lock = threading.RLock()  # guards the connection and above
+
+    def all(self, cls=None):
+        """
+        Return objects dictionary
+
+        Args:
+            cls (type | str): only return instances of this class
+        Returns:
+            dict - key: object
+        """
+        with self.__lock:
+            if cls is None:
+                rows = self.__connection.execute(
+                    "SELECT class, id, data FROM objects ORDER BY rowid"
+                )
+            else:
+                rows = self.__connection.execute(
+                    "SELECT class, id, data FROM objects WHERE class = ?"
+                    " ORDER BY rowid",
+                    (self._class_name(cls),),
+                )
+            return {
+                f"{class_name}.{id}": self._build(class_name, id, data)
+                for class_name, id, data in rows
+            }
+
+    def iter_all(self, cls=None, offset=0, limit=None, batch_size=1000):
+        """
+        Iterate over the objects in storage, in the same order as all(),
+        reading them a batch at a time
+
+        Args:
+            cls (type | str): only the instances of this class
+            offset (int): number of objects skipped first
+            limit (int): maximum number of objects (None: no limit)
+            batch_size (int): number of rows read at once
+        Yields:
+            tuple - (key, object)
+        """
+        conditions, params = [], []
+        if cls is not None:
+            conditions.append("class = ?")
+            params.append(self._class_name(cls))
+        return self._iter_rows(conditions, params, offset, limit, batch_size)
+
+    def where(self, cls, conditions, offset=0, limit=None, batch_size=1000):
+        """
+        Iterate over the instances of a class meeting all conditions (see
+        models.engine.query), the ones SQLite can check are part of the
+        query (using the attribute indexes for ==), rows are read a batch
+        at a time
+
+        Args:
+            cls (type | str): class of the instances
+            conditions (iterable): (attribute, operator, value) tuples
+            offset (int): number of matching objects skipped first
+            limit (int): maximum number of objects (None: no limit)
+            batch_size (int): number of rows read at once
+        Returns:
+            iterator - (key, object) pairs
+        Raises:
+            ValueError: if an operator isn't supported
+        """
+        conditions = check_conditions(conditions)
+        class_name = self._class_name(cls)
+        sql, params = ["class = ?"], [class_name]
+        cls = self.get_app_classes().get(class_name)
+        for attr, op, value in conditions:
+            if cls is not None:
+                self._sql_condition(cls, attr, op, value, sql, params)
+        # every condition is checked again on the instances
+        rows = self._iter_rows(sql, params, 0, None, batch_size)
+        objects = (
+            (key, obj) for key, obj in rows if matches(obj, conditions)
+        )
+        return page(objects, offset, limit)
+
+    def _sql_condition(self, cls, attr, op, value, sql, params):
+        """
+        Adds the SQL expression of a condition (see where) to a query,
+        if SQLite compares the values the same way (same kind of values,
+        class default of rows without the attribute taken into account)
+
+        Args:
+            cls (type): class of the instances
+            attr (str): attribute name
+            op (str): operator
+            value: value compared with
+            sql (list): conditions of the query
+            params (list): parameters of the query
+        """
+        default = cls.attribute_default(attr)
+
+        def kind(value):
+            """Get the kind of a value SQLite compares like Python"""
+            if isinstance(value, bool):
+                return None
+            if isinstance(value, (int, float)):
+                return "number"
+            return "text" if isinstance(value, str) else None
+
+        if not re.match(r"^\w+$", attr) or kind(value) is None:
+            return
+        expression = f"json_extract(data, '$.{attr}')"
+        if op == "==" and value != default:
+            # rows without the attribute don't match, the index is used
+            sql.append(f"{expression} = ?")
+            params.append(value)
+        elif kind(default) == kind(value):
+            sql.append(f"COALESCE({expression}, ?) {op} ?")
+            params.extend((default, value))
+
+    def _iter_rows(self, conditions, params, offset, limit, batch_size):
+        """
+        Iterate over the objects of the rows meeting SQL conditions,
+        reading them a batch at a time (see iter_all)
+
+        Args:
+            conditions (list): SQL conditions (all met)
+            params (list): parameters of the conditions
+            offset (int): number of rows skipped first
+            limit (int): maximum number of rows (None: no limit)
+            batch_size (int): number of rows read at once
+        Yields:
+            tuple - (key, object)
+        """
+        last = None  # rowid of the last row read
+        while limit is None or limit > 0:
+            size = batch_size if limit is None else min(batch_size, limit)
+            batch_conditions = list(conditions)
+            batch_params = list(params)
+            if last is not None:  # next batch: rows after the last one
+                batch_conditions.append("rowid > ?")
+                batch_params.append(last)
+            where = (
+                f" WHERE {' AND '.join(batch_conditions)}"
+                if batch_conditions
+                else ""
+            )
+            with self.__lock:
+                rows = self.__connection.execute(
+                    f"SELECT rowid, class, id, data FROM objects{where}"
+                    " ORDER BY rowid LIMIT ? OFFSET ?",
+                    (*batch_params, size, offset if last is None else 0),
+                ).fetchall()
+                batch = [
+                    (f"{class_name}.{id}", self._build(class_name, id, data))
+                    for rowid, class_name, id, data in rows
+                ]
+            yield from batch
+            if len(rows) < size:
+                return
+            last = rows[-1][0]
+            if limit is not None:
+                limit -= len(rows)
+
+    def count(self, cls=None):
+        """Get the number of objects in storage (of a given class)"""
+        with self.__lock:
+            if cls is None:
+                row = self.__connection.execute("SELECT COUNT(*) FROM objects")
+            else:
+                row = self.__connection.execute(
+                    "SELECT COUNT(*) FROM objects WHERE class = ?",
+                    (self._class_name(cls),),
+                )
+            return row.fetchone()[0]
+
+    def get(self, cls, id):
+        """Get an object by class and id (None if not found)"""
+        with self.__lock:
+            class_name = self._class_name(cls)
+            obj = self._cached(f"{class_name}.{id}")
+            if obj is not None:
+                return obj
+            row = self.__connection.execute(
+                "SELECT data FROM objects WHERE class = ? AND id = ?",
+                (class_name, id),
+            ).fetchone()
+            return self._build(class_name, id, row[0]) if row else None
+
+    def lookup(self, cls, attr, value):
+        """
+        Get the instances of a class having a given attribute value,
+        using the class's index on that attribute when there is one
+
+        Args:
+            cls (type | str): class of the instances
+            attr (str): attribute name
+            value: attribute value to look for
+        Returns:
+            dict - key: object
+        """
+        with self.__lock:
+            class_name = self._class_name(cls)
+            classes = self.get_app_classes()
+            if (
+                class_name not in classes
+                or not re.match(r"^\w+$", attr)
+                or value == classes[class_name].attribute_default(attr)
+                or not isinstance(value, (str, int, float))
+            ):
+                # class defaults aren't stored in the rows, compare instances
+                return {
+                    key: obj
+                    for key, obj in self.all(class_name).items()
+                    if getattr(obj, attr, None) == value
+                }
+            # same expression as the indexes created by reload()
+            rows = self.__connection.execute(
+                "SELECT id, data FROM objects WHERE class = ?"
+                f" AND json_extract(data, '$.{attr}') = ? ORDER BY rowid",
+                (class_name, value),
+            )
+            return {
+                f"{class_name}.{id}": self._build(class_name, id, data)
+                for id, data in rows
+            }
+
+    def new(self, obj):
+        """Adds an object to the current transaction"""
+        with self.__lock:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            self._cache(key, obj)
+            self._upsert(obj)
+
+    def mark_dirty(self, obj):
+        """Writes a stored object's changes to the current transaction"""
+        with self.__lock:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            current = self.__objects.get(key) or self.__evicted.get(key)
+            if current is obj or (
+                current is None and key in self.__untracked
+            ):
+                self._cache(key, obj)
+                self._upsert(obj)
+
+    def delete(self, obj=None):
+        """Deletes obj from the database (if it's there)"""
+        if obj is None:
+            return
+        with self.__lock:
+            class_name = obj.__class__.__name__
+            self.__objects.pop(f"{class_name}.{obj.id}", None)
+            self.__evicted.pop(f"{class_name}.{obj.id}", None)
+            self.__untracked.discard(f"{class_name}.{obj.id}")
+            self.__connection.execute(
+                "DELETE FROM objects WHERE class = ? AND id = ?",
+                (class_name, obj.id),
+            )
+
+    def save(self):
+        """Commits the current transaction
+        (unless it was opened by begin, see commit, or deferred)"""
+        with self.__lock:
+            if not self.__in_transaction and not self.__deferred:
+                self.__connection.commit()
+
+    def flush(self):
+        """Commits the current transaction, saves deferred included
+        (unless it was opened by begin, see commit)"""
+        with self.__lock:
+            if not self.__in_transaction:
+                self.__connection.commit()
+
+    def in_transaction(self):
+        """Check if a transaction was opened by begin()"""
+        return self.__in_transaction
+
+    def begin(self):
+        """
+        Opens a transaction: saves don't commit until commit() is called
+
+        Raises:
+            RuntimeError: if a transaction is already open
+        """
+        with self.__lock:
+            if self.__in_transaction:
+                raise RuntimeError("A transaction is already in progress")
+            self.__connection.commit()  # earlier changes aren't part of it
+            self.__in_transaction = True
+
+    def commit(self):
+        """
+        Commits the transaction opened by begin()
+
+        Raises:
+            RuntimeError: if no transaction is open
+        """
+        with self.__lock:
+            if not self.__in_transaction:
+                raise RuntimeError("No transaction in progress")
+            self.__in_transaction = False
+            self.__connection.commit()
+
+    def rollback(self):
+        """
+        Cancels the transaction opened by begin(). Instances built so far
+        are forgotten (they may hold cancelled changes), so they are read
+        again from the database
+
+        Raises:
+            RuntimeError: if no transaction is open
+        """
+        with self.__lock:
+            if not self.__in_transaction:
+                raise RuntimeError("No transaction in progress")
+            self.__in_transaction = False
+            self.__connection.rollback()
+            self.__objects = OrderedDict()
+            self.__evicted = weakref.WeakValueDictionary()
+            self.__untracked = set()
+
+    @contextmanager
+    def transaction(self):
+        """Runs a block of code in a transaction, committed at the end
+        of the block or rolled back if it raises an exception"""
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    @contextmanager
+    def deferred(self):
+        """Runs a block of code committing the saves made meanwhile at
+        once, at the end of the block (and on each flush() call)"""
+        with self.__lock:
+            self.__deferred += 1
+        try:
+            yield self
+        finally:
+            with self.__lock:
+                self.__deferred -= 1
+            self.flush()
+
+    def reload(self):
+        """Connects to the database, creating the tables if needed"""
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+            self.__connection = sqlite3.connect(
+                DBStorage.__db_path, check_same_thread=False
+            )
+            self.__objects = OrderedDict()
+            self.__evicted = weakref.WeakValueDictionary()
+            self.__untracked = set()
+            self.__in_transaction = False
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                " class TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL,"
+                " PRIMARY KEY (class, id))"
+            )
+            # one expression index per attribute listed in indexed_attributes
+            for class_name, cls in self.get_app_classes().items():
+                for attr in getattr(cls, "indexed_attributes", ()):
+                    self.__connection.execute(
+                        "CREATE INDEX IF NOT EXISTS"
+                        f" objects_{class_name}_{attr} ON objects"
+                        f" (class, json_extract(data, '$.{attr}'))"
+                    )
+            self.__connection.commit()
+
+    def cache_stats(self):
+        """
+        Get the figures of the instance cache, to size it
+
+        Returns:
+            dict - hits, misses (instances built from their rows or
+                given back after an eviction), evictions, size and limit
+        """
+        with self.__lock:
+            stats = self.__stats.copy()
+            stats["size"] = len(self.__objects)
+        stats["limit"] = DBStorage.__cache_size or None
+        return stats
+
+    def _class_name(self, cls):
+        """Get the name of a class (given as a class or as a name)"""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def _build(self, class_name, id, data):
+        """Get the instance of a row (built once, then reused)"""
+        key = f"{class_name}.{id}"
+        obj = self._cached(key)
+        if obj is None:
+            self.__stats["misses"] += 1
+            classes = self.get_app_classes()
+            obj = classes[class_name].from_records((json.loads(data),))[0]
+            self._cache(key, obj)
+        return obj
+
+    def _cached(self, key):
+        """Get the instance of a key if it was built already (or None)"""
+        obj = self.__objects.get(key)
+        if obj is not None:
+            self.__stats["hits"] += 1
+            self.__objects.move_to_end(key)
+            return obj
+        obj = self.__evicted.pop(key, None)
+        if obj is not None:  # evicted but still used, take it back
+            self.__stats["misses"] += 1
+            self._cache(key, obj)
+        return obj
+
+    def _cache(self, key, obj):
+        """Keeps an instance, evicting the least recently used ones
+        over the limit (their rows are up to date)"""
+        self.__objects[key] = obj
+        self.__objects.move_to_end(key)
+        self.__untracked.discard(key)
+        limit = DBStorage.__cache_size
+        while limit and len(self.__objects) > limit:
+            old, evicted = self.__objects.popitem(last=False)
+            try:
+                self.__evicted[old] = evicted
+            except TypeError:  # no weak references (compact instances)
+                self.__untracked.add(old)
+            self.__stats["evictions"] += 1
+
+    def _upsert(self, obj):
+        """Inserts or updates the row of an object"""
+        self.__connection.execute(
+            "INSERT INTO objects (class, id, data) VALUES (?, ?, ?)"
+            " ON CONFLICT (class, id) DO UPDATE SET data = excluded.data",
+            (obj.__class__.__name__, obj.id, json.dumps(obj.to_dict())),
+        )
+
+    def get_app_classes(self):
+        """Get a dictionary that holds all app classes | names, references"""
+        from models.engine.file_storage import FileStorage
+
+        # same classes as the file storage
+        return FileStorage.get_app_classes(self)
@@ -1,75 +1,1658 @@
-#!/usr/bin/python3
-"""This module contains FileStorage class"""
-
-import json
-import os
-
-
-class FileStorage:
-    """
-    This class is responsible for handling app storage, as well as storing
-    objects to a file based storage (JSON)
-    - serializes instances to a JSON file
-    - deserializes JSON file to instances
-    """
-
-    __file_path = "file.json"
-    __objects = {}
-
-    def all(self):
-        """Return objects dictionary"""
-        return FileStorage.__objects
-
-    def new(self, obj):
-        """Sets in objects dictionary"""
-        key = f"{obj.__class__.__name__}.{obj.id}"
-        FileStorage.__objects[key] = obj
-
-    def save(self):
-        """Serializes objects dictionary to the JSON file"""
-        with open(FileStorage.__file_path, "w", encoding="utf-8") as file:
-            # make a dictionary that includes objects as dictionaries
-            dict = {
-                key: value.to_dict()
-                for key, value in FileStorage.__objects.items()
-            }
-            # save the dictionary to the json file
-            json.dump(dict, file)
-
-    def reload(self):
-        """Deserializes the JSON file to objects dictionary"""
-        if not os.path.exists(FileStorage.__file_path):
-            return
-        with open(FileStorage.__file_path, "r", encoding="utf-8") as file:
-            # retrieve a dictionary from our storage file
-            # with object instances as dictionaries
-            dict = json.load(file)
-
-            # alter the retrieved dictionary values with object instances
-            # using the corresponding class stored in __class__ attribute
-            classes = self.get_app_classes()
-            dict = {
-                key: classes[value["__class__"]](**value)
-                for key, value in dict.items()
-            }
-            FileStorage.__objects = dict
-
-    def get_app_classes(self):
-        """Get a dictionary that holds all app classes | names, references"""
-        from models.base_model import BaseModel
-        from models.user import User
-        from models.state import State
-        from models.city import City
-        from models.amenity import Amenity
-        from models.place import Place
-        from models.review import Review
-
-        return {
-            "BaseModel": BaseModel,
-            "User": User,
-            "State": State,
-            "City": City,
-            "Amenity": Amenity,
-            "Place": Place,
-            "Review": Review,
-        }
+#!/usr/bin/python3
+"""This module contains FileStorage class"""
+
+import gc
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from models.engine.async_storage import AsyncStorage
+from models.engine.codecs import CODECS, detect_codec, json_default
+from models.engine.lazy_objects import LazyObjects
+from models.engine.locks import ReadWriteLock
+from models.engine.query import check_conditions, matches, page
+from models.engine.record_file import RecordFile, encode_record, write_records
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX, shared mode saves aren't locked
+    fcntl = None
+
+# permissions of the files written (as open() would create them)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class StorageConflictError(Exception):
+    """Raised by a save that changes objects another process changed
+    since this one read them (in shared mode)"""
+
+
+def _load_shard(path):
+    """Decode a shard file"""
+    with open(path, "rb") as file:
+        return dict(detect_codec(file).load(file))
+
+
+def _read_shard(path):
+    """Get the decoding function (see the codecs' loads) and the encoded
+    objects of a shard file, for a worker process to decode them"""
+    with open(path, "rb") as file:
+        return detect_codec(file).loads, file.read()
+
+
+class FileStorage(AsyncStorage):
+    """
+    This class is responsible for handling app storage, as well as storing
+    objects to a file based storage (JSON)
+    - serializes instances to a JSON file
+    - deserializes JSON file to instances
+    - optionally appends changes to a journal (log) file instead of
+      rewriting the whole JSON file on every save
+    - optionally defers writes so that bursts of saves share one write
+    - optionally builds instances lazily, the first time they are read
+    - optionally splits the store into one or more files per class
+    - optionally keeps the store in an indexed file, where each object
+      is read (from a memory map) without decoding the others
+    - optionally uses a binary format (see codecs), detected on reload
+    - groups changes in transactions, written once on commit
+    - can be used from several threads: lookups share a read lock,
+      changes take the write lock, saves collect what they write under
+      the read lock then write it without holding it
+    - optionally shares the store with other processes, saves merge
+      their changes (or are rejected when they changed the same objects)
+    - has asyncio versions of save/flush/reload (see AsyncStorage)
+    """
+
+    __file_path = "file.json"
+    __objects = {}
+    # journal mode: save() appends changed objects to "<file_path>.log"
+    __journal = os.getenv("HBNB_STORAGE_JOURNAL") == "1"
+    # fold the journal back into the JSON file once it exceeds this size
+    __journal_limit = 1024 * 1024  # bytes
+    # keys changed/removed since the last save
+    __dirty = set()
+    __deleted = set()
+    # class name: keys of its instances ({key: None}, an ordered set)
+    __partitions = {}
+    __partitioned = None  # objects dictionary the partitions belong to
+    # (class name, attribute): {value: {key: None}} for the attributes
+    # listed in the indexed_attributes of each model class
+    __indexes = {}
+    __indexed_values = {}  # key: {attribute: indexed value}
+    # deferred mode: saves within this window (seconds) share one write,
+    # made by a timer when the window closes (or by a later save)
+    __flush_delay = float(os.getenv("HBNB_STORAGE_FLUSH_DELAY", "0"))
+    __pending = False  # changes saved but not written yet
+    __last_flush = 0.0
+    __flush_timer = None  # writes the saves deferred in the window
+    # durability policy: "always" (every save writes), "interval:<ms>"
+    # (a background thread writes the saved changes every <ms>) or
+    # "changes:<n>" (the thread writes once <n> saves are pending)
+    __durability = os.getenv("HBNB_STORAGE_DURABILITY", "always")
+    __worker = None  # background writer thread
+    __wakeup = threading.Event()  # wakes the writer before its interval
+    __unflushed = 0  # saves not written yet (queue depth)
+    # writes so far, their last/max/total latency in seconds
+    __flush_stats = dict(
+        flushes=0, errors=0, last=0.0, max=0.0, total=0.0, bytes=0
+    )
+    __scanned = 0  # objects examined by the lookups so far
+    # lazy mode: reload() keeps the stored dictionaries and builds each
+    # instance the first time it's read (see LazyObjects)
+    __lazy = os.getenv("HBNB_STORAGE_LAZY") == "1"
+    # bounded memory: only this number of instances (the most recently
+    # used ones) are kept, the others are turned back into their stored
+    # dictionaries, read again on use (0: no limit, implies lazy mode).
+    # Only the indexed layout bounds memory: evicted instances not saved
+    # since the file was written go back to its records (in the mapped
+    # file), others are kept encoded until the next save. The stored
+    # dictionaries of the other layouts are all kept in memory, only
+    # the number of instances is bounded. Changes of an evicted instance
+    # are kept if it was saved (or is still used elsewhere).
+    __cache_size = int(os.getenv("HBNB_STORAGE_CACHE_SIZE", "0"))
+    # "sharded" layout: each class is stored in its own hash shard files
+    # "<file_path>.d/<class_name>.<shard>", only the shards holding
+    # changed objects are rewritten and reload() decodes them in parallel
+    # "indexed" layout: the store is "<file_path>.dat", records at known
+    # offsets followed by their index (see record_file), reload() only
+    # reads the index and each object is decoded when it's first read
+    __layout = os.getenv("HBNB_STORAGE_LAYOUT", "single")
+    __shards = int(os.getenv("HBNB_STORAGE_SHARDS", "1"))  # per class
+    # smallest store (bytes) worth decoding in a process pool
+    __parallel_min_size = 1024 * 1024
+    # format of the written files: "json", "pickle" or "marshal"
+    __codec = os.getenv("HBNB_STORAGE_CODEC", "json")
+    # key: (stored dictionary, its JSON) of the objects not built yet, from
+    # the last save (built objects cache their own JSON, see to_json)
+    __fragments = {}
+    # state to restore on rollback while a transaction is open (see begin)
+    __transaction = None
+    __deferred = 0  # nested deferred() blocks running
+    __lock = ReadWriteLock()  # guards the objects and everything above
+    __io_lock = threading.RLock()  # one save writing to disk at a time
+    __rebuild_lock = threading.Lock()  # see _partitions
+    # shared mode: several processes use the store, saves hold a lock on
+    # "<file_path>.lock" and append a line to "<file_path>.gen": the
+    # store generation (number of saves) and the keys written in it.
+    # Lines are folded into one (generation of each key) once the file
+    # exceeds __journal_limit, processes only read the lines appended
+    # since they last read or wrote it (see _read_generation)
+    __shared = os.getenv("HBNB_STORAGE_SHARED") == "1"
+    __generation = 0  # generation of the store as last read or written
+    # (inode, offset) of the end of the generation file as last read or
+    # written, where the lines of the next generations start
+    __gen_position = None
+    __lock_file = None  # file holding the lock while a save holds it
+
+    def all(self, cls=None):
+        """
+        Return objects dictionary
+
+        Args:
+            cls (type | str): only return instances of this class
+        Returns:
+            dict - key: object (the objects dictionary itself without cls,
+                a new dictionary with it)
+        """
+        if cls is None:
+            return FileStorage.__objects
+        with FileStorage.__lock.read():
+            objects = FileStorage.__objects
+            partition = self._partitions().get(self._class_name(cls), {})
+            FileStorage.__scanned += len(partition)
+            return {key: objects[key] for key in partition}
+
+    def iter_all(self, cls=None, offset=0, limit=None):
+        """
+        Iterate over the objects in storage, in the same order as all(),
+        without building a dictionary of them (only their keys are
+        copied, objects are read one at a time)
+
+        Args:
+            cls (type | str): only the instances of this class
+            offset (int): number of objects skipped first
+            limit (int): maximum number of objects (None: no limit)
+        Yields:
+            tuple - (key, object), objects removed meanwhile are skipped
+        """
+        stop = None if limit is None else offset + limit
+        with FileStorage.__lock.read():
+            if cls is None:
+                keys = FileStorage.__objects
+            else:
+                keys = self._partitions().get(self._class_name(cls), {})
+            keys = list(islice(keys, offset, stop))
+        for key in keys:
+            FileStorage.__scanned += 1
+            obj = FileStorage.__objects.get(key)
+            if obj is not None:
+                yield key, obj
+
+    def count(self, cls=None):
+        """Get the number of objects in storage (of a given class)"""
+        if cls is None:
+            return len(FileStorage.__objects)
+        with FileStorage.__lock.read():
+            return len(self._partitions().get(self._class_name(cls), {}))
+
+    def get(self, cls, id):
+        """Get an object by class and id (None if not found)"""
+        with FileStorage.__lock.read():
+            FileStorage.__scanned += 1
+            return FileStorage.__objects.get(f"{self._class_name(cls)}.{id}")
+
+    def lookup(self, cls, attr, value):
+        """
+        Get the instances of a class having a given attribute value,
+        using the class's index on that attribute when there is one
+
+        Args:
+            cls (type | str): class of the instances
+            attr (str): attribute name
+            value: attribute value to look for
+        Returns:
+            dict - key: object
+        """
+        class_name = self._class_name(cls)
+        with FileStorage.__lock.read():
+            objects = FileStorage.__objects
+            partitions = self._partitions()
+            index = FileStorage.__indexes.get((class_name, attr))
+            if index is not None:
+                try:
+                    keys = index.get(value, {})
+                except TypeError:  # unhashable value, can't be indexed
+                    keys = {}
+                FileStorage.__scanned += len(keys)
+                return {key: objects[key] for key in keys}
+            # no index on this attribute, scan the class's instances
+            keys = partitions.get(class_name, {})
+            FileStorage.__scanned += len(keys)
+            return {
+                key: objects[key]
+                for key in keys
+                if getattr(objects[key], attr, None) == value
+            }
+
+    def where(self, cls, conditions, offset=0, limit=None):
+        """
+        Iterate over the instances of a class meeting all conditions,
+        only looking at the ones of the class's index on an attribute
+        compared with == when there is one (the smallest, if several),
+        at every instance otherwise (see models.engine.query)
+
+        Args:
+            cls (type | str): class of the instances
+            conditions (iterable): (attribute, operator, value) tuples
+            offset (int): number of matching objects skipped first
+            limit (int): maximum number of objects (None: no limit)
+        Returns:
+            iterator - (key, object) pairs
+        Raises:
+            ValueError: if an operator isn't supported
+        """
+        conditions = check_conditions(conditions)
+        class_name = self._class_name(cls)
+        with FileStorage.__lock.read():
+            keys = self._partitions().get(class_name, {})
+            for attr, op, value in conditions:
+                index = FileStorage.__indexes.get((class_name, attr))
+                if op != "==" or index is None:
+                    continue
+                try:
+                    found = index.get(value, {})
+                except TypeError:  # unhashable value, can't be indexed
+                    continue
+                if len(found) < len(keys):
+                    keys = found
+            keys = list(keys)
+        return page(self._matching(keys, conditions), offset, limit)
+
+    def _matching(self, keys, conditions):
+        """Iterate over the (key, object) pairs of the objects stored
+        under keys meeting all conditions (see where)"""
+        for key in keys:
+            FileStorage.__scanned += 1
+            obj = FileStorage.__objects.get(key)
+            if obj is not None and matches(obj, conditions):
+                yield key, obj
+
+    def new(self, obj):
+        """Sets in objects dictionary"""
+        class_name = obj.__class__.__name__
+        key = f"{class_name}.{obj.id}"
+        with FileStorage.__lock.write():
+            partitions = self._partitions()
+            FileStorage.__objects[key] = obj
+            partitions.setdefault(class_name, {})[key] = None
+            self._index(key, obj)
+            self._outdate(key)
+            FileStorage.__dirty.add(key)
+            FileStorage.__deleted.discard(key)
+
+    def mark_dirty(self, obj):
+        """Flags a stored object as changed since the last save"""
+        key = f"{obj.__class__.__name__}.{obj.id}"
+        with FileStorage.__lock.write():
+            objects = FileStorage.__objects
+            if key in objects:
+                if dict.get(objects, key) is not obj:
+                    objects[key] = obj  # evicted from the instance cache
+                self._partitions()
+                self._index(key, obj)  # indexed attributes may have changed
+                self._outdate(key)
+                FileStorage.__dirty.add(key)
+
+    def delete(self, obj=None):
+        """Deletes obj from objects dictionary (if it's there)"""
+        if obj is None:
+            return
+        class_name = obj.__class__.__name__
+        key = f"{class_name}.{obj.id}"
+        with FileStorage.__lock.write():
+            partitions = self._partitions()
+            if FileStorage.__objects.pop(key, None) is not None:
+                partitions[class_name].pop(key, None)
+                self._unindex(key)
+                FileStorage.__dirty.discard(key)
+                FileStorage.__deleted.add(key)
+
+    def save(self):
+        """Serializes objects dictionary to the JSON file
+        (or appends the changes to the journal in journal mode)"""
+        with FileStorage.__lock.write():
+            FileStorage.__unflushed += 1
+            if FileStorage.__transaction is not None:
+                FileStorage.__pending = True
+                return  # written on commit
+            if FileStorage.__deferred:
+                FileStorage.__pending = True
+                return  # written by flush(), see deferred
+            policy, limit = self._durability()
+            if policy != "always":
+                FileStorage.__pending = True
+                self._start_worker()
+                if policy == "changes" and FileStorage.__unflushed >= limit:
+                    FileStorage.__wakeup.set()
+                return  # written by the background writer
+            if FileStorage.__flush_delay > 0:
+                FileStorage.__pending = True
+                elapsed = time.monotonic() - FileStorage.__last_flush
+                if elapsed < FileStorage.__flush_delay:
+                    self._schedule_flush(FileStorage.__flush_delay - elapsed)
+                    return  # written by the timer, or earlier
+        self._persist()
+
+    def flush(self):
+        """Writes changes deferred by save() (if any),
+        except the ones of an open transaction"""
+        with FileStorage.__lock.read():
+            pending = FileStorage.__pending
+            pending = pending and FileStorage.__transaction is None
+        if pending:
+            self._persist()
+
+    def in_transaction(self):
+        """Check if a transaction is open"""
+        return FileStorage.__transaction is not None
+
+    def begin(self):
+        """
+        Opens a transaction: saves are only written on commit(),
+        rollback() brings back the objects as they are now
+
+        Raises:
+            RuntimeError: if a transaction is already open
+        """
+        with FileStorage.__lock.write():
+            if FileStorage.__transaction is not None:
+                raise RuntimeError("A transaction is already in progress")
+            objects = FileStorage.__objects
+            # attributes of the built instances (stored dictionaries of
+            # lazy objects never change, the objects copy keeps them)
+            records = self._pending_records()
+            states = {
+                key: objects[key].__dict__.copy()
+                for key in objects
+                if key not in records
+            }
+            FileStorage.__transaction = (
+                objects.copy(),
+                states,
+                FileStorage.__dirty.copy(),
+                FileStorage.__deleted.copy(),
+                FileStorage.__pending,
+            )
+
+    def commit(self):
+        """
+        Closes the transaction, writing all its changes at once
+
+        Raises:
+            RuntimeError: if no transaction is open
+        """
+        with FileStorage.__lock.write():
+            if FileStorage.__transaction is None:
+                raise RuntimeError("No transaction in progress")
+            FileStorage.__transaction = None
+            pending = FileStorage.__pending
+        if pending:
+            self._persist()
+
+    def rollback(self):
+        """
+        Closes the transaction, bringing back the objects (and their
+        attributes) as they were when it was opened
+
+        Raises:
+            RuntimeError: if no transaction is open
+        """
+        with FileStorage.__lock.write():
+            if FileStorage.__transaction is None:
+                raise RuntimeError("No transaction in progress")
+            objects, states, dirty, deleted, pending = (
+                FileStorage.__transaction
+            )
+            for key, state in states.items():
+                obj = objects[key]
+                for name in obj.__dict__.keys() - state.keys():
+                    delattr(obj, name)  # attribute added by the transaction
+                for name, value in state.items():
+                    setattr(obj, name, value)
+            FileStorage.__objects = objects
+            FileStorage.__dirty = dirty
+            FileStorage.__deleted = deleted
+            FileStorage.__pending = pending
+            FileStorage.__transaction = None
+
+    @contextmanager
+    def transaction(self):
+        """Runs a block of code in a transaction, committed at the end
+        of the block or rolled back if it raises an exception"""
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    @contextmanager
+    def deferred(self):
+        """Runs a block of code writing the saves made meanwhile at once,
+        at the end of the block (and on each flush() call), not on each
+        save() (unlike a transaction, nothing is rolled back)"""
+        with FileStorage.__lock.write():
+            FileStorage.__deferred += 1
+        try:
+            yield self
+        finally:
+            with FileStorage.__lock.write():
+                FileStorage.__deferred -= 1
+            self.flush()
+
+    def flush_stats(self):
+        """
+        Get the figures of the writes so far, to tune the durability
+        policy (latencies are in seconds)
+
+        Returns:
+            dict - policy, flushes, errors, last/max/average latency,
+                bytes written to the storage files, queue depth (saves
+                not written yet), pending objects
+        """
+        with FileStorage.__lock.read():
+            stats = FileStorage.__flush_stats.copy()
+            pending = len(FileStorage.__dirty) + len(FileStorage.__deleted)
+            depth = FileStorage.__unflushed
+        total = stats.pop("total")
+        stats["average"] = total / stats["flushes"] if stats["flushes"] else 0
+        stats.update(
+            policy=FileStorage.__durability,
+            queue_depth=depth,
+            pending_objects=pending,
+        )
+        return stats
+
+    def objects_scanned(self):
+        """Get the number of objects the lookups (all with a class, get,
+        lookup, iter_all and where) examined so far, matching or not"""
+        return FileStorage.__scanned
+
+    def cache_stats(self):
+        """
+        Get the figures of the instance cache, to size it
+
+        Returns:
+            dict - hits, misses (instances built from their stored
+                dictionaries or given back after an eviction), evictions,
+                size and limit
+        """
+        objects = FileStorage.__objects
+        if isinstance(objects, LazyObjects):
+            return objects.stats()
+        return dict(
+            hits=0, misses=0, evictions=0, size=len(objects), limit=None
+        )
+
+    def _durability(self):
+        """
+        Get the durability policy
+
+        Returns:
+            tuple - ("always", None), ("interval", seconds) or
+                ("changes", number of saves)
+        Raises:
+            ValueError: if the policy is unknown, or its value isn't a
+                positive integer
+        """
+        durability = FileStorage.__durability
+        policy, _, value = durability.partition(":")
+        if policy == "always" and not value:
+            return policy, None
+        if policy not in ("interval", "changes"):
+            raise ValueError(f"Unknown durability policy: {durability}")
+        # no interval or number of saves: the writer would spin
+        number = int(value) if value.isdigit() else 0
+        if number <= 0:
+            raise ValueError(
+                f"Invalid durability policy value: {durability}"
+                " (expected a positive integer)"
+            )
+        if policy == "interval":
+            return policy, number / 1000
+        return policy, number
+
+    def _start_worker(self):
+        """Starts the background writer (if it's not running)"""
+        worker = FileStorage.__worker
+        if worker is None or not worker.is_alive():
+            worker = threading.Thread(
+                target=self._flush_worker, name="storage-flush", daemon=True
+            )
+            FileStorage.__worker = worker
+            worker.start()
+
+    def _stop_worker(self):
+        """Stops the background writer (and the flush timer, see
+        _schedule_flush) after a last flush"""
+        worker = FileStorage.__worker
+        if worker is not None:
+            FileStorage.__worker = None  # the writer exits when it wakes
+            FileStorage.__wakeup.set()
+            worker.join()
+        timer = FileStorage.__flush_timer
+        if timer is not None:
+            FileStorage.__flush_timer = None
+            timer.cancel()
+        self.flush()
+
+    def _schedule_flush(self, delay):
+        """Writes the deferred saves once delay (seconds) elapsed, unless
+        a timer is already waiting to (called with the lock held)"""
+        timer = FileStorage.__flush_timer
+        if timer is None or timer.finished.is_set():
+            timer = threading.Timer(delay, self._timed_flush)
+            timer.name = "storage-flush-timer"
+            timer.daemon = True
+            FileStorage.__flush_timer = timer
+            timer.start()
+
+    def _timed_flush(self):
+        """Writes the saves deferred in the flush window (see save)"""
+        try:
+            self.flush()
+        except Exception:
+            pass  # counted in flush_stats, the changes stay pending
+
+    def _flush_worker(self):
+        """Background writer: writes the saved changes when the policy
+        says so (interval elapsed or enough saves pending)"""
+        me = threading.current_thread()
+        while FileStorage.__worker is me:
+            policy, limit = self._durability()
+            if policy == "always":
+                break  # policy changed, saves write again
+            timeout = limit if policy == "interval" else None
+            FileStorage.__wakeup.wait(timeout)
+            FileStorage.__wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # counted in flush_stats, the changes stay pending
+
+    def _persist(self):
+        """Writes the changes to disk right away
+
+        Raises:
+            StorageConflictError: in shared mode, if another process
+                changed objects this save changes too (their changes
+                here are dropped, the other changes are written)
+        """
+        # saves write in the order they collected their changes
+        with FileStorage.__io_lock:
+            start = time.perf_counter()
+            try:
+                self._persist_changes()
+            except BaseException:
+                FileStorage.__flush_stats["errors"] += 1
+                raise
+            latency = time.perf_counter() - start
+            stats = FileStorage.__flush_stats
+            stats["flushes"] += 1
+            stats["last"] = latency
+            stats["max"] = max(stats["max"], latency)
+            stats["total"] += latency
+
+    def _persist_changes(self):
+        """Writes the changes (see _persist, called with the io lock)"""
+        if not FileStorage.__shared:
+            self._write_changes()
+        else:
+            with self._file_lock(fcntl and fcntl.LOCK_EX):
+                generation, keys, _ = self._read_generation()
+                conflicts = set()
+                if generation != FileStorage.__generation:
+                    conflicts = self._merge(keys)
+                # the other changes are written, conflicts or not
+                dirty, deleted = self._write_changes()
+                generation += 1
+                self._write_generation(generation, dirty | deleted)
+            if conflicts:
+                FileStorage.__last_flush = time.monotonic()
+                raise StorageConflictError(
+                    "changed by another process: "
+                    + ", ".join(sorted(conflicts))
+                )
+        FileStorage.__last_flush = time.monotonic()
+
+    def _write_changes(self):
+        """
+        Writes the changes to the journal or the JSON file (see _persist)
+
+        Returns:
+            tuple - (changed keys, removed keys) written
+        """
+        if FileStorage.__journal:
+            return self._append_journal()
+        return self._write_snapshot()
+
+    def compact(self):
+        """Folds the journal into a fresh JSON file and removes the log"""
+        with FileStorage.__io_lock:
+            with self._file_lock(fcntl and fcntl.LOCK_EX):
+                self._write_snapshot(changed_only=False)
+                if os.path.exists(self._journal_path()):
+                    os.remove(self._journal_path())
+
+    def snapshots(self):
+        """Get the names of the snapshots (see snapshot), oldest first"""
+        directory = self._snapshot_dir()
+        if not os.path.isdir(directory):
+            return []
+        paths = [
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(".json")
+        ]
+        paths.sort(key=os.path.getmtime)
+        return [os.path.basename(path)[:-len(".json")] for path in paths]
+
+    def snapshot(self, name=None, base=None):
+        """
+        Saves a consistent copy of the objects in storage as they are in
+        memory (changes not written yet included), that restore() brings
+        back. An incremental snapshot only holds the objects changed since
+        its base snapshot: created, saved (updated_at) or changed but not
+        written yet.
+
+        Args:
+            name (str): name of the snapshot (default: from the time)
+            base (str): snapshot this one is incremental to (None: full)
+        Returns:
+            str - name of the snapshot
+        Raises:
+            ValueError: if a name is invalid, the snapshot exists already
+                or base doesn't exist
+            RuntimeError: if a transaction is open
+        """
+        if base is not None:
+            previous = self._read_snapshot(base)
+            since = datetime.fromisoformat(previous["time"])
+            base_keys = set(previous["keys"])
+        if name is not None:
+            path = self._snapshot_path(name)
+        with FileStorage.__lock.read():
+            if FileStorage.__transaction is not None:
+                raise RuntimeError("A transaction is in progress")
+            now = datetime.now()
+            if name is None:
+                name = now.strftime("%Y%m%d%H%M%S%f")
+                path = self._snapshot_path(name)
+            if os.path.exists(path):
+                raise ValueError(f"snapshot already exists: {name}")
+            objects = FileStorage.__objects
+            if base is None:
+                changed = objects
+            else:
+                dirty = FileStorage.__dirty
+                changed = [
+                    key
+                    for key in objects
+                    if key in dirty
+                    or key not in base_keys
+                    or self._changed_since(key, since)
+                ]
+            content = {
+                "name": name,
+                "base": base,
+                "time": now.isoformat(),
+                "keys": list(objects),  # removed: not in keys anymore
+                "objects": {key: self._to_record(key) for key in changed},
+            }
+        os.makedirs(self._snapshot_dir(), exist_ok=True)
+        self._write_file(path, content, CODECS["json"].dump)
+        return name
+
+    def restore(self, name):
+        """
+        Replaces the objects in storage with the ones of a snapshot (and
+        of its base snapshots) and writes them right away, over the
+        changes made since then by any process
+
+        Args:
+            name (str): name of the snapshot
+        Raises:
+            ValueError: if the snapshot (or one of its bases) doesn't exist
+            RuntimeError: if a transaction is open
+        """
+        chain = []  # the snapshot, then its bases
+        while name is not None:
+            chain.append(self._read_snapshot(name))
+            name = chain[-1]["base"]
+        records = {}
+        for snapshot in reversed(chain):
+            records.update(snapshot["objects"])
+        records = {key: records[key] for key in chain[0]["keys"]}
+        classes = self.get_app_classes()
+        with FileStorage.__io_lock, self._file_lock(fcntl and fcntl.LOCK_EX):
+            generation = self._read_generation()[0]
+            with FileStorage.__lock.write():
+                if FileStorage.__transaction is not None:
+                    raise RuntimeError("A transaction is in progress")
+                removed = FileStorage.__objects.keys() - records.keys()
+                FileStorage.__objects = self._objects(records.items(), classes)
+                FileStorage.__dirty = set(records)
+                FileStorage.__deleted = removed
+                FileStorage.__fragments = {}
+            self._write_snapshot(changed_only=False)
+            if os.path.exists(self._journal_path()):
+                os.remove(self._journal_path())
+            if FileStorage.__shared:
+                # other processes bring in every restored key
+                generation += 1
+                self._write_generation(generation, records.keys() | removed)
+
+    def reload(self):
+        """
+        Deserializes the JSON file to objects dictionary
+
+        Raises:
+            ValueError: if the durability policy is invalid (see
+                _durability), so it fails on startup, not on a save
+        """
+        self._durability()
+        if not (
+            os.path.exists(FileStorage.__file_path)
+            or os.path.exists(self._journal_path())
+            or os.path.isdir(self._shard_dir())
+            or os.path.exists(self._indexed_path())
+        ):
+            return  # nothing stored yet
+
+        # alter the retrieved dictionary values with object instances
+        # using the corresponding class stored in __class__ attribute
+        classes = self.get_app_classes()
+        # only new objects are allocated here, nothing for the garbage
+        # collector to free, its repeated passes would only slow us down
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # files are read without holding the lock, the objects are
+            # swapped in at once
+            with FileStorage.__io_lock, self._file_lock(
+                fcntl and fcntl.LOCK_SH
+            ):
+                generation, _, position = self._read_generation()
+                if FileStorage.__layout == "indexed" and not os.path.exists(
+                    self._journal_path()
+                ):
+                    # only the index is read, records are decoded on use
+                    objects = self._lazy_objects(self._open_indexed(), classes)
+                else:
+                    objects = self._objects(self._iter_records(), classes)
+            with FileStorage.__lock.write():
+                FileStorage.__objects = objects
+                FileStorage.__dirty = set()
+                FileStorage.__deleted = set()
+                FileStorage.__generation = generation
+                FileStorage.__gen_position = position
+                FileStorage.__fragments = {}
+                # partitions and indexes are built by the first lookup
+                # needing them (see _partitions)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _objects(self, records, classes):
+        """
+        Get the objects dictionary of stored dictionaries: lazy (see
+        _lazy_objects) in lazy mode or with a cache size, built otherwise
+
+        Args:
+            records (iterable): (key, object dictionary) pairs
+            classes (dict): app classes (see get_app_classes)
+        Returns:
+            dict - key: object
+        """
+        if FileStorage.__lazy or FileStorage.__cache_size:
+            return self._lazy_objects(dict(records), classes)
+        return dict(self._build(records, classes))
+
+    def _lazy_objects(self, records, classes):
+        """
+        Get a LazyObjects of stored dictionaries, keeping __cache_size
+        instances at most (if set)
+
+        Args:
+            records (dict): key: object dictionary (see LazyObjects)
+            classes (dict): app classes (see get_app_classes)
+        Returns:
+            LazyObjects - key: object
+        """
+
+        def build(record):
+            """Build the instance of a stored dictionary"""
+            cls = classes[record["__class__"]]
+            # from_records consumes its dictionaries, the stored one may
+            # be shared (see LazyObjects.copy, kept by begin)
+            return cls.from_records((dict(record),))[0]
+
+        def unbuild(obj):
+            """Get the stored dictionary of an evicted instance"""
+            return obj.to_dict()
+
+        limit = FileStorage.__cache_size or None
+        return LazyObjects(records, build, limit, unbuild)
+
+    @contextmanager
+    def _file_lock(self, operation):
+        """
+        Holds the advisory lock shared by the processes using the store
+        for the duration of a block (only in shared mode, on POSIX)
+
+        Args:
+            operation (int): fcntl.LOCK_EX to write, fcntl.LOCK_SH to read
+        """
+        if (
+            not FileStorage.__shared
+            or fcntl is None
+            or FileStorage.__lock_file is not None  # held (io lock too)
+        ):
+            yield
+            return
+        with open(f"{FileStorage.__file_path}.lock", "a") as file:
+            fcntl.flock(file.fileno(), operation)
+            FileStorage.__lock_file = file
+            try:
+                yield
+            finally:
+                FileStorage.__lock_file = None
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def _read_generation(self):
+        """
+        Read the generation file (shared mode): only the lines appended
+        since __gen_position, unless the file was folded meanwhile
+
+        Returns:
+            tuple - (store generation, {key: generation it was written in}
+                for the keys written after __generation (at least), the
+                position of the end of the file (see __gen_position))
+        """
+        path = f"{FileStorage.__file_path}.gen"
+        if not FileStorage.__shared or not os.path.exists(path):
+            return 0, {}, None
+        with open(path, "rb") as file:
+            inode = os.fstat(file.fileno()).st_ino
+            position = FileStorage.__gen_position
+            generation = FileStorage.__generation
+            entries = None
+            if position is not None and position[0] == inode:
+                file.seek(position[1])
+                entries = self._generation_entries(file)
+                # lines follow the generation this process knows
+                if entries and entries[0][0] != generation + 1:
+                    entries = None
+            if entries is None:
+                file.seek(0)
+                entries = self._generation_entries(file)
+                generation = 0
+            end = file.tell()
+        keys = {}
+        for generation, written in entries:
+            if isinstance(written, list):
+                written = dict.fromkeys(written, generation)
+            keys.update(written)
+        return generation, keys, (inode, end)
+
+    def _generation_entries(self, file):
+        """Get the [generation, keys] lines of the generation file, from
+        the current position (torn writes are skipped)"""
+        entries = []
+        for line in file:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # torn write, later saves start a new line
+        return entries
+
+    def _write_generation(self, generation, keys):
+        """
+        Appends a generation to the generation file (the current
+        generation then), folded into one line once it exceeds
+        __journal_limit (see _read_generation)
+
+        Args:
+            generation (int): generation of the save
+            keys (set): keys written by the save
+        """
+        path = f"{FileStorage.__file_path}.gen"
+        line = (json.dumps([generation, sorted(keys)]) + "\n").encode()
+        with open(path, "ab+") as file:
+            start = file.seek(0, os.SEEK_END)
+            if start:
+                file.seek(start - 1)
+                if file.read(1) != b"\n":  # torn write
+                    line = b"\n" + line
+            file.write(line)
+            size = file.tell()
+            inode = os.fstat(file.fileno()).st_ino
+        if size > FileStorage.__journal_limit:
+            FileStorage.__gen_position = None  # read it whole
+            generation, keys, _ = self._read_generation()
+            line = json.dumps([generation, keys]).encode() + b"\n"
+            self._write_file(path, line, lambda line, file: file.write(line))
+            inode, size = os.stat(path).st_ino, len(line)
+        FileStorage.__generation = generation
+        FileStorage.__gen_position = (inode, size)
+
+    def _merge(self, keys):
+        """
+        Brings in the objects other processes wrote since this one last
+        read or wrote the store (only these keys are read again, see
+        _read_records). The ones changed here too are conflicts: their
+        changes here are dropped, the other process's version is kept
+
+        Args:
+            keys (dict): key: generation it was last written in
+        Returns:
+            set - keys of the conflicts
+        """
+        seen = FileStorage.__generation
+        changed = {key for key, number in keys.items() if number > seen}
+        # the files are read without holding the lock
+        records = self._read_records(changed)
+        with FileStorage.__lock.write():
+            dirty = FileStorage.__dirty
+            deleted = FileStorage.__deleted
+            conflicts = changed & (dirty | deleted)
+            dirty -= conflicts
+            deleted -= conflicts
+            classes = self.get_app_classes()
+            objects = FileStorage.__objects
+            partitions = self._partitions()
+            for key in changed:
+                class_name = key.partition(".")[0]
+                self._outdate(key)  # the indexed file's record is old
+                if key in records:
+                    cls = classes[class_name]
+                    obj = cls.from_records((records[key],))[0]
+                    objects[key] = obj
+                    partitions.setdefault(class_name, {})[key] = None
+                    self._index(key, obj)
+                elif objects.pop(key, None) is not None:  # deleted there
+                    partitions[class_name].pop(key, None)
+                    self._unindex(key)
+        return conflicts
+
+    def _build(self, records, classes, batch_size=10000):
+        """
+        Build instances from stored dictionaries, a batch at a time
+        (each class's records of a batch are built by its from_records)
+
+        Args:
+            records (iterable): (key, object dictionary) pairs
+            classes (dict): app classes (see get_app_classes)
+            batch_size (int): number of records per batch
+        Yields:
+            tuple - (key, object), in the same order as records
+        """
+        records = iter(records)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            by_class = {}  # class name: records of the batch
+            class_names = []
+            for key, record in batch:
+                class_name = record["__class__"]
+                class_names.append(class_name)
+                by_class.setdefault(class_name, []).append(record)
+            built = {
+                class_name: iter(classes[class_name].from_records(dicts))
+                for class_name, dicts in by_class.items()
+            }
+            for (key, record), class_name in zip(batch, class_names):
+                yield key, next(built[class_name])
+
+    def _class_name(self, cls):
+        """Get the name of a class (given as a class or as a name)"""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def _partitions(self):
+        """
+        Get the keys of objects dictionary grouped by class name,
+        rebuilt when objects dictionary was replaced or changed directly
+        (called with the lock held, readers rebuild them one at a time)
+
+        Returns:
+            dict - class name: {key: None}
+        """
+        if not self._stale_partitions():
+            return FileStorage.__partitions
+        with FileStorage.__rebuild_lock:
+            if not self._stale_partitions():  # rebuilt by another reader
+                return FileStorage.__partitions
+            objects = FileStorage.__objects
+            partitions = {}
+            for key in objects:
+                partitions.setdefault(key.partition(".")[0], {})[key] = None
+            # indexes are rebuilt alongside the partitions
+            FileStorage.__indexes = {}
+            FileStorage.__indexed_values = {}
+            classes = self.get_app_classes()
+            # index records of lazy objects without building them (nor
+            # decoding them, when the indexed file has their values)
+            records = self._pending_records()
+            fields = getattr(records, "fields", records.__getitem__)
+            for key in objects:
+                if key not in records:
+                    self._index(key, objects[key])
+                else:
+                    cls = classes[key.partition(".")[0]]
+                    self._index(key, fields(key), cls)
+            FileStorage.__partitions = partitions
+            FileStorage.__partitioned = objects  # last, marks them ready
+        return partitions
+
+    def _stale_partitions(self):
+        """Check if the partitions don't match objects dictionary"""
+        objects = FileStorage.__objects
+        return FileStorage.__partitioned is not objects or sum(
+            map(len, FileStorage.__partitions.values())
+        ) != len(objects)
+
+    def _pending_records(self):
+        """Get the stored dictionaries of the objects not built yet
+        (dictionary-like, key: record)"""
+        objects = FileStorage.__objects
+        if isinstance(objects, LazyObjects):
+            return objects.records
+        return {}
+
+    def _record(self, key):
+        """Get the stored dictionary of an object not built yet (or None)"""
+        objects = FileStorage.__objects
+        if isinstance(objects, LazyObjects):
+            return objects.record(key)
+        return None
+
+    def _outdate(self, key):
+        """Flags the record of a changed object in the indexed file as
+        out of date, its instance isn't turned back into it on eviction
+        (see RecordFile.restore)"""
+        records = self._pending_records()
+        if isinstance(records, RecordFile):
+            records.outdate(key)
+
+    def _index(self, key, obj, cls=None):
+        """
+        Adds obj (stored under key) to the indexes of its class
+
+        Args:
+            key (str): <class_name>.id
+            obj: the object, or its stored dictionary
+            cls (type): class of the object (if obj is a dictionary)
+        """
+        self._unindex(key)
+        cls = cls or type(obj)
+        attributes = getattr(cls, "indexed_attributes", ())
+        if not attributes:
+            return
+        class_name = key.partition(".")[0]
+        values = {}
+        for attr in attributes:
+            if isinstance(obj, dict):
+                value = obj.get(attr, cls.attribute_default(attr))
+            else:
+                value = getattr(obj, attr, None)
+            index = FileStorage.__indexes.setdefault((class_name, attr), {})
+            try:
+                index.setdefault(value, {})[key] = None
+            except TypeError:  # unhashable value, can't be indexed
+                continue
+            values[attr] = value
+        FileStorage.__indexed_values[key] = values
+
+    def _unindex(self, key):
+        """Removes the object stored under key from the indexes"""
+        values = FileStorage.__indexed_values.pop(key, None)
+        if not values:
+            return
+        class_name = key.partition(".")[0]
+        for attr, value in values.items():
+            index = FileStorage.__indexes[(class_name, attr)]
+            index[value].pop(key, None)
+            if not index[value]:
+                del index[value]
+
+    def _journal_path(self):
+        """Get the path of the journal file"""
+        return f"{FileStorage.__file_path}.log"
+
+    def _shard_dir(self):
+        """Get the directory of the shard files (sharded layout)"""
+        return f"{FileStorage.__file_path}.d"
+
+    def _indexed_path(self):
+        """Get the path of the indexed file (indexed layout)"""
+        return f"{FileStorage.__file_path}.dat"
+
+    def _snapshot_dir(self):
+        """Get the directory of the snapshots (see snapshot)"""
+        return f"{FileStorage.__file_path}.snapshots"
+
+    def _snapshot_path(self, name):
+        """
+        Get the path of a snapshot file
+
+        Args:
+            name (str): name of the snapshot
+        Raises:
+            ValueError: if name isn't a valid snapshot name (letters,
+                digits, _, - and . only)
+        """
+        if not isinstance(name, str) or not re.fullmatch(r"\w[\w.-]*", name):
+            raise ValueError(f"invalid snapshot name: {name}")
+        return os.path.join(self._snapshot_dir(), f"{name}.json")
+
+    def _read_snapshot(self, name):
+        """
+        Read a snapshot file (see snapshot)
+
+        Args:
+            name (str): name of the snapshot
+        Returns:
+            dict - name, base, time, keys and objects of the snapshot
+        Raises:
+            ValueError: if the snapshot doesn't exist
+        """
+        try:
+            with open(self._snapshot_path(name), "rb") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            raise ValueError(f"no snapshot found: {name}") from None
+
+    def _changed_since(self, key, since):
+        """Check if a stored object was saved at or after a time (or has
+        no updated_at)"""
+        record = self._record(key)
+        if record is None:
+            obj = FileStorage.__objects[key]
+            updated_at = getattr(obj, "updated_at", None)
+        else:
+            updated_at = record.get("updated_at")
+        if isinstance(updated_at, str):
+            updated_at = datetime.fromisoformat(updated_at)
+        return updated_at is None or updated_at >= since
+
+    def _open_indexed(self):
+        """Get the records of the indexed file (mapped in memory)"""
+        path = self._indexed_path()
+        return RecordFile(path) if os.path.exists(path) else RecordFile()
+
+    def _indexed_records(self):
+        """Get the records to write to the indexed file, the ones of
+        objects never built are copied as is (see write_records)"""
+        records = self._pending_records()
+        classes = self.get_app_classes()
+        if isinstance(records, RecordFile):
+            return [
+                (
+                    key,
+                    records.raw(key),
+                    self._indexed_values(key, records.fields(key), classes),
+                )
+                if key in records
+                else self._indexed_record(key, classes)
+                for key in FileStorage.__objects
+            ]
+        return [
+            self._indexed_record(key, classes) for key in FileStorage.__objects
+        ]
+
+    def _indexed_record(self, key, classes):
+        """Get the (key, encoded record, indexed values) of an object"""
+        record = self._record(key)
+        if record is None:  # built, reuse its JSON
+            obj = FileStorage.__objects[key]
+            values = {
+                attr: getattr(obj, attr, None)
+                for attr in getattr(type(obj), "indexed_attributes", ())
+            }
+            return key, obj.to_json().encode("utf-8"), values
+        values = self._indexed_values(key, record, classes)
+        return key, encode_record(record), values
+
+    def _indexed_values(self, key, record, classes):
+        """Get the values of the indexed attributes of a record"""
+        cls = classes[key.partition(".")[0]]
+        return {
+            attr: record.get(attr, cls.attribute_default(attr))
+            for attr in getattr(cls, "indexed_attributes", ())
+        }
+
+    def _shard_of(self, key):
+        """Get the shard number of a key (within its class)"""
+        return zlib.crc32(key.encode()) % FileStorage.__shards
+
+    def _to_record(self, key):
+        """Get the dictionary of a stored object (to be saved)"""
+        # reuse the stored dictionaries of objects never built
+        return self._record(key) or FileStorage.__objects[key].to_dict()
+
+    def _to_content(self, key, fragments):
+        """Get what's written of a stored object: its JSON (see _to_json)
+        if fragments isn't None, its dictionary otherwise"""
+        if fragments is None:
+            return self._to_record(key)
+        return self._to_json(key, fragments)
+
+    def _to_json(self, key, fragments):
+        """
+        Get the JSON of a stored object (to be saved), only encoded if it
+        changed since the last save
+
+        Args:
+            key (str): <class_name>.id
+            fragments (dict): gets the (stored dictionary, JSON) of the
+                objects not built yet (see __fragments)
+        Returns:
+            str - JSON of the object dictionary
+        """
+        record = self._record(key)
+        if record is None:
+            return FileStorage.__objects[key].to_json()
+        fragment = FileStorage.__fragments.get(key)
+        # an evicted instance gives a new dictionary
+        if fragment is None or fragment[0] is not record:
+            fragment = (record, json.dumps(record, default=json_default))
+        fragments[key] = fragment
+        return fragment[1]
+
+    def _take_changes(self):
+        """
+        Get the keys changed/removed since the last save and start over
+        (called with the lock held, by the save holding the io lock)
+
+        Returns:
+            tuple - (changed keys, removed keys)
+        """
+        changes = (FileStorage.__dirty, FileStorage.__deleted)
+        FileStorage.__dirty = set()
+        FileStorage.__deleted = set()
+        FileStorage.__pending = False
+        FileStorage.__unflushed = 0
+        return changes
+
+    def _restore_changes(self, changes):
+        """Flags again the changes of a save that failed to write them"""
+        dirty, deleted = changes
+        with FileStorage.__lock.write():
+            objects = FileStorage.__objects
+            FileStorage.__dirty |= {key for key in dirty if key in objects}
+            FileStorage.__deleted |= {
+                key for key in deleted if key not in objects
+            }
+            FileStorage.__pending = True
+
+    def _write_file(self, path, dict, dump=None):
+        """
+        Writes a dictionary to a storage file, replacing it atomically
+
+        Args:
+            path (str): storage file
+            dict: content of the file
+            dump (function): writes dict to a binary file (by default,
+                the dump of the codec)
+        """
+        # write a temporary file first then swap it with the JSON file,
+        # so a crash while writing never leaves a truncated store behind
+        # (each writer has its own, other processes may write too)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory
+        )
+        try:
+            with open(fd, "wb") as file:
+                (dump or CODECS[FileStorage.__codec].dump)(dict, file)
+                FileStorage.__flush_stats["bytes"] += file.tell()
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._sync_directory(directory)
+
+    def _sync_directory(self, directory):
+        """Flushes the entries of a directory to disk, so a file replaced
+        in it stays replaced after a crash (on POSIX)"""
+        if os.name != "posix":
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _write_snapshot(self, changed_only=True):
+        """
+        Rewrites the JSON file with every object in storage
+        (or, in sharded layout, the shard files)
+
+        Args:
+            changed_only (bool): only rewrite the shards of changed objects
+        Returns:
+            tuple - (changed keys, removed keys) written
+        """
+        sharded = FileStorage.__layout == "sharded"
+        indexed = FileStorage.__layout == "indexed"
+        codec = CODECS[FileStorage.__codec]
+        # JSON files are made of the JSON of each object, which is only
+        # encoded again if the object changed
+        fragments = {} if hasattr(codec, "dump_fragments") else None
+        # collect the files' content under the read lock, then write them
+        with FileStorage.__lock.read():
+            if sharded:
+                changed_only = changed_only and os.path.isdir(
+                    self._shard_dir()
+                )
+                files = self._shard_files(changed_only, fragments)
+            elif indexed:
+                files = {self._indexed_path(): self._indexed_records()}
+            else:
+                # make a dictionary that includes objects as dictionaries
+                files = {
+                    FileStorage.__file_path: {
+                        key: self._to_content(key, fragments)
+                        for key in FileStorage.__objects
+                    }
+                }
+            if fragments is not None:
+                if sharded and changed_only:  # other shards unchanged
+                    FileStorage.__fragments.update(fragments)
+                else:
+                    FileStorage.__fragments = fragments
+            changes = self._take_changes()
+        try:
+            if sharded and not changed_only:
+                os.makedirs(self._shard_dir(), exist_ok=True)
+            if indexed:
+                dump = write_records
+            elif fragments is not None:
+                dump = codec.dump_fragments
+            else:
+                dump = None
+            for path, dict in files.items():
+                if dict or not sharded:  # empty shards are removed
+                    self._write_file(path, dict, dump)
+                elif os.path.exists(path):
+                    os.remove(path)
+            if sharded and not changed_only:
+                directory = self._shard_dir()
+                for name in os.listdir(directory):  # outdated shards
+                    path = os.path.join(directory, name)
+                    if not files.get(path):
+                        os.remove(path)
+        except BaseException:
+            self._restore_changes(changes)
+            raise
+        if indexed:
+            # records set in memory since the last save are read from the
+            # new file instead (see RecordFile.reopen)
+            with FileStorage.__lock.write():
+                if isinstance(self._pending_records(), RecordFile):
+                    FileStorage.__objects.reopen(
+                        self._indexed_path(), FileStorage.__dirty
+                    )
+        return changes
+
+    def _shard_files(self, changed_only, fragments=None):
+        """
+        Get the content of the shard files to rewrite
+
+        Args:
+            changed_only (bool): only the shards of changed objects
+            fragments (dict): see _to_content
+        Returns:
+            dict - path: key: object dictionary or its JSON (empty to
+                remove the file)
+        """
+        partitions = self._partitions()
+        directory = self._shard_dir()
+        if changed_only:
+            # class name: numbers of the shards to rewrite
+            targets = {}
+            for key in FileStorage.__dirty | FileStorage.__deleted:
+                class_name = key.partition(".")[0]
+                targets.setdefault(class_name, set()).add(self._shard_of(key))
+        else:
+            shards = set(range(FileStorage.__shards))
+            targets = {class_name: shards for class_name in partitions}
+
+        files = {}
+        for class_name, shards in targets.items():
+            buckets = {shard: {} for shard in shards}
+            for key in partitions.get(class_name, {}):
+                bucket = buckets.get(self._shard_of(key))
+                if bucket is not None:
+                    bucket[key] = self._to_content(key, fragments)
+            for shard, dict in buckets.items():
+                files[os.path.join(directory, f"{class_name}.{shard}")] = dict
+        return files
+
+    def _append_journal(self):
+        """Appends the changed/deleted objects to the journal, as one
+        line, so that a torn write drops all of them or none
+
+        Returns:
+            tuple - (changed keys, removed keys) written
+        """
+        with FileStorage.__lock.read():
+            objects = FileStorage.__objects
+            entry = {
+                "set": {
+                    key: objects[key].to_dict()
+                    for key in FileStorage.__dirty
+                    if key in objects
+                },
+                "delete": list(FileStorage.__deleted),
+            }
+            changes = self._take_changes()
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        try:
+            with open(self._journal_path(), "ab+") as file:
+                start = file.seek(0, os.SEEK_END)
+                if start:
+                    file.seek(start - 1)
+                    if file.read(1) != b"\n":
+                        # torn write at the end of the log, don't add to
+                        # its line (replay skips it)
+                        line = b"\n" + line
+                file.write(line)  # at the end, whatever the position
+                file.flush()
+                os.fsync(file.fileno())
+                size = file.tell()
+            FileStorage.__flush_stats["bytes"] += size - start
+        except BaseException:
+            self._restore_changes(changes)
+            raise
+
+        if size > FileStorage.__journal_limit:
+            self.compact()
+        return changes
+
+    def _iter_records(self):
+        """
+        Read stored objects (as dictionaries) one at a time from the JSON
+        file, with the journal replayed on top of them
+
+        Yields:
+            tuple - (key, object dictionary)
+        """
+        if not os.path.exists(self._journal_path()):
+            yield from self._iter_snapshot()
+            return
+
+        records = dict(self._iter_snapshot())
+        self._replay_journal(records)
+        yield from records.items()
+
+    def _read_records(self, keys):
+        """
+        Read the stored dictionaries of some objects, with the journal
+        replayed on top of them: only their records are decoded in
+        indexed layout, only the shards holding them are read in sharded
+        layout (the JSON file is parsed whole in single layout)
+
+        Args:
+            keys (set): keys of the objects
+        Returns:
+            dict - key: object dictionary (of the keys that are stored)
+        """
+        if FileStorage.__layout == "indexed":
+            file = self._open_indexed()
+            records = {key: file[key] for key in keys if key in file}
+        elif FileStorage.__layout == "sharded":
+            directory = self._shard_dir()
+            paths = {
+                os.path.join(
+                    directory,
+                    f"{key.partition('.')[0]}.{self._shard_of(key)}",
+                )
+                for key in keys
+            }
+            records = {}
+            for path in sorted(paths):
+                if os.path.exists(path):
+                    records.update(
+                        (key, record)
+                        for key, record in _load_shard(path).items()
+                        if key in keys
+                    )
+        else:
+            records = {
+                key: record
+                for key, record in self._iter_file()
+                if key in keys
+            }
+        if os.path.exists(self._journal_path()):
+            self._replay_journal(records, keys)
+        return records
+
+    def _replay_journal(self, records, keys=None):
+        """
+        Applies the changes of the journal to stored dictionaries
+
+        Args:
+            records (dict): key: object dictionary, updated
+            keys (set): only apply the changes of these keys (None: all)
+        """
+        with open(self._journal_path(), "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write, later saves start a new line
+                changes = entry["set"]
+                deleted = entry["delete"]
+                if keys is not None:
+                    changes = {
+                        key: record
+                        for key, record in changes.items()
+                        if key in keys
+                    }
+                    deleted = [key for key in deleted if key in keys]
+                for key in deleted:
+                    records.pop(key, None)
+                records.update(changes)
+
+    def _iter_snapshot(self):
+        """Stream the (key, object dictionary) pairs stored in the
+        JSON file (or in the shard files / the indexed file, depending
+        on the layout)"""
+        if FileStorage.__layout == "sharded":
+            yield from self._iter_shards()
+        elif FileStorage.__layout == "indexed":
+            yield from self._open_indexed().items()
+        else:
+            yield from self._iter_file()
+
+    def _iter_shards(self):
+        """Stream the (key, object dictionary) pairs of the shard files,
+        decoded in parallel by a process pool for large stores (with
+        several CPUs, where processes can be forked)"""
+        directory = self._shard_dir()
+        if not os.path.isdir(directory):
+            return
+        paths = [
+            os.path.join(directory, name)
+            for name in sorted(os.listdir(directory))
+            if not name.endswith(".tmp")
+        ]
+        size = sum(os.path.getsize(path) for path in paths)
+        # one CPU: the workers would only add the cost of sending back
+        # the decoded objects
+        workers = min(len(paths), os.cpu_count() or 1)
+        if (
+            workers > 1
+            and size >= FileStorage.__parallel_min_size
+            and "fork" in multiprocessing.get_all_start_methods()
+        ):
+            # the first reload runs while models is being imported: the
+            # workers are forked (spawned ones would import models again)
+            # and only get stdlib functions and bytes, as pickling anything
+            # from models would wait for that import to finish
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                futures = [
+                    pool.submit(*_read_shard(path)) for path in paths
+                ]
+                for future in futures:
+                    yield from future.result().items()
+        else:
+            for path in paths:
+                yield from _load_shard(path).items()
+
+    def _iter_file(self):
+        """Stream the (key, object dictionary) pairs of the JSON file"""
+        if not os.path.exists(FileStorage.__file_path):
+            return
+        with open(FileStorage.__file_path, "rb") as file:
+            # JSON files are parsed one object at a time instead of
+            # loaded whole, so their text and decoded form never sit
+            # in memory (binary formats are decoded at once)
+            yield from detect_codec(file).load(file)
+
+    def get_app_classes(self):
+        """Get a dictionary that holds all app classes | names, references"""
+        from models.base_model import BaseModel
+        from models.user import User
+        from models.state import State
+        from models.city import City
+        from models.amenity import Amenity
+        from models.place import Place
+        from models.review import Review
+
+        return {
+            "BaseModel": BaseModel,
+            "User": User,
+            "State": State,
+            "City": City,
+            "Amenity": Amenity,
+            "Place": Place,
+            "Review": Review,
+        }
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""This module contains helpers to read a JSON object incrementally"""
+
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# "key": (without escape sequences), the way keys of storage files look
+_PLAIN_KEY = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+
+
+def iter_json_object(file, chunk_size=64 * 1024):
+    """
+    Read a JSON object (ex. storage file) one key/value pair at a time,
+    without holding the whole document (text or decoded) in memory
+
+    Args:
+        file: text file opened for reading
+        chunk_size (int): number of characters read at a time
+    Yields:
+        tuple - (key, decoded value) for each item of the JSON object
+    Raises:
+        json.JSONDecodeError: if the document isn't a valid JSON object
+    """
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        """Reads the next chunk, drops the consumed part of the buffer"""
+        nonlocal buffer, pos, eof
+        chunk = file.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def next_char():
+        """Skips whitespaces, get the next character ('' at the end)"""
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            fill()
+
+    def expect(chars):
+        """Consumes the next character, which must be one of chars"""
+        nonlocal pos
+        char = next_char()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                f"Expecting one of {chars!r}", buffer, pos
+            )
+        pos += 1
+        return char
+
+    def value():
+        """Decodes the next JSON value"""
+        nonlocal pos
+        next_char()
+        while True:
+            try:
+                result, end = _decoder.raw_decode(buffer, pos)
+                # a value ending with the buffer may continue in the
+                # next chunk (ex. numbers), so read more to be sure
+                if end < len(buffer) or eof:
+                    pos = end
+                    return result
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    expect("{")
+    if next_char() == "}":
+        return
+    while True:
+        # fast path: plain key then a value that ends inside the buffer
+        match = _PLAIN_KEY.match(buffer, pos)
+        if match and match.end() < len(buffer):
+            key = match.group(1)
+            try:
+                result, end = _decoder.raw_decode(buffer, match.end())
+            except json.JSONDecodeError:
+                end = len(buffer)
+            if end < len(buffer):
+                pos = end
+                yield key, result
+                if expect(",}") == "}":
+                    return
+                continue
+        # slow path: escaped key, or an item split between two chunks
+        key = value()
+        expect(":")
+        yield key, value()
+        if expect(",}") == "}":
+            return
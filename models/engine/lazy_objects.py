@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+"""This module contains LazyObjects class"""
+
+import threading
+import weakref
+from collections import OrderedDict
+
+# placeholder value of the keys not turned into instances yet
+_PENDING = object()
+
+
+class LazyObjects(dict):
+    """
+    Objects dictionary that keeps the stored dictionaries (records) of
+    objects and only builds an instance the first time its key is read.
+    Keys, membership tests and len() never build instances.
+    Concurrent reads of a pending key build a single instance.
+    With a limit, only the most recently used instances are kept, the
+    others are turned back into records (evicted): records that can
+    restore() the one an instance was built from take it back, the
+    others get it from unbuild.
+    """
+
+    def __init__(self, records, build, limit=None, unbuild=None):
+        """
+        Class constructor
+
+        Args:
+            records (dict): key: object dictionary (as stored), or any
+                dictionary-like object decoding them on access
+            build (function): turns a stored dictionary into an instance
+            limit (int): maximum number of instances kept (None: all)
+            unbuild (function): turns an evicted instance back into a
+                stored dictionary (required with a limit)
+        """
+        super().__init__(dict.fromkeys(records, _PENDING))
+        self._records = records
+        self._build = build
+        self._lock = threading.RLock()  # held while building an instance
+        self._limit = limit
+        self._unbuild = unbuild
+        self._recent = OrderedDict()  # built keys, least recent first
+        # evicted instances still used elsewhere, given back if their key
+        # is read again (so a key never has two instances at once)
+        self._evicted = weakref.WeakValueDictionary()
+        self._stats = dict(hits=0, misses=0, evictions=0)
+
+    def __getitem__(self, key):
+        """Get an object, building it from its record if needed"""
+        value = super().__getitem__(key)
+        if value is not _PENDING and self._limit is None:
+            return value
+        with self._lock:
+            value = super().__getitem__(key)
+            if value is _PENDING:  # not built by another thread
+                self._stats["misses"] += 1
+                value = self._evicted.pop(key, None)
+                if value is None:
+                    value = self._build(self._records.pop(key))
+                else:
+                    del self._records[key]
+                super().__setitem__(key, value)
+                self._use(key)
+            elif self._limit is not None:
+                self._stats["hits"] += 1
+                self._recent.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        """Set an object (replaces its record if any)"""
+        with self._lock:
+            self._forget(key)
+            super().__setitem__(key, value)
+            self._use(key)
+
+    def __delitem__(self, key):
+        """Remove an object or its record"""
+        with self._lock:
+            super().__delitem__(key)
+            self._forget(key)
+            self._recent.pop(key, None)
+
+    def get(self, key, default=None):
+        """Get an object if key exists, default otherwise"""
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        """Remove an object and return it"""
+        if key not in self:
+            return super().pop(key, *default)  # default or KeyError
+        value = self[key]
+        del self[key]
+        return value
+
+    def values(self):
+        """Get all objects (builds every pending instance)"""
+        if self._limit is not None:  # they can't all be kept at once
+            return (self[key] for key in list(self))
+        self.materialize()
+        return super().values()
+
+    def items(self):
+        """Get all key, object pairs (builds every pending instance)"""
+        if self._limit is not None:
+            return ((key, self[key]) for key in list(self))
+        self.materialize()
+        return super().items()
+
+    def clear(self):
+        """Remove all objects and records"""
+        with self._lock:
+            super().clear()
+            self._records.clear()
+            self._evicted.clear()
+            self._recent.clear()
+
+    def copy(self):
+        """Get a shallow copy (pending keys stay pending, their records
+        are shared: build must not change them)"""
+        copy = LazyObjects({}, self._build, self._limit, self._unbuild)
+        with self._lock:
+            dict.update(copy, self)
+            copy._records = self._records.copy()
+            copy._recent = self._recent.copy()
+        return copy
+
+    @property
+    def records(self):
+        """Stored dictionaries of the keys not built yet (key: record)"""
+        return self._records
+
+    def record(self, key):
+        """Get the stored dictionary of a key not built yet (or None)"""
+        if super().get(key) is _PENDING:
+            return self._records[key]
+        return None
+
+    def reopen(self, path, changed=()):
+        """Maps a new version of the indexed file the records come from
+        (see RecordFile.reopen)"""
+        with self._lock:
+            self._records.reopen(path, changed)
+
+    def materialize(self):
+        """Builds every pending instance"""
+        for key in list(self._records):
+            self[key]
+
+    def stats(self):
+        """
+        Get the figures of the instance cache
+
+        Returns:
+            dict - hits, misses (instances built or given back),
+                evictions, size (instances kept) and limit
+        """
+        with self._lock:
+            stats = self._stats.copy()
+            stats["size"] = len(self) - len(self._records)
+        stats["limit"] = self._limit
+        return stats
+
+    def _forget(self, key):
+        """Drops the record and the evicted instance of a key (if any)"""
+        if key in self._records:
+            del self._records[key]
+        self._evicted.pop(key, None)
+
+    def _use(self, key):
+        """Marks a built key as the most recent one, evicting the least
+        recent instances over the limit (called with the lock held)"""
+        if self._limit is None:
+            return
+        recent = self._recent
+        recent[key] = None
+        recent.move_to_end(key)
+        while len(recent) > self._limit:
+            old = recent.popitem(last=False)[0]
+            obj = super().__getitem__(old)
+            restore = getattr(self._records, "restore", None)
+            if restore is None or not restore(old):
+                self._records[old] = self._unbuild(obj)
+            super().__setitem__(old, _PENDING)
+            try:
+                self._evicted[old] = obj
+            except TypeError:  # no weak references (compact instances)
+                pass
+            self._stats["evictions"] += 1
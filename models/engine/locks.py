@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""This module contains ReadWriteLock class"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Lock shared by any number of readers, or held by a single writer
+    - writers wait for the current readers, new readers wait for the
+      waiting writers (so a stream of readers never starves them)
+    - the writer may take the lock again (read or write) while holding it
+    - a reader must not take it again, nor ask for the write lock
+    """
+
+    def __init__(self):
+        """Class constructor"""
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writer = None  # thread holding the write lock
+        self.__depth = 0  # nested acquisitions of the writer
+        self.__waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """Holds the lock as a reader for the duration of a block"""
+        me = threading.get_ident()
+        with self.__condition:
+            if self.__writer == me:
+                self.__depth += 1
+            else:
+                while self.__writer is not None or self.__waiting_writers:
+                    self.__condition.wait()
+                self.__readers += 1
+        try:
+            yield
+        finally:
+            self.__release(me)
+
+    @contextmanager
+    def write(self):
+        """Holds the lock as the only writer for the duration of a block"""
+        me = threading.get_ident()
+        with self.__condition:
+            if self.__writer != me:
+                self.__waiting_writers += 1
+                try:
+                    while self.__writer is not None or self.__readers:
+                        self.__condition.wait()
+                finally:
+                    self.__waiting_writers -= 1
+                self.__writer = me
+            self.__depth += 1
+        try:
+            yield
+        finally:
+            self.__release(me)
+
+    def __release(self, me):
+        """Releases one acquisition of the calling thread"""
+        with self.__condition:
+            if self.__writer == me:
+                self.__depth -= 1
+                if self.__depth == 0:
+                    self.__writer = None
+                    self.__condition.notify_all()
+            else:
+                self.__readers -= 1
+                if self.__readers == 0:
+                    self.__condition.notify_all()
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""This module contains the query evaluator of the storage engines"""
+
+import operator
+from itertools import islice
+
+# operators of the conditions (attribute, operator, value)
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def check_conditions(conditions):
+    """
+    Check the conditions of a query
+
+    Args:
+        conditions (iterable): (attribute, operator, value) tuples, "="
+            being the same as "=="
+    Returns:
+        list - the conditions, with "==" for "="
+    Raises:
+        ValueError: if an operator isn't supported
+    """
+    checked = []
+    for attr, op, value in conditions:
+        op = "==" if op == "=" else op
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        checked.append((attr, op, value))
+    return checked
+
+
+def matches(obj, conditions):
+    """
+    Check if an object meets all the conditions (see check_conditions),
+    a missing attribute being None and values that can't be compared
+    (ex. a string and a number) not matching
+
+    Args:
+        obj: the object
+        conditions (list): (attribute, operator, value) tuples
+    Returns:
+        bool - True if it meets every condition
+    """
+    for attr, op, value in conditions:
+        try:
+            if not OPERATORS[op](getattr(obj, attr, None), value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def page(items, offset=0, limit=None):
+    """Get an iterator over the items from offset, limit of them at most
+    (None: no limit)"""
+    return islice(items, offset, None if limit is None else offset + limit)
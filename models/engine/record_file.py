@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+"""This module contains the indexed storage file format (RecordFile)"""
+
+import json
+import mmap
+from models.engine.codecs import json_default
+
+# indexed files start with this line, then hold:
+# - each record as a line of JSON
+# - the index, a line of JSON: {key: [offset, length, indexed values]}
+# - the offset of the index, as a line of INDEX_DIGITS digits
+HEADER = b"#HBNB indexed\n"
+INDEX_DIGITS = 20
+
+
+def write_records(records, file):
+    """
+    Writes records and their index to an indexed file
+
+    Args:
+        records (iterable): (key, encoded record, indexed values) tuples,
+            the encoded record being a line of JSON (bytes, no newline)
+        file: binary file opened for writing (at the start)
+    """
+    index = {}
+    offset = len(HEADER)
+    file.write(HEADER)
+    for key, data, values in records:
+        file.write(data + b"\n")
+        index[key] = (offset, len(data), values)
+        offset += len(data) + 1
+    file.write(json.dumps(index, default=json_default).encode("utf-8"))
+    file.write(b"\n" + str(offset).zfill(INDEX_DIGITS).encode() + b"\n")
+
+
+def encode_record(record):
+    """Get the line of JSON of a record (see write_records)"""
+    return json.dumps(record, default=json_default).encode("utf-8")
+
+
+class RecordFile:
+    """
+    Records of an indexed file, mapped in memory: opening it only reads
+    the index, a record is decoded when it's read (dictionary-like).
+    Records set afterwards are kept in memory, encoded. Removed records
+    can be brought back while they're not outdated (see restore).
+    """
+
+    def __init__(self, path=None):
+        """
+        Class constructor
+
+        Args:
+            path (str): indexed file (None for an empty one)
+        Raises:
+            ValueError: if the file isn't an indexed file
+        """
+        self.__data = b""
+        self.__index = {}
+        self.__added = {}  # key: encoded record, set after opening
+        self.__removed = {}  # key: index entry of the removed records
+        if path is None:
+            return
+        with open(path, "rb") as file:
+            # the mapping stays valid after the file is closed or
+            # replaced by a new version
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(data)
+        footer = INDEX_DIGITS + 1
+        if data[:len(HEADER)] != HEADER or size < len(HEADER) + footer:
+            raise ValueError(f"Not an indexed storage file: {path}")
+        start = int(data[size - footer:size - 1])
+        self.__data = data
+        self.__index = json.loads(data[start:size - footer - 1])
+
+    def __getitem__(self, key):
+        """Get the record of a key (decoded from the file)"""
+        return json.loads(self.raw(key))
+
+    def __setitem__(self, key, record):
+        """Set the record of a key (kept in memory)"""
+        self.__index.pop(key, None)
+        self.__removed.pop(key, None)
+        self.__added[key] = encode_record(record)
+
+    def __delitem__(self, key):
+        """Remove a key, without decoding its record"""
+        if self.__added.pop(key, None) is None:
+            self.__removed[key] = self.__index.pop(key)
+
+    def __contains__(self, key):
+        """Check if the file has a record for key"""
+        return key in self.__index or key in self.__added
+
+    def __iter__(self):
+        """Iterate over the keys (in file order, then the ones set)"""
+        yield from self.__index
+        yield from self.__added
+
+    def __len__(self):
+        """Get the number of records"""
+        return len(self.__index) + len(self.__added)
+
+    def raw(self, key):
+        """Get the line of JSON of a key's record, not decoded"""
+        if key in self.__added:
+            return self.__added[key]
+        offset, length, values = self.__index[key]
+        return self.__data[offset:offset + length]
+
+    def fields(self, key):
+        """Get the indexed attributes of a key's record, without
+        decoding it (see write_records), or the whole record for the
+        records set in memory"""
+        if key in self.__added:
+            return self[key]
+        return self.__index[key][2]
+
+    def pop(self, key, *default):
+        """Remove a key and return its record"""
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        record = self[key]
+        del self[key]
+        return record
+
+    def restore(self, key):
+        """
+        Brings back the record of a removed key, as read from the file
+
+        Args:
+            key (str): key removed since the file was read
+        Returns:
+            bool - False if its record was never in the file, was set in
+                memory or outdated since (see outdate)
+        """
+        entry = self.__removed.pop(key, None)
+        if entry is None:
+            return False
+        self.__index[key] = entry
+        return True
+
+    def outdate(self, key):
+        """Flags the record of a removed key as out of date (its object
+        changed), restore() won't bring it back"""
+        self.__removed.pop(key, None)
+
+    def reopen(self, path, changed=()):
+        """
+        Maps a new version of the file, written from these records and
+        the objects of the removed ones: the records it holds are read
+        from it again (those set in memory are dropped), except those of
+        changed keys
+
+        Args:
+            path (str): the new indexed file (see write_records)
+            changed (set): keys changed since the new file was written
+        """
+        new = RecordFile(path)
+        index = {}
+        removed = {}
+        for key, entry in new.__index.items():
+            if key in self.__added:
+                if key in changed:
+                    continue  # newer than the file
+                del self.__added[key]
+                index[key] = entry
+            elif key in self.__index:
+                index[key] = entry
+            elif key not in changed:
+                removed[key] = entry
+        self.__data = new.__data
+        self.__index = index
+        self.__removed = removed
+
+    def clear(self):
+        """Remove every key"""
+        self.__index.clear()
+        self.__added.clear()
+        self.__removed.clear()
+
+    def copy(self):
+        """Get a copy (sharing the mapped file)"""
+        copy = RecordFile()
+        copy.__data = self.__data
+        copy.__index = self.__index.copy()
+        copy.__added = self.__added.copy()
+        copy.__removed = self.__removed.copy()
+        return copy
+
+    def items(self):
+        """Iterate over the (key, record) pairs, decoding every record"""
+        for key in self:
+            yield key, self[key]
+
@@ -1,20 +1,23 @@
-#!/usr/bin/python3
-"""This module contains the Place class representation"""
-
-from models.base_model import BaseModel
-
-
-class Place(BaseModel):
-    """Place class representation"""
-
-    city_id = ""
-    user_id = ""
-    name = ""
-    description = ""
-    number_rooms = 0
-    number_bathrooms = 0
-    max_guest = 0
-    price_by_night = 0
-    latitude = 0.0
-    longitude = 0.0
-    amenity_ids = []
+#!/usr/bin/python3
+"""This module contains the Place class representation"""
+
+from models.base_model import BaseModel
+
+
+class Place(BaseModel):
+    """Place class representation"""
+
+    # attributes FileStorage keeps a lookup index for
+    indexed_attributes = ("city_id", "user_id")
+
+    city_id = ""
+    user_id = ""
+    name = ""
+    description = ""
+    number_rooms = 0
+    number_bathrooms = 0
+    max_guest = 0
+    price_by_night = 0
+    latitude = 0.0
+    longitude = 0.0
+    amenity_ids = []
@@ -1,12 +1,15 @@
-#!/usr/bin/python3
-"""This module contains the Review class representation"""
-
-from models.base_model import BaseModel
-
-
-class Review(BaseModel):
-    """Review class representation"""
-
-    place_id = ""
-    user_id = ""
-    text = ""
+#!/usr/bin/python3
+"""This module contains the Review class representation"""
+
+from models.base_model import BaseModel
+
+
+class Review(BaseModel):
+    """Review class representation"""
+
+    # attributes FileStorage keeps a lookup index for
+    indexed_attributes = ("place_id", "user_id")
+
+    place_id = ""
+    user_id = ""
+    text = ""
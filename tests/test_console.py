@@ -4,10 +4,12 @@
 import unittest
 from unittest.mock import patch
 from io import StringIO
-from console import HBNBCommand
-from models.engine.file_storage import FileStorage
+from console import HBNBCommand, main
+from models.engine.file_storage import FileStorage, StorageConflictError
 from models import storage
+import json
 import os
+import shutil
 
 from models.user import User
 
@@ -30,6 +32,12 @@ class TestHBNBCommand(unittest.TestCase):
         """Runs after each test"""
         # resets storage data
         FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__transaction = None
+        # remove snapshots
+        shutil.rmtree(
+            f"{FileStorage._FileStorage__file_path}.snapshots",
+            ignore_errors=True,
+        )
         if os.path.isfile(FileStorage._FileStorage__file_path):
             # remove json file
             os.remove(FileStorage._FileStorage__file_path)
@@ -42,13 +50,20 @@ class TestHBNBCommand(unittest.TestCase):
         commands = [
             "EOF",
             "all",
+            "begin",
+            "commit",
             "count",
             "create",
             "destroy",
             "help",
             "quit",
+            "restore",
+            "rollback",
             "show",
+            "snapshot",
+            "stats",
             "update",
+            "where",
         ]
         # help command output
         result = f.getvalue()
@@ -259,6 +274,123 @@ class TestHBNBCommand(unittest.TestCase):
             output = f.getvalue()[:-1]
             self.assertEqual(output, "** class doesn't exist **")
 
+    def test_all_pages(self):
+        """Test all command output, limit and offset"""
+        users = [User() for i in range(3)]
+        users[0].first_name = "O'Brien"
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("all User")
+        # same as printing the whole list
+        self.assertEqual(
+            f.getvalue(), f"{[str(user) for user in users]}\n"
+        )
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("all User offset=1 limit=1")
+        self.assertEqual(f.getvalue(), f"{[str(users[1])]}\n")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("User.all(limit=2)")
+        self.assertEqual(
+            f.getvalue(), f"{[str(user) for user in users[:2]]}\n"
+        )
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("all offset=10")
+        self.assertEqual(f.getvalue(), "[]\n")
+
+        # errors
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("all User limit=-1")
+        self.assertEqual(f.getvalue()[:-1], "** invalid option: limit=-1 **")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("all size=1")
+        self.assertEqual(f.getvalue()[:-1], "** invalid option: size=1 **")
+
+    def test_where(self):
+        """Test where command"""
+        from models.place import Place
+
+        places = [Place() for i in range(3)]
+        for i, place in enumerate(places):
+            place.city_id = "c1" if i else "c2"
+            place.price_by_night = i * 50
+            place.name = f"Place {i}"
+            place.save()
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(
+                "where Place city_id == c1 and price_by_night < 100"
+            )
+        self.assertEqual(f.getvalue(), f"{[str(places[1])]}\n")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd(
+                'Place.where(name == "Place 2", price_by_night >= 100)'
+            )
+        self.assertEqual(f.getvalue(), f"{[str(places[2])]}\n")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("where Place city_id = c1 offset=1 limit=1")
+        self.assertEqual(f.getvalue(), f"{[str(places[2])]}\n")
+
+        # errors
+        errors = {
+            "where": "** class name missing **",
+            "where MarsClass a == 1": "** class doesn't exist **",
+            "where Place": "** condition missing **",
+            "where Place name ~ a": "** invalid condition: name ~ a **",
+            "where Place name == a limit=x": "** invalid option: limit=x **",
+        }
+        for command, error in errors.items():
+            with patch("sys.stdout", new=StringIO()) as f:
+                HBNBCommand().onecmd(command)
+            self.assertEqual(f.getvalue()[:-1], error)
+
+    def test_batch(self):
+        """Test batch mode: same output, changes written at once"""
+        commands = "create User\ncount User\n\nUser.count()\nbogus\n"
+        with patch("sys.stdout", new=StringIO()) as f:
+            with patch("sys.stderr", new=StringIO()) as err:
+                count = HBNBCommand().run_batch(StringIO(commands * 3))
+        self.assertEqual(count, 15)
+        output = f.getvalue().split("\n")
+        self.assertEqual(output[1:3], ["1", "1"])
+        self.assertEqual(output[-3:], ["3", "3", ""])
+        self.assertRegex(err.getvalue(), r"^batch: 15 commands in ")
+        self.assertIn(", 1 writes", err.getvalue())
+        with open(FileStorage._FileStorage__file_path) as file:
+            self.assertEqual(len(json.load(file)), 3)
+
+        # every 2 commands, stops on quit
+        with patch("sys.stdout", new=StringIO()) as f:
+            with patch("sys.stderr", new=StringIO()) as err:
+                count = HBNBCommand().run_batch(
+                    StringIO("create User\n" * 4 + "quit\ncount User\n"),
+                    commit_every=2,
+                )
+        self.assertEqual(count, 5)
+        self.assertIn(", 2 writes", err.getvalue())
+        self.assertEqual(storage.count(User), 7)
+
+    def test_batch_conflicts(self):
+        """Test batch mode reports the writes rejected by the storage,
+        the last one too"""
+        error = StorageConflictError("changed by another process: User.1")
+        with patch("sys.stdout", new=StringIO()) as f, patch(
+            "sys.stderr", new=StringIO()
+        ) as err, patch.object(type(storage), "flush", side_effect=error):
+            count = HBNBCommand().run_batch(
+                StringIO("create User\n" * 3), commit_every=2
+            )
+        self.assertEqual(count, 3)
+        lines = f.getvalue().split("\n")
+        self.assertEqual(lines[2], "** changed by another process: User.1 **")
+        self.assertEqual(lines[4], "** changed by another process: User.1 **")
+        self.assertRegex(err.getvalue(), r"^batch: 3 commands in ")
+
+    def test_batch_missing_file(self):
+        """Test a batch file that can't be read is a usage error"""
+        with patch("sys.stderr", new=StringIO()) as err:
+            with self.assertRaises(SystemExit) as exit:
+                main(["--batch", "/nonexistent"])
+        self.assertEqual(exit.exception.code, 2)
+        self.assertIn("can't open '/nonexistent'", err.getvalue())
+
     def test_count_all(self):
         """Test count command on all classes."""
         for classname in self.classes:
@@ -383,6 +515,99 @@ class TestHBNBCommand(unittest.TestCase):
         output = f.getvalue()[:-1]
         self.assertEqual(output, "** value missing **")
 
+    def test_transaction(self):
+        """Test begin, commit and rollback commands"""
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd("create User")
+        self.assertEqual(f.getvalue().count("\n"), 1)  # only the id
+        id = f.getvalue()[:-1]
+        # nothing written before commit
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("commit")
+        self.assertEqual(f.getvalue(), "")
+        self.assertTrue(os.path.isfile(FileStorage._FileStorage__file_path))
+
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd(f"destroy User {id}")
+            HBNBCommand().onecmd("create User")
+            HBNBCommand().onecmd("rollback")
+            HBNBCommand().onecmd("count User")
+            HBNBCommand().onecmd(f"show User {id}")
+        output = f.getvalue().split("\n")
+        self.assertEqual(output[1], "1")
+        self.assertIn(id, output[2])
+
+        # errors
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("commit")
+        self.assertEqual(f.getvalue()[:-1], "** no transaction in progress **")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("rollback")
+        self.assertEqual(f.getvalue()[:-1], "** no transaction in progress **")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd("rollback")
+        self.assertEqual(
+            f.getvalue()[:-1], "** transaction already in progress **"
+        )
+
+    def test_snapshot(self):
+        """Test snapshot and restore commands"""
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("create User")
+            HBNBCommand().onecmd("snapshot backup")
+            HBNBCommand().onecmd("create User")
+            HBNBCommand().onecmd("snapshot")
+        output = f.getvalue().split("\n")
+        self.assertEqual(output[1], "backup")
+        self.assertIn(output[3], storage.snapshots())
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("restore backup")
+            HBNBCommand().onecmd("count User")
+        self.assertEqual(f.getvalue(), "1\n")
+
+        # errors
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("restore")
+        self.assertEqual(f.getvalue()[:-1], "** snapshot name missing **")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("restore missing")
+        self.assertEqual(f.getvalue()[:-1], "** no snapshot found **")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("snapshot backup")
+        self.assertEqual(f.getvalue()[:-1], "** snapshot already exists **")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("snapshot other missing")
+        self.assertEqual(f.getvalue()[:-1], "** no snapshot found **")
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("snapshot a/b")
+        self.assertEqual(
+            f.getvalue()[:-1], "** invalid snapshot name: a/b **"
+        )
+        # base of an incremental snapshot removed
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("snapshot step backup")
+        os.remove(os.path.join(
+            f"{FileStorage._FileStorage__file_path}.snapshots", "backup.json"
+        ))
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("restore step")
+        self.assertEqual(f.getvalue()[:-1], "** no snapshot found: backup **")
+
+    def test_conflict(self):
+        """Test saves rejected by the storage are reported"""
+        error = StorageConflictError("changed by another process: User.1")
+        with patch("sys.stdout", new=StringIO()) as f:
+            with patch.object(storage, "save", side_effect=error):
+                HBNBCommand().onecmd("create User")
+        self.assertEqual(
+            f.getvalue()[:-1], "** changed by another process: User.1 **"
+        )
+
     def test_update_with_dict(self):
         """Test update_with_dict function"""
         obj = User()
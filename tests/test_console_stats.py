@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""Unittests for console_stats.py"""
+
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from console import HBNBCommand, main
+from console_stats import CommandStats, Histogram
+from models import storage
+from models.engine.file_storage import FileStorage
+
+
+class TestHistogram(unittest.TestCase):
+    """Contains test cases for the Histogram class"""
+
+    def test_add(self):
+        """Test values go in power of two buckets"""
+        histogram = Histogram()
+        for value in (0, 1, 3, 4, 100):
+            histogram.add(value)
+        figures = histogram.to_dict()
+        self.assertEqual(figures["count"], 5)
+        self.assertEqual(figures["total"], 108)
+        self.assertEqual(figures["max"], 100)
+        self.assertEqual(
+            figures["buckets"], {"0": 1, "1": 1, "3": 1, "7": 1, "127": 1}
+        )
+        self.assertEqual(figures["p50"], 3)
+        self.assertEqual(figures["p99"], 100)  # no more than the max
+
+
+class TestCommandStats(unittest.TestCase):
+    """Contains test cases for the CommandStats class"""
+
+    def tearDown(self):
+        """Runs after each test"""
+        HBNBCommand.stats.uninstall()
+        HBNBCommand.stats = None
+        FileStorage._FileStorage__objects = {}
+        if os.path.isfile(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def setUp(self):
+        """Runs before each test"""
+        HBNBCommand.stats = CommandStats()
+
+    def test_commands(self):
+        """Test the figures measured per command"""
+        console = HBNBCommand()
+        with patch("sys.stdout", new=StringIO()) as f:
+            console.onecmd("create User")
+            console.onecmd("create User")
+            console.onecmd("User.all()")  # named after the command it runs
+            console.onecmd("count User")
+        report = HBNBCommand.stats.report()
+        self.assertEqual(list(report), ["all", "count", "create"])
+        self.assertEqual(report["create"]["total"]["count"], 2)
+        self.assertGreater(report["create"]["persist"]["total"], 0)
+        self.assertGreater(report["create"]["bytes_written"]["total"], 0)
+        self.assertEqual(report["all"]["objects_scanned"]["total"], 2)
+        self.assertEqual(report["count"]["objects_scanned"]["total"], 0)
+        self.assertEqual(report["all"]["bytes_written"]["total"], 0)
+        self.assertGreater(report["all"]["parse"]["count"], 0)
+
+        with patch("sys.stdout", new=StringIO()) as f:
+            console.onecmd("stats")
+        lines = f.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("command"))
+        self.assertTrue(lines[1].startswith("all"))
+        with patch("sys.stdout", new=StringIO()) as f:
+            console.onecmd("stats json")
+        self.assertIn("create", json.loads(f.getvalue()))
+        with patch("sys.stdout", new=StringIO()) as f:
+            console.onecmd("stats reset")
+            console.onecmd("stats json")
+        # only the reset command itself is left
+        self.assertEqual(list(json.loads(f.getvalue())), ["stats"])
+
+    def test_scanned(self):
+        """Test objects scanned are the ones examined, matching or not"""
+        console = HBNBCommand()
+        with patch("sys.stdout", new=StringIO()) as f:
+            for i in range(3):
+                console.onecmd("create User")
+            console.onecmd('where User first_name == "Betty"')
+        self.assertEqual(f.getvalue().splitlines()[-1], "[]")
+        report = HBNBCommand.stats.report()
+        self.assertEqual(report["where"]["objects_scanned"]["total"], 3)
+
+    def test_dump(self):
+        """Test the figures are written to stats_file on exit"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stats.json")
+            with patch.object(HBNBCommand, "stats_file", path):
+                console = HBNBCommand()
+                with patch("sys.stdout", new=StringIO()):
+                    console.onecmd("count User")
+                    console.onecmd("quit")
+            with open(path, "r", encoding="utf-8") as file:
+                self.assertIn("count", json.load(file))
+
+    def test_dump_batch(self):
+        """Test batches write the figures once, quitting or not"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "commands")
+            for commands in ("count User\n", "count User\nquit\n"):
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write(commands)
+                with patch.object(HBNBCommand, "dump_stats") as dump:
+                    with patch("sys.stdout", new=StringIO()), patch(
+                        "sys.stderr", new=StringIO()
+                    ):
+                        main(["--batch", path])
+                self.assertEqual(dump.call_count, 1)
+
+    def test_disabled(self):
+        """Test the stats command without instrumentation"""
+        HBNBCommand.stats.uninstall()
+        HBNBCommand.stats = None
+        with patch("sys.stdout", new=StringIO()) as f:
+            HBNBCommand().onecmd("stats")
+        self.assertEqual(
+            f.getvalue()[:-1], "** stats disabled, set HBNB_CONSOLE_STATS=1 **"
+        )
+        self.assertNotIn("save", vars(storage))
+        HBNBCommand.stats = CommandStats()  # for tearDown
+
+
+if __name__ == "__main__":
+    unittest.main()
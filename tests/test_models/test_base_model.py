@@ -10,6 +10,9 @@ import os
 from datetime import datetime
 import json
 import time
+import subprocess
+import sys
+import tempfile
 
 
 class TestBaseModel(unittest.TestCase):
@@ -60,6 +63,24 @@ class TestBaseModel(unittest.TestCase):
         self.assertIsInstance(obj.created_at, datetime)
         self.assertIsInstance(obj.updated_at, datetime)
 
+    def test_from_records(self):
+        """Test from_records() builds the same instances as __init__"""
+        objects = [BaseModel() for i in range(3)]
+        records = [obj.to_dict() for obj in objects]
+        records[2]["created_at"] = "2024-01-01T12:00:00"  # no microseconds
+        records[2]["updated_at"] = objects[2].updated_at  # kept as datetime
+        built = BaseModel.from_records(records)
+        self.assertEqual(len(built), 3)
+        for obj, copy in zip(objects[:2], built):
+            self.assertIsInstance(copy, BaseModel)
+            self.assertEqual(copy.to_dict(), obj.to_dict())
+            self.assertEqual(str(copy), str(obj))
+            self.assertNotIn("__class__", copy.__dict__)
+        self.assertEqual(built[2].created_at, datetime(2024, 1, 1, 12))
+        self.assertEqual(built[2].updated_at, objects[2].updated_at)
+        # instances built from records aren't added to storage
+        self.assertEqual(len(FileStorage._FileStorage__objects), 3)
+
     def test_str(self):
         """Tests for __str__ method"""
         obj = BaseModel()
@@ -86,6 +107,25 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(dict["created_at"], obj.created_at.isoformat())
         self.assertEqual(dict["updated_at"], obj.updated_at.isoformat())
 
+    def test_to_json(self):
+        """Tests for to_json() method (cached until an attribute changes)"""
+
+        obj = BaseModel()
+        obj.name = "Julien"
+        text = obj.to_json()
+        self.assertEqual(json.loads(text), obj.to_dict())
+        self.assertIs(obj.to_json(), text)
+        obj.name = "Betty"
+        self.assertEqual(json.loads(obj.to_json())["name"], "Betty")
+        del obj.name
+        self.assertNotIn("name", json.loads(obj.to_json()))
+        self.assertNotIn("_BaseModel__json", obj.to_dict())
+        # values changed in place are noticed
+        obj.tags = ["a"]
+        obj.to_json()
+        obj.tags.append("b")
+        self.assertEqual(json.loads(obj.to_json())["tags"], ["a", "b"])
+
     def test_save(self):
         """Tests for save() method"""
 
@@ -110,6 +150,46 @@ class TestBaseModel(unittest.TestCase):
             file.seek(0)
             self.assertEqual(json.load(file), content)
 
+    def test_compact_models(self):
+        """Test instances in compact mode (HBNB_COMPACT_MODELS=1)"""
+        code = "\n".join([
+            "import json",
+            "from models.place import Place",
+            "obj = Place()",
+            "obj.name = 'Home'",
+            "obj.color = 'blue'",  # no slot for this one
+            "copy = Place(**obj.to_dict())",
+            "print(json.dumps({",
+            "    'slots': '__dict__' not in Place.__slots__,",
+            "    'weak': hasattr(obj, '__weakref__'),",
+            "    'rooms': obj.number_rooms,",
+            "    'amenity_ids': obj.amenity_ids,",
+            "    'keys': list(obj.__dict__),",
+            "    'copy': copy.to_dict() == obj.to_dict(),",
+            "    'str': str(obj) == str(copy),",
+            "}))",
+        ])
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__)
+        )))
+        env = dict(os.environ, HBNB_COMPACT_MODELS="1", PYTHONPATH=root)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = subprocess.run(
+                [sys.executable, "-c", code], cwd=tmp, env=env,
+                check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+        result = json.loads(output)
+        self.assertTrue(result["slots"])
+        self.assertFalse(result["weak"])
+        self.assertEqual(result["rooms"], 0)
+        self.assertEqual(result["amenity_ids"], [])
+        self.assertEqual(
+            result["keys"],
+            ["id", "created_at", "updated_at", "name", "color"],
+        )
+        self.assertTrue(result["copy"])
+        self.assertTrue(result["str"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/async_storage.py"""
+
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.user import User
+from models import storage
+
+
+class TestAsyncStorage(unittest.TestCase):
+    """Contains test cases for the AsyncStorage class"""
+
+    def tearDown(self):
+        """Runs after each test"""
+        # resets storage data
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__dirty = set()
+        FileStorage._FileStorage__deleted = set()
+        if os.path.isfile(FileStorage._FileStorage__file_path):
+            # remove json file
+            os.remove(FileStorage._FileStorage__file_path)
+
+    def test_asave_areload(self):
+        """Test asave() writes and areload() reads back"""
+        obj = User()
+
+        async def main():
+            await storage.asave()
+            FileStorage._FileStorage__objects = {}
+            await storage.areload()
+
+        asyncio.run(main())
+        self.assertEqual(storage.get(User, obj.id).to_dict(), obj.to_dict())
+
+    def test_coalesce(self):
+        """Test concurrent asave() calls share writes"""
+        writes = []
+        threads = set()
+
+        def save():
+            """Slow save that remembers its calls"""
+            writes.append(True)
+            threads.add(threading.get_ident())
+            time.sleep(0.05)
+
+        async def main():
+            with patch.object(storage, "save", side_effect=save):
+                first = asyncio.ensure_future(storage.asave())
+                await asyncio.sleep(0.01)  # first write running
+                others = [storage.asave() for _ in range(10)]
+                others = [asyncio.ensure_future(call) for call in others]
+                await asyncio.sleep(0)
+                self.assertEqual(storage.pending_saves(), 11)
+                await asyncio.gather(first, *others)
+                self.assertEqual(storage.pending_saves(), 0)
+
+        asyncio.run(main())
+        # one write for the first call, one for the 10 others
+        self.assertEqual(len(writes), 2)
+        # the event loop's thread never wrote
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_asave_error(self):
+        """Test write errors reach the waiting callers"""
+
+        async def main():
+            with patch.object(storage, "save", side_effect=OSError("full")):
+                results = await asyncio.gather(
+                    storage.asave(), storage.asave(), return_exceptions=True
+                )
+            return results
+
+        results = asyncio.run(main())
+        self.assertEqual([str(error) for error in results], ["full", "full"])
+
+    def test_aall(self):
+        """Test async iteration over the objects"""
+        users = [User() for _ in range(5)]
+
+        async def main():
+            return [key async for key, obj in storage.aall(User, 2)]
+
+        keys = asyncio.run(main())
+        self.assertEqual(keys, [f"User.{user.id}" for user in users])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/codecs.py"""
+
+import unittest
+from io import BytesIO, BufferedReader
+from datetime import datetime
+from models.engine.codecs import CODECS, detect_codec
+
+
+class TestCodecs(unittest.TestCase):
+    """Contains test cases for the storage file codecs"""
+
+    records = {
+        "User.1": {
+            "id": "1", "first_name": "Betty", "rank": 10, "score": 99.9,
+            "created_at": "2024-01-01T12:00:00.000001",
+            "updated_at": "2024-01-02T12:00:00.000001",
+            "__class__": "User",
+        },
+        "Place.2": {
+            "id": "2", "amenity_ids": ["a", "b"],
+            "created_at": "2024-01-01T12:00:00.000001",
+            "updated_at": "2024-01-01T12:00:00.000001",
+            "__class__": "Place",
+        },
+    }
+
+    def encode(self, name, records=None):
+        """Encode records with a codec, get a reader positioned at 0"""
+        file = BytesIO()
+        CODECS[name].dump(records or self.records, file)
+        return BufferedReader(BytesIO(file.getvalue()))
+
+    def test_round_trip(self):
+        """Test every codec reads back what it wrote"""
+        for name in CODECS:
+            file = self.encode(name)
+            codec = detect_codec(file)
+            self.assertEqual(codec.name, name)
+            records = dict(codec.load(file))
+            self.assertEqual(list(records), list(self.records))
+            for key, record in records.items():
+                for attr in ("created_at", "updated_at"):
+                    # pickle keeps timestamps as datetimes
+                    if name == "pickle":
+                        self.assertIsInstance(record[attr], datetime)
+                        record[attr] = record[attr].isoformat()
+                self.assertEqual(record, self.records[key])
+
+    def test_json_compatible(self):
+        """Test JSON files are plain JSON documents (no header)"""
+        file = self.encode("json")
+        self.assertTrue(file.read().startswith(b'{"User.1": {"id": "1"'))
+
+    def test_datetimes(self):
+        """Test datetimes read from pickle files can be saved in
+        the other formats"""
+        file = self.encode("pickle")
+        records = dict(detect_codec(file).load(file))
+        for name in ("json", "marshal"):
+            file = self.encode(name, records)
+            self.assertEqual(dict(detect_codec(file).load(file)), self.records)
+
+    def test_unknown_codec(self):
+        """Test unknown header"""
+        file = BufferedReader(BytesIO(b"#HBNB yaml\n..."))
+        with self.assertRaises(ValueError):
+            detect_codec(file)
+
+
+if __name__ == "__main__":
+    unittest.main()
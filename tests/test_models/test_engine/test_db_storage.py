@@ -0,0 +1,253 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/db_storage.py"""
+
+import unittest
+import os
+import tempfile
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.user import User
+from models.place import Place
+
+
+class TestDBStorage(unittest.TestCase):
+    """Contains test cases for the DBStorage class"""
+
+    def setUp(self):
+        """Runs before each test"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = DBStorage._DBStorage__db_path
+        DBStorage._DBStorage__db_path = os.path.join(self.tmp.name, "t.db")
+        self.storage = DBStorage()
+        self.storage.reload()
+
+    def tearDown(self):
+        """Runs after each test"""
+        DBStorage._DBStorage__db_path = self.db_path
+        self.storage._DBStorage__connection.close()
+        self.tmp.cleanup()
+        # resets file storage data (models register there on creation)
+        FileStorage._FileStorage__objects = {}
+
+    def test_new_save_reload(self):
+        """Test objects survive a save() and reload()"""
+        obj = User()
+        obj.first_name = "Betty"
+        self.storage.new(obj)
+        self.storage.save()
+        self.storage.reload()
+        key = f"User.{obj.id}"
+        self.assertEqual(list(self.storage.all()), [key])
+        self.assertEqual(
+            self.storage.all()[key].to_dict(), obj.to_dict()
+        )
+
+    def test_uncommitted_changes(self):
+        """Test changes not saved are rolled back by reload()"""
+        obj = User()
+        self.storage.new(obj)
+        self.assertEqual(self.storage.count(User), 1)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 0)
+
+    def test_all_count_get(self):
+        """Test all(), count() and get() with and without class"""
+        users = [User() for i in range(3)]
+        place = Place()
+        for obj in users + [place]:
+            self.storage.new(obj)
+        self.assertEqual(len(self.storage.all()), 4)
+        self.assertEqual(
+            list(self.storage.all(User)), [f"User.{u.id}" for u in users]
+        )
+        self.assertEqual(self.storage.count(), 4)
+        self.assertEqual(self.storage.count("User"), 3)
+        self.assertEqual(self.storage.count(Place), 1)
+        # same instance is returned while it's known
+        self.assertIs(self.storage.get(Place, place.id), place)
+        self.assertIsNone(self.storage.get(User, place.id))
+
+        self.storage.save()
+        self.storage.reload()
+        obj = self.storage.get("User", users[1].id)
+        self.assertEqual(obj.to_dict(), users[1].to_dict())
+        self.assertIs(self.storage.get("User", users[1].id), obj)
+
+    def test_iter_all(self):
+        """Test iter_all() pages, read a batch at a time"""
+        users = [User() for i in range(5)]
+        place = Place()
+        for obj in users + [place]:
+            self.storage.new(obj)
+        keys = [f"User.{u.id}" for u in users]
+        self.assertEqual(
+            [key for key, obj in self.storage.iter_all(User, batch_size=2)],
+            keys,
+        )
+        page = list(self.storage.iter_all("User", 1, 3, batch_size=2))
+        self.assertEqual([key for key, obj in page], keys[1:4])
+        self.assertIs(page[0][1], users[1])
+        self.assertEqual(len(list(self.storage.iter_all(offset=4))), 2)
+        self.assertEqual(list(self.storage.iter_all(limit=0)), [])
+
+    def test_where(self):
+        """Test where() method, conditions checked by SQLite or not"""
+        places = [Place() for i in range(4)]
+        for i, place in enumerate(places):
+            place.city_id = "c1" if i % 2 else "c2"
+            if i:  # places[0] keeps the default price (0)
+                place.price_by_night = i * 10
+            place.name = "Hut" if i == 3 else ""
+            self.storage.new(place)
+        self.storage.save()
+        self.storage.reload()
+
+        def ids(conditions, *args):
+            """Get the ids of the places meeting the conditions"""
+            return [
+                obj.id
+                for key, obj in self.storage.where(Place, conditions, *args)
+            ]
+
+        self.assertEqual(
+            ids([("city_id", "==", "c1"), ("price_by_night", "<", 20)]),
+            [places[1].id],
+        )
+        # rows without the attribute have the class default
+        self.assertEqual(
+            ids([("price_by_night", "<", 15)]), [p.id for p in places[:2]]
+        )
+        self.assertEqual(ids([("name", "=", "")]), [p.id for p in places[:3]])
+        self.assertEqual(ids([("price_by_night", ">", "a")]), [])
+        self.assertEqual(
+            ids([("price_by_night", ">=", 0)], 1, 2),
+            [p.id for p in places[1:3]],
+        )
+        with self.assertRaises(ValueError):
+            self.storage.where(Place, [("name", "like", "a")])
+
+    def test_deferred(self):
+        """Test saves committed at the end of a deferred block"""
+        other = DBStorage()
+        other.reload()
+        with self.storage.deferred():
+            user = User()
+            self.storage.new(user)
+            self.storage.save()
+            self.assertEqual(other.count(), 0)  # not committed
+        self.assertEqual(other.count(), 1)
+        other._DBStorage__connection.close()
+
+    def test_mark_dirty_delete(self):
+        """Test changes and deletes are written to the database"""
+        obj = User()
+        other = User()
+        self.storage.new(obj)
+        self.storage.new(other)
+        obj.first_name = "Betty"
+        self.storage.mark_dirty(obj)
+        self.storage.delete(other)
+        self.storage.delete()
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(
+            self.storage.get(User, obj.id).first_name, "Betty"
+        )
+        self.assertIsNone(self.storage.get(User, other.id))
+        # objects not stored are ignored
+        self.storage.mark_dirty(other)
+        self.assertEqual(self.storage.count(), 1)
+
+    def test_lookup(self):
+        """Test lookup() by indexed and plain attributes"""
+        places = [Place() for i in range(3)]
+        for place in places:
+            place.city_id = "city-1"
+            self.storage.new(place)
+        places[2].city_id = "city-2"
+        places[2].name = "Home"
+        self.storage.mark_dirty(places[2])
+        result = self.storage.lookup(Place, "city_id", "city-1")
+        self.assertEqual(
+            list(result), [f"Place.{p.id}" for p in places[:2]]
+        )
+        # the query uses the expression index
+        plan = self.storage._DBStorage__connection.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM objects WHERE class = ?"
+            " AND json_extract(data, '$.city_id') = ?", ("Place", "x")
+        ).fetchall()
+        self.assertIn("objects_Place_city_id", str(plan))
+
+        self.assertEqual(
+            list(self.storage.lookup("Place", "name", "Home")),
+            [f"Place.{places[2].id}"],
+        )
+        # class default values aren't stored, instances are compared
+        self.assertEqual(len(self.storage.lookup(Place, "user_id", "")), 3)
+
+    def test_transaction(self):
+        """Test begin/commit/rollback"""
+        obj = User()
+        self.storage.new(obj)
+        self.storage.save()
+        with self.storage.transaction():
+            self.assertTrue(self.storage.in_transaction())
+            other = User()
+            self.storage.new(other)
+            self.storage.save()  # doesn't commit
+        self.assertFalse(self.storage.in_transaction())
+        self.assertEqual(self.storage.count(User), 2)
+
+        self.storage.begin()
+        self.storage.delete(self.storage.get(User, obj.id))
+        self.storage.new(User())
+        self.storage.save()
+        self.assertEqual(self.storage.count(User), 2)
+        self.storage.rollback()
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertIsNotNone(self.storage.get(User, obj.id))
+
+        with self.assertRaises(RuntimeError):
+            self.storage.commit()
+        with self.assertRaises(RuntimeError):
+            self.storage.rollback()
+
+    def test_cache_size(self):
+        """Test only the most recent instances are kept"""
+        DBStorage._DBStorage__cache_size = 2
+        try:
+            users = [User() for i in range(4)]
+            for user in users:
+                self.storage.new(user)
+            self.storage.save()
+            ids = [user.id for user in users]
+            del users, user
+            stats = self.storage.cache_stats()
+            self.assertEqual(stats["size"], 2)
+            self.assertEqual(stats["evictions"], 2)
+            self.assertEqual(self.storage.get(User, ids[0]).id, ids[0])
+            self.assertEqual(self.storage.cache_stats()["misses"], 1)
+            # changes of an evicted instance still in use are written
+            obj = self.storage.get(User, ids[1])
+            self.storage.get(User, ids[2])
+            self.storage.get(User, ids[3])
+            obj.first_name = "Betty"
+            self.storage.mark_dirty(obj)
+            self.storage.save()
+            self.storage.reload()
+            self.assertEqual(
+                self.storage.get(User, ids[1]).first_name, "Betty"
+            )
+        finally:
+            DBStorage._DBStorage__cache_size = 0
+
+    def test_get_app_classes(self):
+        """Test get_app_classes() method"""
+        self.assertEqual(
+            self.storage.get_app_classes(),
+            FileStorage().get_app_classes(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,22 @@
 """Unittests for models/engine/file_storage.py"""
 
 import unittest
-from models.engine.file_storage import FileStorage
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage, StorageConflictError
+from models.engine.file_storage import _load_shard
+from models.engine.lazy_objects import LazyObjects
 from models.user import User
+from models.city import City
+from models.place import Place
 from models import storage
 import json
 import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
 
 
 class TestFileStorage(unittest.TestCase):
@@ -25,9 +36,47 @@ class TestFileStorage(unittest.TestCase):
         """Runs after each test"""
         # resets storage data
         FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__dirty = set()
+        FileStorage._FileStorage__deleted = set()
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__fragments = {}
+        FileStorage._FileStorage__cache_size = 0
+        FileStorage._FileStorage__flush_delay = 0
+        FileStorage._FileStorage__pending = False
         if os.path.isfile(FileStorage._FileStorage__file_path):
             # remove json file
             os.remove(FileStorage._FileStorage__file_path)
+        if os.path.isfile(f"{FileStorage._FileStorage__file_path}.dat"):
+            # remove indexed file
+            os.remove(f"{FileStorage._FileStorage__file_path}.dat")
+        # remove snapshots
+        shutil.rmtree(
+            f"{FileStorage._FileStorage__file_path}.snapshots",
+            ignore_errors=True,
+        )
+        if os.path.isfile(f"{FileStorage._FileStorage__file_path}.log"):
+            # remove journal file
+            os.remove(f"{FileStorage._FileStorage__file_path}.log")
+        FileStorage._FileStorage__layout = "single"
+        FileStorage._FileStorage__codec = "json"
+        FileStorage._FileStorage__transaction = None
+        FileStorage._FileStorage__shards = 1
+        FileStorage._FileStorage__parallel_min_size = 1024 * 1024
+        FileStorage._FileStorage__shared = False
+        FileStorage._FileStorage__durability = "always"
+        storage._stop_worker()
+        FileStorage._FileStorage__unflushed = 0
+        FileStorage._FileStorage__generation = 0
+        FileStorage._FileStorage__gen_position = None
+        FileStorage._FileStorage__journal_limit = 1024 * 1024
+        for suffix in (".gen", ".lock"):
+            path = f"{FileStorage._FileStorage__file_path}{suffix}"
+            if os.path.isfile(path):
+                os.remove(path)
+        if os.path.isdir(f"{FileStorage._FileStorage__file_path}.d"):
+            # remove shard files
+            shutil.rmtree(f"{FileStorage._FileStorage__file_path}.d")
 
     def test_init(self):
         """Test the constructor"""
@@ -54,6 +103,136 @@ class TestFileStorage(unittest.TestCase):
         key = f"{type(obj).__name__}.{obj.id}"
         self.assertEqual(storage.all()[key], obj)
 
+    def test_all_by_class(self):
+        """Test all() method with a class filter"""
+        user = User()
+        city = City()
+        self.assertEqual(storage.all(User), {f"User.{user.id}": user})
+        self.assertEqual(storage.all("City"), {f"City.{city.id}": city})
+        self.assertEqual(storage.all("Place"), {})
+
+        # partitions follow a replaced objects dictionary
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(storage.all(User), {})
+        user = User()
+        self.assertEqual(storage.all(User), {f"User.{user.id}": user})
+
+    def test_iter_all(self):
+        """Test iter_all() method"""
+        users = [User() for i in range(5)]
+        city = City()
+        keys = [f"User.{user.id}" for user in users]
+        self.assertEqual([key for key, obj in storage.iter_all(User)], keys)
+        page = list(storage.iter_all("User", offset=1, limit=3))
+        self.assertEqual([key for key, obj in page], keys[1:4])
+        self.assertIs(page[0][1], users[1])
+        self.assertEqual(
+            list(storage.iter_all(offset=5)), [(f"City.{city.id}", city)]
+        )
+        # objects removed while iterating are skipped
+        iterator = storage.iter_all(User)
+        next(iterator)
+        storage.delete(users[1])
+        self.assertEqual([key for key, obj in iterator], keys[2:])
+
+    def test_where(self):
+        """Test where() method, using an index when there is one"""
+        places = [Place() for i in range(6)]
+        for i, place in enumerate(places):
+            place.city_id = "c1" if i % 2 else "c2"
+            place.price_by_night = i * 10
+            place.save()
+        result = storage.where(
+            Place, [("city_id", "==", "c1"), ("price_by_night", "<", 40)]
+        )
+        self.assertEqual(
+            list(result), [(f"Place.{p.id}", p) for p in places[1:4:2]]
+        )
+        result = storage.where("Place", [("price_by_night", ">=", 20)], 1, 2)
+        self.assertEqual([obj for key, obj in result], places[3:5])
+        self.assertEqual(list(storage.where(City, [("name", "=", "")])), [])
+        with self.assertRaises(ValueError):
+            storage.where(Place, [("name", "like", "a")])
+
+        # only the instances of the index are looked at (built)
+        FileStorage._FileStorage__lazy = True
+        storage.reload()
+        result = storage.where(Place, [("city_id", "==", "c2")])
+        self.assertEqual(
+            [obj.id for key, obj in result], [p.id for p in places[::2]]
+        )
+        self.assertEqual(len(storage.all().records), 3)  # not built
+
+    def test_deferred(self):
+        """Test saves written at the end of a deferred block"""
+        FileStorage._FileStorage__flush_stats["flushes"] = 0
+        path = FileStorage._FileStorage__file_path
+        with storage.deferred():
+            users = [User() for i in range(3)]
+            for user in users:
+                user.save()
+            self.assertFalse(os.path.exists(path))
+            storage.flush()  # written on demand too
+            self.assertTrue(os.path.exists(path))
+            users[0].save()
+        self.assertEqual(storage.flush_stats()["flushes"], 2)
+        with open(path) as file:
+            self.assertEqual(len(json.load(file)), 3)
+
+    def test_count(self):
+        """Test count() method"""
+        self.assertEqual(storage.count(), 0)
+        users = [User() for i in range(3)]
+        City()
+        self.assertEqual(storage.count(), 4)
+        self.assertEqual(storage.count(User), 3)
+        self.assertEqual(storage.count("City"), 1)
+        self.assertEqual(storage.count("Review"), 0)
+        storage.delete(users[0])
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(storage.count(), 3)
+
+    def test_lookup(self):
+        """Test lookup() method on indexed and plain attributes"""
+        city = City()
+        places = [Place() for i in range(3)]
+        for place in places[:2]:
+            place.city_id = city.id
+            place.save()
+        result = storage.lookup(Place, "city_id", city.id)
+        self.assertEqual(
+            result, {f"Place.{p.id}": p for p in places[:2]}
+        )
+        self.assertIn(
+            ("Place", "city_id"), FileStorage._FileStorage__indexes
+        )
+
+        # index follows updates and deletes
+        places[0].city_id = "elsewhere"
+        places[0].save()
+        storage.delete(places[1])
+        self.assertEqual(storage.lookup("Place", "city_id", city.id), {})
+        self.assertEqual(
+            storage.lookup("Place", "city_id", "elsewhere"),
+            {f"Place.{places[0].id}": places[0]},
+        )
+
+        # attribute without index falls back to a scan
+        places[2].name = "Home"
+        self.assertEqual(
+            storage.lookup(Place, "name", "Home"),
+            {f"Place.{places[2].id}": places[2]},
+        )
+        self.assertEqual(len(storage.lookup(Place, "amenity_ids", [])), 2)
+
+        # indexes are rebuilt on reload
+        storage.save()
+        storage.reload()
+        self.assertEqual(
+            list(storage.lookup(Place, "city_id", "elsewhere")),
+            [f"Place.{places[0].id}"],
+        )
+
     def test_new(self):
         """Tests new() method"""
 
@@ -89,6 +268,216 @@ class TestFileStorage(unittest.TestCase):
             f.seek(0)
             self.assertEqual(json.load(f), content)
 
+    def test_save_atomic(self):
+        """Test save() replaces the JSON file instead of truncating it"""
+        obj = User()
+        storage.save()
+        inode = os.stat(FileStorage._FileStorage__file_path).st_ino
+        obj.save()
+        # the file was swapped with a new one, no temporary file left
+        self.assertNotEqual(
+            inode, os.stat(FileStorage._FileStorage__file_path).st_ino
+        )
+        directory = os.path.dirname(
+            os.path.abspath(FileStorage._FileStorage__file_path)
+        )
+        self.assertEqual(
+            [name for name in os.listdir(directory) if name.endswith(".tmp")],
+            [],
+        )
+
+    def test_save_deferred_timer(self):
+        """Test the saves of a burst are written when the window closes"""
+        FileStorage._FileStorage__flush_delay = 0.1
+        FileStorage._FileStorage__last_flush = 0.0
+        obj = User()
+        obj.save()
+        os.remove(FileStorage._FileStorage__file_path)
+        obj.first_name = "Betty"
+        obj.save()
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+        time.sleep(0.5)
+        with open(
+            FileStorage._FileStorage__file_path, "r", encoding="utf-8"
+        ) as f:
+            self.assertEqual(
+                json.load(f)[f"User.{obj.id}"]["first_name"], "Betty"
+            )
+
+    def test_save_deferred(self):
+        """Test saves inside the flush window are written by flush()"""
+        FileStorage._FileStorage__flush_delay = 60
+        FileStorage._FileStorage__last_flush = 0.0
+        obj = User()
+        # first save of a burst is written right away
+        obj.save()
+        self.assertTrue(os.path.isfile(FileStorage._FileStorage__file_path))
+        os.remove(FileStorage._FileStorage__file_path)
+        # the following ones are deferred
+        for i in range(10):
+            obj.number = i
+            obj.save()
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+        storage.flush()
+        with open(
+            FileStorage._FileStorage__file_path, "r", encoding="utf-8"
+        ) as f:
+            self.assertEqual(json.load(f)[f"User.{obj.id}"]["number"], 9)
+        # nothing left to write
+        os.remove(FileStorage._FileStorage__file_path)
+        storage.flush()
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+
+    def test_durability_interval(self):
+        """Test the background writer writes saves every interval"""
+        FileStorage._FileStorage__durability = "interval:20"
+        FileStorage._FileStorage__flush_stats["flushes"] = 0
+        obj = User()
+        obj.save()
+        # not written by save()
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+        self.assertEqual(storage.flush_stats()["queue_depth"], 1)
+        for _ in range(100):
+            if storage.flush_stats()["flushes"]:
+                break
+            time.sleep(0.01)
+        with open(FileStorage._FileStorage__file_path, "r") as file:
+            self.assertIn(f"User.{obj.id}", json.load(file))
+        stats = storage.flush_stats()
+        self.assertEqual(stats["policy"], "interval:20")
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["pending_objects"], 0)
+        self.assertGreaterEqual(stats["max"], stats["last"])
+        self.assertGreater(stats["flushes"], 0)
+
+    def test_durability_changes(self):
+        """Test the background writer writes once enough saves wait"""
+        FileStorage._FileStorage__durability = "changes:3"
+        obj = User()
+        obj.save()
+        obj.save()
+        time.sleep(0.05)
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+        obj.save()
+        for _ in range(100):
+            if os.path.isfile(FileStorage._FileStorage__file_path):
+                break
+            time.sleep(0.01)
+        self.assertTrue(os.path.isfile(FileStorage._FileStorage__file_path))
+        # flush() writes what's left, without waiting for the writer
+        os.remove(FileStorage._FileStorage__file_path)
+        obj.save()
+        storage.flush()
+        self.assertTrue(os.path.isfile(FileStorage._FileStorage__file_path))
+
+    def test_durability_unknown(self):
+        """Test unknown durability policies are rejected"""
+        FileStorage._FileStorage__durability = "sometimes"
+        with self.assertRaises(ValueError):
+            User().save()
+        with self.assertRaisesRegex(ValueError, "Unknown"):
+            storage.reload()  # rejected on startup
+        for policy in ("interval:0", "changes:0", "interval:-5", "changes:"):
+            FileStorage._FileStorage__durability = policy
+            with self.assertRaises(ValueError):
+                User().save()
+            with self.assertRaisesRegex(ValueError, "Invalid .* value"):
+                storage.reload()
+
+    def test_transaction_commit(self):
+        """Test changes of a transaction are written once, on commit"""
+        obj = User()
+        storage.save()
+        os.remove(FileStorage._FileStorage__file_path)
+        with storage.transaction():
+            self.assertTrue(storage.in_transaction())
+            users = [User() for i in range(5)]
+            for user in users:
+                user.save()
+            obj.first_name = "Betty"
+            obj.save()
+            storage.flush()  # not written before commit
+            self.assertFalse(
+                os.path.isfile(FileStorage._FileStorage__file_path)
+            )
+        self.assertFalse(storage.in_transaction())
+        with open(
+            FileStorage._FileStorage__file_path, "r", encoding="utf-8"
+        ) as f:
+            content = json.load(f)
+        self.assertEqual(len(content), 6)
+        self.assertEqual(content[f"User.{obj.id}"]["first_name"], "Betty")
+
+    def test_transaction_rollback(self):
+        """Test rollback brings back the objects and their attributes"""
+        obj = User()
+        obj.first_name = "Betty"
+        other = User()
+        storage.save()
+        storage.begin()
+        created = User()
+        created.save()
+        obj.first_name = "Julien"
+        obj.job = "CEO"
+        obj.save()
+        storage.delete(other)
+        storage.save()
+        storage.rollback()
+        self.assertFalse(storage.in_transaction())
+        self.assertEqual(
+            set(storage.all()), {f"User.{obj.id}", f"User.{other.id}"}
+        )
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(obj.first_name, "Betty")
+        self.assertFalse(hasattr(obj, "job"))
+        # nothing left to write
+        os.remove(FileStorage._FileStorage__file_path)
+        storage.flush()
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+
+        # exceptions roll the transaction back
+        with self.assertRaises(ValueError):
+            with storage.transaction():
+                User()
+                raise ValueError
+        self.assertEqual(storage.count(User), 2)
+
+    def test_transaction_rollback_lazy(self):
+        """Test rollback of objects first read in the transaction (lazy)"""
+        FileStorage._FileStorage__lazy = True
+        obj = User()
+        obj.first_name = "Betty"
+        storage.save()
+        storage.reload()
+        key = f"User.{obj.id}"
+        storage.begin()
+        user = storage.all()[key]  # built from its stored dictionary
+        user.first_name = "Julien"
+        user.save()
+        storage.rollback()
+        self.assertEqual(storage.all()[key].first_name, "Betty")
+        self.assertEqual(storage.all()[key].to_dict(), obj.to_dict())
+
+    def test_transaction_errors(self):
+        """Test commit/rollback without transaction, nested begin"""
+        with self.assertRaises(RuntimeError):
+            storage.commit()
+        with self.assertRaises(RuntimeError):
+            storage.rollback()
+        storage.begin()
+        with self.assertRaises(RuntimeError):
+            storage.begin()
+        storage.rollback()
+
+    def test_save_empty(self):
+        """Test removing the last object leaves an empty JSON file"""
+        obj = User()
+        obj.save()
+        storage.delete(obj)
+        storage.save()
+        with open(FileStorage._FileStorage__file_path, "r") as file:
+            self.assertEqual(json.load(file), {})
+
     def test_save_too_many_args(self):
         """Tests save() with too many arguments"""
         with self.assertRaises(TypeError) as e:
@@ -105,6 +494,550 @@ class TestFileStorage(unittest.TestCase):
         key = f"{type(obj).__name__}.{obj.id}"
         self.assertEqual(obj.to_dict(), storage.all()[key].to_dict())
 
+    def test_delete(self):
+        """Test delete() method"""
+        obj = User()
+        key = f"{type(obj).__name__}.{obj.id}"
+        storage.delete(obj)
+        self.assertNotIn(key, storage.all())
+        # deleting nothing or a missing object does nothing
+        storage.delete()
+        storage.delete(obj)
+        self.assertNotIn(key, storage.all())
+
+    def test_reload_lazy(self):
+        """Test reload() in lazy mode only builds the objects read"""
+        FileStorage._FileStorage__lazy = True
+        city = City()
+        place = Place()
+        place.city_id = city.id
+        place.save()
+        storage.reload()
+        objects = FileStorage._FileStorage__objects
+        self.assertIsInstance(objects, LazyObjects)
+        self.assertIn(f"Place.{place.id}", storage.all())
+        self.assertEqual(storage.count(Place), 1)
+        self.assertIsNotNone(objects.record(f"Place.{place.id}"))
+        self.assertIsNotNone(objects.record(f"City.{city.id}"))
+
+        # indexes are built from the stored dictionaries
+        key = f"Place.{place.id}"
+        result = storage.lookup(Place, "city_id", city.id)
+        self.assertEqual(list(result), [key])
+        self.assertEqual(result[key].to_dict(), place.to_dict())
+        self.assertIsNone(objects.record(f"Place.{place.id}"))
+        # objects never built are saved from their stored dictionaries
+        storage.save()
+        storage.reload()
+        self.assertEqual(
+            storage.all()[f"City.{city.id}"].to_dict(), city.to_dict()
+        )
+
+    def test_sharded(self):
+        """Test save() and reload() in sharded layout"""
+        FileStorage._FileStorage__layout = "sharded"
+        FileStorage._FileStorage__shards = 2
+        directory = f"{FileStorage._FileStorage__file_path}.d"
+        users = [User() for i in range(40)]
+        city = City()
+        storage.save()
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+        city_shard = f"City.{storage._shard_of(f'City.{city.id}')}"
+        names = sorted(os.listdir(directory))
+        self.assertEqual(
+            names, sorted(["User.0", "User.1", city_shard])
+        )
+
+        # only the shard of the changed object is rewritten
+        inodes = {
+            name: os.stat(os.path.join(directory, name)).st_ino
+            for name in names
+        }
+        users[0].save()
+        changed = f"User.{storage._shard_of(f'User.{users[0].id}')}"
+        for name in names:
+            inode = os.stat(os.path.join(directory, name)).st_ino
+            self.assertEqual(inode != inodes[name], name == changed)
+
+        # an emptied shard is removed
+        storage.delete(city)
+        storage.save()
+        self.assertNotIn(city_shard, os.listdir(directory))
+
+        storage.reload()
+        self.assertEqual(storage.count(User), 40)
+        self.assertEqual(storage.count(City), 0)
+        self.assertEqual(
+            storage.all()[f"User.{users[0].id}"].to_dict(),
+            users[0].to_dict(),
+        )
+
+    def test_indexed(self):
+        """Test save() and reload() in indexed layout"""
+        FileStorage._FileStorage__layout = "indexed"
+        users = [User() for i in range(10)]
+        city = City()
+        city.state_id = "s1"
+        storage.save()
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+
+        storage.reload()
+        objects = storage.all()
+        self.assertIsInstance(objects, LazyObjects)
+        self.assertEqual(len(objects.records), 11)  # nothing decoded
+        # indexed lookups don't decode the records either
+        self.assertEqual(storage.count(User), 10)
+        self.assertEqual(
+            list(storage.lookup(City, "state_id", "s1")), [f"City.{city.id}"]
+        )
+        self.assertEqual(len(objects.records), 10)  # the city's only
+        obj = storage.get(User, users[3].id)
+        self.assertEqual(obj.to_dict(), users[3].to_dict())
+        self.assertEqual(len(objects.records), 9)
+
+        # records not decoded are written back as they are
+        obj.first_name = "Betty"
+        obj.save()
+        storage.delete(storage.get(User, users[0].id))
+        storage.save()
+        storage.reload()
+        self.assertEqual(storage.count(User), 9)
+        self.assertEqual(storage.get(User, users[3].id).first_name, "Betty")
+        self.assertEqual(
+            storage.get(User, users[5].id).to_dict(), users[5].to_dict()
+        )
+
+    def test_cache_size(self):
+        """Test bounded memory: only the most recent instances are kept"""
+        FileStorage._FileStorage__cache_size = 3
+        FileStorage._FileStorage__layout = "indexed"
+        users = [User() for i in range(10)]
+        ids = [user.id for user in users]
+        storage.save()
+        storage.reload()
+        del users
+        for id in ids:
+            self.assertEqual(storage.get(User, id).id, id)
+        stats = storage.cache_stats()
+        self.assertEqual(stats["size"], 3)
+        self.assertEqual(stats["limit"], 3)
+        self.assertEqual(stats["misses"], 10)
+        self.assertEqual(stats["evictions"], 7)
+        # clean instances went back to their records in the mapped file
+        records = storage.all().records
+        self.assertEqual(records._RecordFile__added, {})
+
+        # changes of an evicted instance still in use are saved
+        obj = storage.get(User, ids[0])
+        for id in ids[1:5]:
+            storage.get(User, id)
+        self.assertIsNotNone(storage.all().record(f"User.{ids[0]}"))
+        obj.first_name = "Betty"
+        obj.save()
+        self.assertIs(storage.get(User, ids[0]), obj)
+        storage.reload()
+        self.assertEqual(storage.get(User, ids[0]).first_name, "Betty")
+        self.assertEqual(storage.count(User), 10)
+
+        # saved instances evicted before they're written are kept in
+        # memory until then, read from the new file afterwards
+        records = storage.all().records
+        with storage.deferred():
+            for id in ids[:4]:
+                obj = storage.get(User, id)
+                obj.last_name = "Holberton"
+                obj.save()
+            del obj
+            self.assertEqual(len(records._RecordFile__added), 1)
+        self.assertEqual(records._RecordFile__added, {})
+        for id in ids:
+            storage.get(User, id)
+        self.assertEqual(records._RecordFile__added, {})
+        self.assertEqual(storage.get(User, ids[0]).last_name, "Holberton")
+
+    def test_save_fragments(self):
+        """Test saves only encoding the objects changed since the last one"""
+        FileStorage._FileStorage__lazy = True
+        users = [User() for i in range(5)]
+        storage.save()
+        storage.reload()
+        storage.save()
+        fragments = FileStorage._FileStorage__fragments
+        self.assertEqual(len(fragments), 5)
+        user = storage.get(User, users[0].id)
+        user.first_name = "Betty"
+        user.save()
+        fragments = FileStorage._FileStorage__fragments
+        self.assertEqual(len(fragments), 4)
+        self.assertNotIn(f"User.{user.id}", fragments)
+        with open(FileStorage._FileStorage__file_path) as file:
+            self.assertEqual(file.read(), json.dumps({
+                key: obj.to_dict() for key, obj in storage.all().items()
+            }))
+        # values changed in place are written (as before the cache)
+        place = Place()
+        place.amenity_ids = []
+        storage.save()
+        place.amenity_ids.append("1")
+        storage.save()
+        storage.reload()
+        self.assertEqual(storage.get(Place, place.id).amenity_ids, ["1"])
+
+    def test_snapshot(self):
+        """Test full and incremental snapshots, and restoring them"""
+        users = [User() for i in range(3)]
+        storage.save()
+        self.assertEqual(storage.snapshot("full"), "full")
+        snapshots = f"{FileStorage._FileStorage__file_path}.snapshots"
+        with open(os.path.join(snapshots, "full.json")) as file:
+            content = json.load(file)
+        self.assertIsNone(content["base"])
+        self.assertEqual(len(content["objects"]), 3)
+
+        # only the changed objects go in an incremental snapshot
+        time.sleep(0.01)
+        users[0].first_name = "Betty"
+        users[0].save()
+        storage.delete(users[1])
+        city = City()
+        city.save()
+        self.assertEqual(storage.snapshot("step", base="full"), "step")
+        with open(os.path.join(snapshots, "step.json")) as file:
+            content = json.load(file)
+        self.assertEqual(content["base"], "full")
+        self.assertEqual(
+            set(content["objects"]),
+            {f"User.{users[0].id}", f"City.{city.id}"},
+        )
+        self.assertEqual(storage.snapshots(), ["full", "step"])
+
+        # restore, written right away
+        for obj in list(storage.all().values()):
+            storage.delete(obj)
+        storage.save()
+        storage.restore("step")
+        storage.reload()
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(storage.count(City), 1)
+        self.assertIsNone(storage.get(User, users[1].id))
+        self.assertEqual(storage.get(User, users[0].id).first_name, "Betty")
+        storage.restore("full")
+        storage.reload()
+        self.assertEqual(storage.count(User), 3)
+        self.assertEqual(storage.count(City), 0)
+        self.assertEqual(storage.get(User, users[0].id).first_name, "")
+
+        # errors
+        with self.assertRaises(ValueError):
+            storage.snapshot("full")  # already exists
+        with self.assertRaises(ValueError):
+            storage.snapshot("other", base="missing")
+        with self.assertRaises(ValueError):
+            storage.snapshot("../file")
+        with self.assertRaises(ValueError):
+            storage.restore("missing")
+        storage.begin()
+        with self.assertRaises(RuntimeError):
+            storage.snapshot()
+        storage.rollback()
+
+    def test_sharded_parallel_reload(self):
+        """Test shards decoded by a process pool"""
+        FileStorage._FileStorage__layout = "sharded"
+        FileStorage._FileStorage__shards = 3
+        FileStorage._FileStorage__parallel_min_size = 0
+        users = [User() for i in range(20)]
+        objects = {f"User.{user.id}": user.to_dict() for user in users}
+        storage.save()
+        pool = "models.engine.file_storage.ProcessPoolExecutor"
+        with patch("os.cpu_count", return_value=8), patch(
+            pool, wraps=ProcessPoolExecutor
+        ) as executor:
+            storage.reload()
+        # a worker per shard at most
+        self.assertEqual(executor.call_args[0], (3,))
+        self.assertEqual(
+            {key: obj.to_dict() for key, obj in storage.all().items()},
+            objects,
+        )
+        # decoded here with a single CPU
+        with patch("os.cpu_count", return_value=1), patch(
+            pool, wraps=ProcessPoolExecutor
+        ) as executor:
+            storage.reload()
+        executor.assert_not_called()
+        self.assertEqual(len(storage.all()), 20)
+
+    def test_sharded_parallel_import(self):
+        """Test the process pool of the reload run by importing models"""
+        FileStorage._FileStorage__layout = "sharded"
+        FileStorage._FileStorage__shards = 2
+        for i in range(4000):
+            user = User()
+            user.first_name = "x" * 200
+        storage.save()
+        directory = f"{FileStorage._FileStorage__file_path}.d"
+        size = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory)
+        )
+        self.assertGreater(size, FileStorage._FileStorage__parallel_min_size)
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__))
+        )))
+        env = dict(
+            os.environ,
+            HBNB_STORAGE_LAYOUT="sharded",
+            HBNB_STORAGE_SHARDS="2",
+            PYTHONPATH=root,
+        )
+        # the pool is only used with several CPUs
+        code = (
+            "import os; os.cpu_count = lambda: 2\n"
+            "import models; print(models.storage.count())"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], env=env, check=True, timeout=60,
+            stdout=subprocess.PIPE, text=True,
+        )
+        self.assertEqual(output.stdout, "4000\n")
+
+    def test_codecs(self):
+        """Test save() and reload() with every file format"""
+        obj = User()
+        obj.first_name = "Betty"
+        for codec in ("pickle", "marshal", "json"):
+            FileStorage._FileStorage__codec = codec
+            storage.save()
+            with open(FileStorage._FileStorage__file_path, "rb") as f:
+                header = f.read(6)
+            self.assertEqual(header == b"#HBNB ", codec != "json")
+            # the format is detected from the file
+            FileStorage._FileStorage__codec = "json"
+            storage.reload()
+            self.assertEqual(
+                storage.all()[f"User.{obj.id}"].to_dict(), obj.to_dict()
+            )
+
+    def test_threads(self):
+        """Test objects created, read and saved from several threads"""
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(50):
+                    obj = User()
+                    obj.save()  # iterates objects while others add some
+                    storage.get(User, obj.id)
+                    storage.lookup(City, "state_id", "x")
+                    storage.count(User)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(storage.count(User), 200)
+        # the last save wrote every object
+        with open(FileStorage._FileStorage__file_path, "r") as file:
+            self.assertEqual(len(json.load(file)), 200)
+
+    def other_process(self, *lines, **settings):
+        """Runs code in another process sharing the store (settings:
+        more environment variables)"""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__))
+        )))
+        env = dict(
+            os.environ, HBNB_STORAGE_SHARED="1", PYTHONPATH=root, **settings
+        )
+        code = "\n".join(("from models import storage",) + lines)
+        subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+    def test_shared(self):
+        """Test saves merge the objects saved by other processes"""
+        FileStorage._FileStorage__shared = True
+        obj = User()
+        obj.save()
+        self.other_process(
+            "from models.user import User",
+            "user = User()",
+            "user.email = 'other'",
+            "user.save()",
+            f"storage.delete(storage.get('User', '{obj.id}'))",
+            "storage.save()",
+        )
+        self.assertEqual(list(storage.all()), [f"User.{obj.id}"])
+        city = City()
+        city.save()
+        # the other process's changes were merged on save
+        self.assertNotIn(f"User.{obj.id}", storage.all())
+        users = list(storage.all(User).values())
+        self.assertEqual([user.email for user in users], ["other"])
+        with open(FileStorage._FileStorage__file_path, "r") as file:
+            self.assertEqual(
+                set(json.load(file)),
+                {f"User.{users[0].id}", f"City.{city.id}"},
+            )
+        with open(f"{FileStorage._FileStorage__file_path}.gen", "r") as file:
+            lines = [json.loads(line) for line in file]
+        # one line per save, with the keys it wrote
+        self.assertEqual([line[0] for line in lines], [1, 2, 3, 4])
+        self.assertEqual(lines[3][1], [f"City.{city.id}"])
+
+    def test_shared_generations(self):
+        """Test saves only read the generations appended since the last
+        one, and folded generation files"""
+        FileStorage._FileStorage__shared = True
+        users = [User() for i in range(3)]
+        storage.save()
+        self.other_process(
+            f"user = storage.get('User', '{users[0].id}')",
+            "user.save()",
+        )
+        generation, keys, position = storage._read_generation()
+        self.assertEqual(generation, 2)
+        self.assertEqual(keys, {f"User.{users[0].id}": 2})
+
+        # folded: every key, with the generation it was last written in
+        FileStorage._FileStorage__journal_limit = 0
+        users[1].save()
+        path = f"{FileStorage._FileStorage__file_path}.gen"
+        with open(path, "r") as file:
+            lines = file.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0]), [3, {
+            f"User.{users[0].id}": 2,
+            f"User.{users[1].id}": 3,
+            f"User.{users[2].id}": 1,
+        }])
+        # read whole by the other processes
+        self.other_process(
+            f"user = storage.get('User', '{users[2].id}')",
+            "user.first_name = 'Other'",
+            "user.save()",
+        )
+        City().save()
+        self.assertEqual(storage.get(User, users[2].id).first_name, "Other")
+
+    def test_shared_merge_reads(self):
+        """Test merges only read the shards of the objects other
+        processes changed"""
+        FileStorage._FileStorage__shared = True
+        FileStorage._FileStorage__layout = "sharded"
+        FileStorage._FileStorage__shards = 4
+        users = [User() for i in range(20)]
+        storage.save()
+        self.other_process(
+            f"user = storage.get('User', '{users[0].id}')",
+            "user.first_name = 'Other'",
+            "user.save()",
+            HBNB_STORAGE_LAYOUT="sharded",
+            HBNB_STORAGE_SHARDS="4",
+        )
+        with patch(
+            "models.engine.file_storage._load_shard", wraps=_load_shard
+        ) as load:
+            City().save()
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(storage.get(User, users[0].id).first_name, "Other")
+
+    def test_shared_conflict(self):
+        """Test saves are rejected when another process changed the
+        same objects"""
+        FileStorage._FileStorage__shared = True
+        obj = User()
+        obj.save()
+        self.other_process(
+            f"storage.get('User', '{obj.id}').first_name = 'Other'",
+            f"storage.get('User', '{obj.id}').save()",
+        )
+        obj.first_name = "Mine"
+        with self.assertRaises(StorageConflictError) as error:
+            obj.save()
+        self.assertIn(f"User.{obj.id}", str(error.exception))
+        # the other process's change is kept, here too
+        self.assertEqual(storage.get(User, obj.id).first_name, "Other")
+        storage.reload()
+        self.assertEqual(storage.get(User, obj.id).first_name, "Other")
+        storage.get(User, obj.id).save()  # no conflict once reloaded
+
+    def test_shared_conflict_others(self):
+        """Test the changes of a save rejected for a conflict, and the
+        later saves, are still written"""
+        FileStorage._FileStorage__shared = True
+        obj = User()
+        obj.save()
+        self.other_process(
+            f"storage.get('User', '{obj.id}').first_name = 'Other'",
+            f"storage.get('User', '{obj.id}').save()",
+        )
+        obj.first_name = "Mine"
+        city = City()
+        with self.assertRaises(StorageConflictError):
+            obj.save()
+        place = Place()
+        place.save()  # not rejected anymore
+        storage.reload()
+        self.assertEqual(storage.get(User, obj.id).first_name, "Other")
+        self.assertIsNotNone(storage.get(City, city.id))
+        self.assertIsNotNone(storage.get(Place, place.id))
+
+    def test_journal(self):
+        """Test save() and reload() in journal mode"""
+        FileStorage._FileStorage__journal = True
+        journal_path = f"{FileStorage._FileStorage__file_path}.log"
+        obj = User()
+        other = User()
+        storage.save()
+        # changes are appended to the journal, the JSON file is untouched
+        self.assertFalse(os.path.isfile(FileStorage._FileStorage__file_path))
+        with open(journal_path, "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 1)  # one line per save
+
+        obj.first_name = "Betty"
+        obj.save()
+        storage.delete(other)
+        storage.save()
+        with open(journal_path, "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        # the journal is replayed on reload
+        storage.reload()
+        self.assertEqual(storage.all()[f"User.{obj.id}"].first_name, "Betty")
+        self.assertNotIn(f"User.{other.id}", storage.all())
+
+        # compaction folds the journal into the JSON file
+        storage.compact()
+        self.assertFalse(os.path.isfile(journal_path))
+        storage.reload()
+        self.assertEqual(storage.all()[f"User.{obj.id}"].first_name, "Betty")
+        self.assertEqual(len(storage.all()), 1)
+
+    def test_journal_torn_write(self):
+        """Test a partially written journal record is ignored on reload"""
+        FileStorage._FileStorage__journal = True
+        obj = User()
+        storage.save()
+        with open(
+            f"{FileStorage._FileStorage__file_path}.log", "a", encoding="utf-8"
+        ) as f:
+            f.write('{"set": {"User.1": {"id": "1"}}, "dele')
+        storage.reload()
+        self.assertEqual(list(storage.all()), [f"User.{obj.id}"])
+
+        # saves after a torn write are replayed
+        users = [User() for i in range(2)]
+        users[0].save()
+        users[1].save()
+        storage.reload()
+        self.assertCountEqual(
+            storage.all(), [f"User.{user.id}" for user in [obj] + users]
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
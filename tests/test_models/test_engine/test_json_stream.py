@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/json_stream.py"""
+
+import unittest
+import json
+from io import StringIO
+from models.engine.json_stream import iter_json_object
+
+
+class TestIterJsonObject(unittest.TestCase):
+    """Contains test cases for the iter_json_object function"""
+
+    document = {
+        "User.1": {"id": "1", "name": "a \"quoted\" {brace}, [x]"},
+        "Place.2": {"id": "2", "price": 123456789, "ratio": 0.25},
+        "Review.3": {"id": "3", "tags": [1, 2, {"x": None}], "ok": True},
+    }
+
+    def test_iter(self):
+        """Test items are read in order, for any chunk size"""
+        text = json.dumps(self.document)
+        for chunk_size in (1, 2, 3, 7, 64, 65536):
+            items = list(iter_json_object(StringIO(text), chunk_size))
+            self.assertEqual(items, list(self.document.items()))
+
+    def test_whitespaces(self):
+        """Test indented documents"""
+        text = json.dumps(self.document, indent=4)
+        items = list(iter_json_object(StringIO(f"\n  {text}\n"), 5))
+        self.assertEqual(items, list(self.document.items()))
+
+    def test_empty(self):
+        """Test empty object"""
+        self.assertEqual(list(iter_json_object(StringIO("{}"))), [])
+        self.assertEqual(list(iter_json_object(StringIO(" { } "), 1)), [])
+
+    def test_invalid(self):
+        """Test invalid or truncated documents"""
+        for text in ("", "[]", '{"a": 1', '{"a" 1}', '{"a": 1 "b": 2}'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_json_object(StringIO(text), 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/lazy_objects.py"""
+
+import threading
+import unittest
+from models.engine.lazy_objects import LazyObjects
+
+
+class TestLazyObjects(unittest.TestCase):
+    """Contains test cases for the LazyObjects class"""
+
+    def setUp(self):
+        """Runs before each test"""
+        self.built = []
+        records = {"A.1": {"n": 1}, "A.2": {"n": 2}, "A.3": {"n": 3}}
+        self.objects = LazyObjects(records, self.build)
+
+    def build(self, record):
+        """Fake instance builder that remembers its calls"""
+        self.built.append(record["n"])
+        return ("obj", record["n"])
+
+    def test_keys(self):
+        """Test keys, membership and length don't build instances"""
+        self.assertEqual(list(self.objects), ["A.1", "A.2", "A.3"])
+        self.assertIn("A.2", self.objects)
+        self.assertNotIn("A.4", self.objects)
+        self.assertEqual(len(self.objects), 3)
+        self.assertEqual(self.built, [])
+
+    def test_getitem(self):
+        """Test instances are built once, on first read"""
+        self.assertEqual(self.objects["A.2"], ("obj", 2))
+        self.assertEqual(self.objects["A.2"], ("obj", 2))
+        self.assertEqual(self.objects.get("A.3"), ("obj", 3))
+        self.assertIsNone(self.objects.get("A.4"))
+        self.assertEqual(self.built, [2, 3])
+        with self.assertRaises(KeyError):
+            self.objects["A.4"]
+
+    def test_record(self):
+        """Test record() only returns records of pending keys"""
+        self.assertEqual(self.objects.record("A.1"), {"n": 1})
+        self.objects["A.1"]
+        self.assertIsNone(self.objects.record("A.1"))
+        self.assertIsNone(self.objects.record("A.4"))
+
+    def test_set_delete(self):
+        """Test setting, deleting and popping objects"""
+        self.objects["A.1"] = "new"
+        self.assertEqual(self.objects["A.1"], "new")
+        del self.objects["A.2"]
+        self.assertNotIn("A.2", self.objects)
+        self.assertEqual(self.objects.pop("A.3"), ("obj", 3))
+        self.assertIsNone(self.objects.pop("A.3", None))
+        self.assertEqual(self.built, [3])
+        self.assertEqual(len(self.objects), 1)
+
+    def test_values_items(self):
+        """Test values() and items() build every instance"""
+        self.assertEqual(
+            list(self.objects.values()), [("obj", 1), ("obj", 2), ("obj", 3)]
+        )
+        self.assertEqual(dict(self.objects.items())["A.1"], ("obj", 1))
+        self.assertEqual(self.built, [1, 2, 3])
+
+    def test_copy(self):
+        """Test copies keep pending keys pending"""
+        self.objects["A.1"]
+        copy = self.objects.copy()
+        self.assertIsInstance(copy, LazyObjects)
+        del self.objects["A.2"]
+        self.assertEqual(copy.record("A.2"), {"n": 2})
+        self.assertEqual(copy["A.1"], ("obj", 1))
+        self.assertEqual(self.built, [1])
+
+    def test_concurrent_build(self):
+        """Test threads reading a pending key build one instance"""
+        barrier = threading.Barrier(4, timeout=5)
+        results = []
+
+        def reader():
+            barrier.wait()
+            results.append(self.objects["A.1"])
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.built, [1])
+        self.assertTrue(all(obj is results[0] for obj in results))
+
+    def test_limit(self):
+        """Test only the most recent instances are kept"""
+        objects = LazyObjects(
+            {"A.1": {"n": 1}, "A.2": {"n": 2}, "A.3": {"n": 3}},
+            self.build,
+            limit=2,
+            unbuild=lambda obj: {"n": obj[1]},
+        )
+        objects["A.1"]
+        objects["A.2"]
+        objects["A.1"]  # A.2 is now the least recent
+        objects["A.3"]
+        self.assertEqual(objects.record("A.2"), {"n": 2})  # evicted
+        self.assertIsNone(objects.record("A.1"))
+        self.assertEqual(
+            objects.stats(),
+            dict(hits=1, misses=3, evictions=1, size=2, limit=2),
+        )
+        self.assertEqual(objects["A.2"], ("obj", 2))  # built again
+        self.assertEqual(self.built, [1, 2, 3, 2])
+        # iterating never holds more than the limit
+        self.assertEqual(len(list(objects.values())), 3)
+        self.assertEqual(objects.stats()["size"], 2)
+
+    def test_limit_identity(self):
+        """Test an evicted instance still in use is given back"""
+
+        class Obj:
+            """Instance that can be weakly referenced"""
+
+            def __init__(self, n):
+                self.n = n
+
+        objects = LazyObjects(
+            {"A.1": {"n": 1}, "A.2": {"n": 2}},
+            lambda record: Obj(record["n"]),
+            limit=1,
+            unbuild=lambda obj: {"n": obj.n},
+        )
+        first = objects["A.1"]
+        objects["A.2"]  # evicts A.1
+        self.assertEqual(objects.record("A.1"), {"n": 1})
+        self.assertIs(objects["A.1"], first)
+
+
+if __name__ == "__main__":
+    unittest.main()
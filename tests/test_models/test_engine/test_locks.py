@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/locks.py"""
+
+import threading
+import time
+import unittest
+from models.engine.locks import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Contains test cases for the ReadWriteLock class"""
+
+    def test_shared_readers(self):
+        """Test readers hold the lock at the same time"""
+        lock = ReadWriteLock()
+        barrier = threading.Barrier(3, timeout=5)
+
+        def reader():
+            with lock.read():
+                barrier.wait()  # breaks if readers exclude each other
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(barrier.broken)
+
+    def test_exclusive_writer(self):
+        """Test a writer excludes readers and other writers"""
+        lock = ReadWriteLock()
+        events = []
+
+        def writer(name):
+            with lock.write():
+                events.append(f"{name} in")
+                time.sleep(0.01)
+                events.append(f"{name} out")
+
+        def reader():
+            with lock.read():
+                events.append("reader")
+
+        threads = [
+            threading.Thread(target=writer, args=("a",)),
+            threading.Thread(target=reader),
+            threading.Thread(target=writer, args=("b",)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # nothing happens between a writer's in and out
+        for name in ("a", "b"):
+            start = events.index(f"{name} in")
+            self.assertEqual(events[start + 1], f"{name} out")
+        self.assertEqual(len(events), 5)
+
+    def test_reentrant_writer(self):
+        """Test the writer may take the lock again"""
+        lock = ReadWriteLock()
+        with lock.write():
+            with lock.write():
+                with lock.read():
+                    pass
+        # released: another thread can write
+        done = []
+
+        def writer():
+            with lock.write():
+                done.append(True)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(timeout=5)
+        self.assertEqual(done, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/query.py"""
+
+import unittest
+from models.engine.query import check_conditions, matches, page
+from models.place import Place
+
+
+class TestQuery(unittest.TestCase):
+    """Contains test cases for the query evaluator"""
+
+    def test_check_conditions(self):
+        """Test = is the same as ==, unknown operators are rejected"""
+        self.assertEqual(
+            check_conditions([("name", "=", "a"), ("max_guest", ">", 2)]),
+            [("name", "==", "a"), ("max_guest", ">", 2)],
+        )
+        with self.assertRaises(ValueError):
+            check_conditions([("name", "~", "a")])
+
+    def test_matches(self):
+        """Test objects meet all conditions"""
+        place = Place()
+        place.name = "Loft"
+        place.price_by_night = 80
+        self.assertTrue(matches(place, [("price_by_night", "<", 100)]))
+        self.assertTrue(matches(place, [
+            ("price_by_night", ">=", 80), ("name", "!=", "Hut")
+        ]))
+        self.assertFalse(matches(place, [
+            ("price_by_night", "<", 100), ("name", "==", "Hut")
+        ]))
+        # class defaults, missing attributes, values of other types
+        self.assertTrue(matches(place, [("max_guest", "==", 0)]))
+        self.assertTrue(matches(place, [("missing", "==", None)]))
+        self.assertFalse(matches(place, [("name", "<", 100)]))
+
+    def test_page(self):
+        """Test offset and limit"""
+        self.assertEqual(list(page(range(10), 2, 3)), [2, 3, 4])
+        self.assertEqual(list(page(range(5), 3)), [3, 4])
+        self.assertEqual(list(page(range(5), 0, 0)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
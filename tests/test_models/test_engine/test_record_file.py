@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+"""Unittests for models/engine/record_file.py"""
+
+import os
+import tempfile
+import unittest
+from models.engine.record_file import RecordFile, encode_record
+from models.engine.record_file import write_records
+
+
+class TestRecordFile(unittest.TestCase):
+    """Contains test cases for the indexed file format"""
+
+    def setUp(self):
+        """Runs before each test"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "store.dat")
+        self.records = {
+            "A.1": {"n": 1, "name": "é"},
+            "A.2": {"n": 2, "tags": ["x", "y"]},
+            "B.1": {"n": 3},
+        }
+        with open(self.path, "wb") as file:
+            write_records(
+                (
+                    (key, encode_record(record), {"n": record["n"]})
+                    for key, record in self.records.items()
+                ),
+                file,
+            )
+
+    def tearDown(self):
+        """Runs after each test"""
+        self.tmp.cleanup()
+
+    def test_read(self):
+        """Test reading records, keys and indexed values"""
+        records = RecordFile(self.path)
+        self.assertEqual(list(records), ["A.1", "A.2", "B.1"])
+        self.assertEqual(len(records), 3)
+        self.assertIn("A.2", records)
+        self.assertNotIn("C.1", records)
+        for key, record in self.records.items():
+            self.assertEqual(records[key], record)
+            self.assertEqual(records.raw(key), encode_record(record))
+            self.assertEqual(records.fields(key), {"n": record["n"]})
+        self.assertEqual(dict(records.items()), self.records)
+
+    def test_pop_copy(self):
+        """Test removing keys and copies"""
+        records = RecordFile(self.path)
+        copy = records.copy()
+        self.assertEqual(records.pop("A.1"), self.records["A.1"])
+        self.assertNotIn("A.1", records)
+        self.assertIsNone(records.pop("A.1", None))
+        with self.assertRaises(KeyError):
+            records.pop("A.1")
+        self.assertEqual(copy["A.1"], self.records["A.1"])
+        records.clear()
+        self.assertEqual(len(records), 0)
+        self.assertEqual(len(copy), 3)
+
+    def test_restore(self):
+        """Test bringing back removed records, unless outdated"""
+        records = RecordFile(self.path)
+        self.assertFalse(records.restore("A.1"))  # not removed
+        del records["A.1"]
+        records.pop("A.2")
+        records.outdate("A.2")
+        self.assertTrue(records.restore("A.1"))
+        self.assertFalse(records.restore("A.2"))
+        self.assertEqual(records["A.1"], self.records["A.1"])
+        records["B.1"] = {"n": 4}
+        self.assertFalse(records.restore("B.1"))
+
+    def test_reopen(self):
+        """Test reading the records again from a new version of the file"""
+        records = RecordFile(self.path)
+        records.pop("A.1")  # built, then changed
+        records["A.2"] = {"n": 5}  # changed, evicted
+        records["B.1"] = {"n": 6}  # changed again since the file
+        new = dict(self.records, **{"A.1": {"n": 4}, "A.2": {"n": 5}})
+        with open(self.path, "wb") as file:
+            write_records(
+                (
+                    (key, encode_record(record), {"n": record["n"]})
+                    for key, record in new.items()
+                ),
+                file,
+            )
+        records.reopen(self.path, changed={"B.1"})
+        self.assertEqual(records._RecordFile__added, {"B.1": b'{"n": 6}'})
+        self.assertEqual(records["A.2"], {"n": 5})
+        self.assertNotIn("A.1", records)
+        self.assertTrue(records.restore("A.1"))
+        self.assertEqual(records["A.1"], {"n": 4})
+
+    def test_replaced_file(self):
+        """Test records stay readable after the file is replaced"""
+        records = RecordFile(self.path)
+        with open(f"{self.path}.tmp", "wb") as file:
+            write_records((), file)
+        os.replace(f"{self.path}.tmp", self.path)
+        self.assertEqual(records["B.1"], self.records["B.1"])
+        self.assertEqual(len(RecordFile(self.path)), 0)
+        self.assertEqual(len(RecordFile()), 0)
+
+    def test_invalid(self):
+        """Test other files are rejected"""
+        with open(self.path, "w") as file:
+            file.write("{}")
+        with self.assertRaises(ValueError):
+            RecordFile(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()